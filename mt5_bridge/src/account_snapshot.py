@@ -0,0 +1,204 @@
+"""
+Account Snapshot - Versioned, immutable view of account state and open positions
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AccountSnapshot:
+    """Account information and open positions as of one point in time"""
+
+    version: int
+    taken_at: float
+    account: Mapping[str, Any]
+    positions: Tuple[Mapping[str, Any], ...]
+    clock: Callable[[], float] = time.monotonic
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was taken"""
+        return self.clock() - self.taken_at
+
+    @property
+    def open_positions(self) -> int:
+        """Number of open positions"""
+        return len(self.positions)
+
+    def positions_for(self, symbol: str) -> Tuple[Mapping[str, Any], ...]:
+        """Open positions on a symbol"""
+        return tuple(position for position in self.positions if position['symbol'] == symbol)
+
+
+class AccountSnapshotService:
+    """
+    Keeps an account snapshot fresh so the order path never waits on the terminal
+
+    Readers get the current AccountSnapshot from memory. It is replaced as
+    a whole on every change: by `refresh()` (periodic reconcile, reading
+    account info and positions concurrently), and right after a fill by
+    `record_fill()`, which adds the new position at once and reconciles in
+    the background. Positions recorded from fills are kept until the
+    terminal reports them (or `max_age` passes), so a reconcile answered
+    from a request issued before the fill cannot drop them.
+    """
+
+    def __init__(self, mt5_connector, max_age: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize service
+
+        Args:
+            mt5_connector: MT5 connector instance
+            max_age: Seconds after which get() refreshes before answering
+            clock: Monotonic time source
+        """
+        self.mt5 = mt5_connector
+        self.max_age = max_age
+        self.clock = clock
+
+        self._snapshot = None
+        self._version = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'refreshes': 0,
+            'failures': 0,
+            'fills': 0,
+            'closes': 0
+        }
+
+    def current(self) -> Optional[AccountSnapshot]:
+        """Latest snapshot (None before the first successful refresh)"""
+        return self._snapshot
+
+    def get(self) -> Optional[AccountSnapshot]:
+        """Latest snapshot, refreshed first if it is older than max_age"""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.age > self.max_age:
+            return self.refresh() or snapshot
+        return snapshot
+
+    def refresh(self) -> Optional[AccountSnapshot]:
+        """
+        Read account information and positions from the terminal
+
+        Returns:
+            New snapshot, or None if the terminal could not be read
+        """
+        try:
+            account = self.mt5.request_account_info()
+            positions = self.mt5.request_positions()
+            return self._apply(account.result(self.mt5.timeout), positions.result(self.mt5.timeout))
+        except Exception as e:
+            self.stats['failures'] += 1
+            logger.error(f"Error refreshing account snapshot: {str(e)}")
+            return None
+
+    def refresh_async(self):
+        """Reconcile with the terminal without waiting for the result"""
+        account = self.mt5.request_account_info()
+        positions = self.mt5.request_positions()
+        positions.add_done_callback(
+            lambda _: account.add_done_callback(lambda _: self._apply_futures(account, positions))
+        )
+
+    def record_fill(self, trade: Dict[str, Any]) -> AccountSnapshot:
+        """
+        Add the position opened by a fill, then reconcile in the background
+
+        Args:
+            trade: Trade record from ExecutionEngine.execute
+
+        Returns:
+            New snapshot
+        """
+        position = MappingProxyType({
+            'ticket': trade['ticket'],
+            'symbol': trade['symbol'],
+            'type': trade['action'],
+            'volume': trade.get('volume', 0.0),
+            'open_price': trade['entry_price'],
+            'current_price': trade['entry_price'],
+            'profit': 0.0,
+            'sl': trade['stop_loss'],
+            'tp': trade['take_profit']
+        })
+        with self._lock:
+            self._pending[trade['ticket']] = (position, self.clock())
+            snapshot = self._publish(self._snapshot.account if self._snapshot else MappingProxyType({}),
+                                     self._positions(self._snapshot))
+            self.stats['fills'] += 1
+
+        self.refresh_async()
+        return snapshot
+
+    def record_close(self, ticket: int) -> Optional[AccountSnapshot]:
+        """Remove a closed position, then reconcile in the background"""
+        with self._lock:
+            self._pending.pop(ticket, None)
+            if self._snapshot is None:
+                return None
+            positions = tuple(position for position in self._snapshot.positions if position['ticket'] != ticket)
+            snapshot = self._publish(self._snapshot.account, positions)
+            self.stats['closes'] += 1
+
+        self.refresh_async()
+        return snapshot
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get service statistics"""
+        snapshot = self._snapshot
+        return {
+            **self.stats,
+            'version': snapshot.version if snapshot else 0,
+            'age': snapshot.age if snapshot else None,
+            'open_positions': snapshot.open_positions if snapshot else 0
+        }
+
+    def _apply_futures(self, account, positions):
+        """Future callback: apply a background reconcile"""
+        try:
+            self._apply(account.result(), positions.result())
+        except Exception as e:
+            self.stats['failures'] += 1
+            logger.error(f"Error reconciling account snapshot: {str(e)}")
+
+    def _apply(self, account: Optional[Dict[str, Any]], positions: Optional[list]) -> Optional[AccountSnapshot]:
+        """Publish terminal state, keeping fills the terminal does not report yet"""
+        if account is None or positions is None:
+            self.stats['failures'] += 1
+            logger.warning("Account snapshot not refreshed: terminal returned no data")
+            return None
+
+        reported = tuple(MappingProxyType(dict(position)) for position in positions)
+        tickets = {position['ticket'] for position in reported}
+        with self._lock:
+            now = self.clock()
+            for ticket, (_, recorded_at) in list(self._pending.items()):
+                if ticket in tickets or now - recorded_at > self.max_age:
+                    del self._pending[ticket]
+
+            pending = tuple(position for position, _ in self._pending.values())
+            snapshot = self._publish(MappingProxyType(dict(account)), reported + pending)
+            self.stats['refreshes'] += 1
+            return snapshot
+
+    def _positions(self, snapshot: Optional[AccountSnapshot]) -> Tuple[Mapping[str, Any], ...]:
+        """Positions of a snapshot plus pending fills it does not contain yet"""
+        positions = snapshot.positions if snapshot else ()
+        tickets = {position['ticket'] for position in positions}
+        return positions + tuple(position for position, _ in self._pending.values() if position['ticket'] not in tickets)
+
+    def _publish(self, account: Mapping[str, Any], positions: Tuple[Mapping[str, Any], ...]) -> AccountSnapshot:
+        """Replace the current snapshot (caller holds the lock)"""
+        self._version += 1
+        self._snapshot = AccountSnapshot(self._version, self.clock(), account, positions, self.clock)
+        return self._snapshot
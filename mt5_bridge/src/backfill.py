@@ -0,0 +1,334 @@
+"""
+Backfill - Downloads missing bar history into the archive
+
+Usage:
+    python src/backfill.py --from 2022-01-01 [--to 2024-01-01] [--symbols EURUSD GBPUSD] [--timeframes 1 15]
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from bars import Bars
+from bar_archive import BarArchive
+
+logger = logging.getLogger(__name__)
+
+# Longest market closure treated as a weekend rather than missing data
+MAX_WEEKEND_SECONDS = 3 * 86400
+
+
+def find_gaps(times: np.ndarray, timeframe: int, date_from: int, date_to: int) -> List[Tuple[int, int]]:
+    """
+    Find missing bar ranges in a sorted series of bar open times
+
+    Gaps between Friday evening and Sunday/Monday are weekend closures
+    and are not reported.
+
+    Args:
+        times: Archived bar open times in seconds, sorted
+        timeframe: Timeframe in minutes
+        date_from: Start of the wanted history in seconds
+        date_to: End of the wanted history in seconds
+
+    Returns:
+        List of (first missing bar time, last missing bar time) ranges
+    """
+    period = timeframe * 60
+    if len(times) == 0:
+        return [(date_from, date_to)] if date_to >= date_from else []
+
+    gaps = []
+    if times[0] - date_from >= period:
+        gaps.append((date_from, int(times[0]) - period))
+
+    index = np.flatnonzero(np.diff(times) > period)
+    starts = times[index] + period
+    ends = times[index + 1] - period
+    keep = ~(_is_closed(starts) & _is_closed(ends) & (ends - starts < MAX_WEEKEND_SECONDS))
+    gaps.extend(zip(starts[keep].tolist(), ends[keep].tolist()))
+
+    if date_to - times[-1] >= period:
+        gaps.append((int(times[-1]) + period, date_to))
+
+    return [(start, end) for start, end in gaps if start <= date_to and end >= date_from]
+
+
+def _is_closed(times: np.ndarray) -> np.ndarray:
+    """Whether bar times fall in the weekend closure (Friday 20:00 to Sunday 24:00)"""
+    days = times // 86400
+    weekday = (days + 3) % 7  # 1970-01-01 was a Thursday; Monday = 0
+    hour = (times % 86400) // 3600
+    return (weekday == 5) | (weekday == 6) | ((weekday == 4) & (hour >= 20))
+
+
+def _coalesce(ranges: List[List[int]], period: int) -> List[List[int]]:
+    """Sort (start, end) ranges and merge those overlapping or less than a bar apart"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + period:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class Backfiller:
+    """
+    Fills gaps in archived history from MT5
+
+    Missing ranges are downloaded oldest first in chunks through the
+    connector (and so through the single MT5 thread); short gaps close
+    together share one request. Downloaded bars are merged into the archive
+    periodically, and ranges the terminal has no data for are remembered in
+    a state file written with each merge, so an interrupted run resumes
+    where it stopped and holidays are not requested again.
+    """
+
+    def __init__(self, mt5_connector, archive: BarArchive, chunk_size: int = 50000,
+                 flush_size: int = 500000,
+                 progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Initialize backfiller
+
+        Args:
+            mt5_connector: MT5 connector instance
+            archive: Bar archive to fill
+            chunk_size: Bars requested per terminal call
+            flush_size: Downloaded bars held in memory before merging into the archive
+            progress_callback: Called with a progress dict after every chunk
+        """
+        self.mt5 = mt5_connector
+        self.archive = archive
+        self.chunk_size = chunk_size
+        self.flush_size = flush_size
+        self.progress_callback = progress_callback
+        self.state_path = os.path.join(archive.directory, 'backfill_state.json')
+        self.empty_ranges = {
+            key: _coalesce(ranges, int(key.rsplit('_M', 1)[1]) * 60)
+            for key, ranges in self._load_state().items()
+        }
+        self._dirty = False
+
+    def plan(self, symbol: str, timeframe: int, date_from: int, date_to: int) -> List[Tuple[int, int]]:
+        """
+        Get the ranges that still need downloading
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe in minutes
+            date_from: Start time in seconds
+            date_to: End time in seconds
+
+        Returns:
+            List of (start, end) ranges in seconds
+        """
+        times = self.archive.read(symbol, timeframe).time
+        gaps = find_gaps(times, timeframe, date_from, date_to)
+        known_empty = np.array(self.empty_ranges.get(f"{symbol}_M{timeframe}", []), dtype=np.int64).reshape(-1, 2)
+        if not gaps or len(known_empty) == 0:
+            return gaps
+
+        # Empty ranges are kept sorted and disjoint: only the last one starting before a gap can contain it
+        starts = np.array([start for start, _ in gaps], dtype=np.int64)
+        ends = np.array([end for _, end in gaps], dtype=np.int64)
+        index = np.searchsorted(known_empty[:, 0], starts, side='right') - 1
+        covered = (index >= 0) & (known_empty[np.maximum(index, 0), 1] >= ends)
+        return [gap for gap, skip in zip(gaps, covered) if not skip]
+
+    def run(self, symbols: List[str], timeframes: List[int], date_from: int,
+            date_to: Optional[int] = None) -> Dict[str, int]:
+        """
+        Backfill every symbol/timeframe
+
+        Args:
+            symbols: Trading symbols
+            timeframes: Timeframes in minutes
+            date_from: Start time in seconds
+            date_to: End time in seconds (default: now)
+
+        Returns:
+            Dictionary of "SYMBOL_Mtf" -> bars downloaded
+        """
+        summary = {}
+        for symbol in symbols:
+            for timeframe in timeframes:
+                end = date_to if date_to is not None else int(time.time()) - timeframe * 60
+                summary[f"{symbol}_M{timeframe}"] = self.backfill(symbol, timeframe, date_from, end)
+        return summary
+
+    def backfill(self, symbol: str, timeframe: int, date_from: int, date_to: int) -> int:
+        """
+        Download the missing history of one symbol/timeframe
+
+        Returns:
+            Number of bars downloaded
+        """
+        chunks = self._chunks(self.plan(symbol, timeframe, date_from, date_to), self.chunk_size * timeframe * 60)
+        if not chunks:
+            logger.info(f"{symbol} M{timeframe}: history complete")
+            return 0
+
+        logger.info(f"{symbol} M{timeframe}: downloading {len(chunks)} chunks")
+        started = time.monotonic()
+        pending = []
+        pending_count = 0
+        downloaded = 0
+
+        try:
+            for done, (start, end, ranges) in enumerate(chunks, 1):
+                rates = self.mt5.get_rates_range(symbol, timeframe, start, end)
+                if rates is None:
+                    logger.error(f"{symbol} M{timeframe}: download failed, stopping (resume by running again)")
+                    break
+
+                # Keep the bars inside the missing ranges; what is still missing there has no data
+                first = np.searchsorted(rates.time, ranges[:, 0])
+                last = np.searchsorted(rates.time, ranges[:, 1], side='right')
+                self._record_empty(symbol, timeframe, self._still_missing(rates.time, timeframe, ranges, first, last))
+                change = np.bincount(first, minlength=len(rates) + 1) - np.bincount(last, minlength=len(rates) + 1)
+                data = rates.data[np.cumsum(change)[:len(rates)] > 0]
+                if len(data):
+                    pending.append(data)
+                    pending_count += len(data)
+                    downloaded += len(data)
+
+                if pending_count >= self.flush_size:
+                    self._flush(symbol, timeframe, pending)
+                    pending, pending_count = [], 0
+
+                self._report({
+                    'symbol': symbol,
+                    'timeframe': timeframe,
+                    'chunks_done': done,
+                    'chunks_total': len(chunks),
+                    'bars_downloaded': downloaded,
+                    'elapsed': time.monotonic() - started
+                })
+        finally:
+            self._flush(symbol, timeframe, pending)
+
+        logger.info(f"{symbol} M{timeframe}: {downloaded} bars in {time.monotonic() - started:.1f}s")
+        return downloaded
+
+    @staticmethod
+    def _chunks(gaps: List[Tuple[int, int]], span: int) -> List[Tuple[int, int, np.ndarray]]:
+        """
+        Group missing ranges into terminal requests covering at most `span` seconds
+
+        Gaps longer than a request are split; shorter ones (e.g. the quiet
+        minutes of a session on M1) share one request with their neighbours.
+
+        Returns:
+            List of (request start, request end, missing (start, end) ranges inside it)
+        """
+        chunks = []
+        for gap_start, gap_end in gaps:
+            for start in range(gap_start, gap_end + 1, span):
+                end = min(gap_end, start + span - 1)
+                if chunks and end - chunks[-1][0] < span:
+                    chunks[-1][1] = end
+                    chunks[-1][2].append((start, end))
+                else:
+                    chunks.append([start, end, [(start, end)]])
+        return [(start, end, np.array(ranges, dtype=np.int64)) for start, end, ranges in chunks]
+
+    @staticmethod
+    def _still_missing(times: np.ndarray, timeframe: int, ranges: np.ndarray, first: np.ndarray,
+                       last: np.ndarray) -> List[Tuple[int, int]]:
+        """Parts of the requested ranges the downloaded bar times [first, last) per range do not cover"""
+        period = timeframe * 60
+        missing = []
+        for (start, end), lo, hi in zip(ranges.tolist(), first.tolist(), last.tolist()):
+            if lo == hi:
+                missing.append((start, end))
+            elif hi - lo < (end - start) // period + 1:
+                missing.extend(find_gaps(times[lo:hi], timeframe, start, end))
+        return missing
+
+    def _flush(self, symbol: str, timeframe: int, pending: list):
+        """Merge downloaded chunks into the archive and save the empty ranges found so far"""
+        if pending:
+            self.archive.merge(symbol, timeframe, Bars(np.concatenate(pending)))
+        self._save_state(symbol, timeframe)
+
+    def _report(self, progress: Dict[str, Any]):
+        """Report progress"""
+        logger.debug(
+            f"{progress['symbol']} M{progress['timeframe']}: "
+            f"{progress['chunks_done']}/{progress['chunks_total']} chunks, {progress['bars_downloaded']} bars"
+        )
+        if self.progress_callback:
+            self.progress_callback(progress)
+
+    def _record_empty(self, symbol: str, timeframe: int, ranges: List[Tuple[int, int]]):
+        """Remember ranges the terminal has no data for (saved with the next flush)"""
+        if ranges:
+            self.empty_ranges.setdefault(f"{symbol}_M{timeframe}", []).extend([start, end] for start, end in ranges)
+            self._dirty = True
+
+    def _save_state(self, symbol: str, timeframe: int):
+        """Coalesce a symbol/timeframe's empty ranges and write the state file if it changed"""
+        if not self._dirty:
+            return
+        key = f"{symbol}_M{timeframe}"
+        self.empty_ranges[key] = _coalesce(self.empty_ranges.get(key, []), timeframe * 60)
+        with open(self.state_path + '.tmp', 'w') as f:
+            json.dump(self.empty_ranges, f)
+        os.replace(self.state_path + '.tmp', self.state_path)
+        self._dirty = False
+
+    def _load_state(self) -> Dict[str, list]:
+        """Load remembered empty ranges"""
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+
+def _parse_date(value: str) -> int:
+    """Parse YYYY-MM-DD as a UTC timestamp"""
+    return int(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp())
+
+
+def main():
+    """Command line entry point"""
+    from config import load_config, get_setting
+    from mt5_connector import MT5Connector
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    config = load_config()
+    parser = argparse.ArgumentParser(description='Backfill bar history into the archive')
+    parser.add_argument('--from', dest='date_from', required=True, help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='date_to', help='End date (YYYY-MM-DD, default: now)')
+    parser.add_argument('--symbols', nargs='+', default=get_setting(config, 'trading.symbols', []))
+    parser.add_argument('--timeframes', nargs='+', type=int,
+                        default=get_setting(config, 'trading.timeframes', [15, 60, 240]))
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Bars per terminal request')
+    args = parser.parse_args()
+
+    mt5 = MT5Connector(timeout=get_setting(config, 'performance.timeout', 30))
+    if not mt5.connect():
+        raise SystemExit("Failed to connect to MT5")
+
+    try:
+        archive = BarArchive(get_setting(config, 'archive.directory', 'data/bars'))
+        backfiller = Backfiller(mt5, archive, chunk_size=args.chunk_size)
+        summary = backfiller.run(
+            args.symbols, args.timeframes, _parse_date(args.date_from),
+            _parse_date(args.date_to) if args.date_to else None
+        )
+        logger.info(f"Backfill complete: {sum(summary.values())} bars downloaded")
+    finally:
+        mt5.disconnect()
+
+
+if __name__ == '__main__':
+    main()
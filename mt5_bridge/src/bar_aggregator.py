@@ -0,0 +1,192 @@
+"""
+Bar Aggregator - Builds every timeframe locally from one tick or M1 feed
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+from bars import Bars, BAR_DTYPE
+from bar_buffer import BarBuffer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEFRAMES = [1, 5, 15, 60, 240, 1440]
+
+
+class BarAggregator:
+    """
+    Incremental OHLC aggregation for one symbol
+
+    Every timeframe keeps its history in a BarBuffer whose last bar is the
+    one still forming. An update touches only that bar per timeframe, so
+    the work per tick or M1 bar is constant. When an update falls into a
+    new period, the forming bar is closed, bar-close subscribers are
+    notified and a new bar is started.
+    """
+
+    def __init__(self, symbol: str, timeframes: Optional[List[int]] = None,
+                 history_size: int = 1000):
+        """
+        Initialize aggregator
+
+        Args:
+            symbol: Trading symbol
+            timeframes: Timeframes in minutes (default: M1, M5, M15, H1, H4, D1)
+            history_size: Bars kept per timeframe
+        """
+        self.symbol = symbol
+        self.timeframes = sorted(timeframes or DEFAULT_TIMEFRAMES)
+        self.history_size = history_size
+        self.buffers = {timeframe: BarBuffer(history_size) for timeframe in self.timeframes}
+        self._m1_time = None
+        self._m1_volume = 0
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def has(self, timeframe: int) -> bool:
+        """Check if a timeframe is aggregated"""
+        return timeframe in self.buffers
+
+    def size(self, timeframe: int) -> int:
+        """Number of bars stored for a timeframe"""
+        return len(self.buffers[timeframe])
+
+    def bars(self, timeframe: int, count: Optional[int] = None) -> Bars:
+        """
+        Get the most recent bars for a timeframe, including the forming bar
+
+        Args:
+            timeframe: Timeframe in minutes
+            count: Number of bars (default: all stored bars)
+        """
+        with self._lock:
+            return self.buffers[timeframe].bars(count)
+
+    def seed(self, timeframe: int, bars: Bars):
+        """
+        Load history for a timeframe (e.g. from MT5 on startup)
+
+        Args:
+            timeframe: Timeframe in minutes
+            bars: Bars sorted by time; the last one may still be forming
+        """
+        with self._lock:
+            self.buffers[timeframe].reset(bars)
+
+    def on_bar_close(self, callback: Callable[[str, int, Dict[str, Any]], None]):
+        """
+        Register a callback for closed bars
+
+        Args:
+            callback: Function called with (symbol, timeframe, bar dict)
+        """
+        self._subscribers.append(callback)
+
+    def on_ticks(self, ticks: np.ndarray):
+        """
+        Update all timeframes from ticks
+
+        Args:
+            ticks: TICK_DTYPE array sorted by time; bars are built from bid
+        """
+        if len(ticks) == 0:
+            return
+
+        times = ticks['time_msc'] // 1000
+        prices = ticks['bid']
+
+        closed = []
+        with self._lock:
+            for timeframe in self.timeframes:
+                period = timeframe * 60
+                buckets = times - times % period
+
+                # One segment per period covered by this batch (almost always one)
+                starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+                ends = np.append(starts[1:], len(buckets))
+                highs = np.maximum.reduceat(prices, starts)
+                lows = np.minimum.reduceat(prices, starts)
+
+                for i in range(len(starts)):
+                    bar = self._update(
+                        timeframe, int(buckets[starts[i]]), prices[starts[i]],
+                        highs[i], lows[i], prices[ends[i] - 1], int(ends[i] - starts[i])
+                    )
+                    if bar is not None:
+                        closed.append((timeframe, bar))
+
+        self._notify(closed)
+
+    def on_m1_bar(self, time: int, open: float, high: float, low: float,
+                  close: float, volume: int):
+        """
+        Update all timeframes from an M1 bar
+
+        The same M1 bar may be passed repeatedly while it is forming; only
+        the volume added since the previous update is counted.
+
+        Args:
+            time: Bar open time in seconds
+            open, high, low, close: Bar prices
+            volume: Tick volume of the bar so far
+        """
+        closed = []
+        with self._lock:
+            if self._m1_time is not None and time < self._m1_time:
+                return
+
+            added = volume - self._m1_volume if time == self._m1_time else volume
+            self._m1_time = time
+            self._m1_volume = volume
+
+            for timeframe in self.timeframes:
+                period = timeframe * 60
+                bar = self._update(timeframe, time - time % period, open, high, low, close, added)
+                if bar is not None:
+                    closed.append((timeframe, bar))
+
+        self._notify(closed)
+
+    def on_m1_bars(self, bars: Bars):
+        """Update all timeframes from consecutive M1 bars"""
+        data = bars.data
+        for i in range(len(data)):
+            rate = data[i]
+            self.on_m1_bar(int(rate['time']), float(rate['open']), float(rate['high']),
+                           float(rate['low']), float(rate['close']), int(rate['tick_volume']))
+
+    def _update(self, timeframe: int, bucket: int, open: float, high: float,
+                low: float, close: float, volume: int) -> Optional[Dict[str, Any]]:
+        """
+        Apply one update to a timeframe
+
+        Returns:
+            The bar that was closed by this update, if any
+        """
+        buffer = self.buffers[timeframe]
+        last_time = buffer.last_time
+
+        if last_time is not None and bucket < last_time:
+            return None
+
+        if last_time == bucket:
+            buffer.update_last(high, low, close, volume)
+            return None
+
+        closed = buffer.bars(1).bar(0) if last_time is not None else None
+
+        record = np.zeros(1, dtype=BAR_DTYPE)
+        record[0] = (bucket, open, high, low, close, volume, 0, 0)
+        buffer.append(record)
+        return closed
+
+    def _notify(self, closed: list):
+        """Emit bar-close events outside the lock"""
+        for timeframe, bar in closed:
+            for callback in self._subscribers:
+                try:
+                    callback(self.symbol, timeframe, bar)
+                except Exception as e:
+                    logger.error(f"Error in bar close subscriber: {str(e)}")
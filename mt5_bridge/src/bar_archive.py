@@ -0,0 +1,182 @@
+"""
+Bar Archive - Persistent on-disk bar history read through memory maps
+"""
+
+import logging
+import os
+import threading
+from typing import Optional
+import numpy as np
+
+from bars import Bars, BAR_DTYPE
+
+logger = logging.getLogger(__name__)
+
+
+class BarArchive:
+    """
+    Append-only bar files, one per symbol/timeframe
+
+    Each file is a flat array of BAR_DTYPE records sorted by time, so it
+    can be opened with np.memmap and sliced without reading or copying
+    anything up front. Only closed bars are stored.
+    """
+
+    def __init__(self, directory: str = 'data/bars'):
+        """
+        Initialize archive
+
+        Args:
+            directory: Directory holding the bar files
+        """
+        self.directory = directory
+        self._maps = {}
+        self._writers = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, symbol: str, timeframe: int) -> str:
+        """File path for a symbol/timeframe"""
+        return os.path.join(self.directory, f"{symbol}_M{timeframe}.bars")
+
+    def size(self, symbol: str, timeframe: int) -> int:
+        """Number of archived bars"""
+        try:
+            return os.path.getsize(self.path(symbol, timeframe)) // BAR_DTYPE.itemsize
+        except FileNotFoundError:
+            return 0
+
+    def read(self, symbol: str, timeframe: int, count: Optional[int] = None) -> Bars:
+        """
+        Get archived bars as a zero-copy view of the file
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe in minutes
+            count: Number of most recent bars (default: all)
+
+        Returns:
+            Bars (empty if nothing is archived)
+        """
+        data = self._map(symbol, timeframe)
+        if count is not None and count < len(data):
+            data = data[len(data) - count:]
+        return Bars(data)
+
+    def read_range(self, symbol: str, timeframe: int, date_from: int, date_to: int) -> Bars:
+        """
+        Get archived bars with open time in [date_from, date_to]
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe in minutes
+            date_from: Start time in seconds
+            date_to: End time in seconds
+        """
+        data = self._map(symbol, timeframe)
+        times = data['time']
+        start = int(np.searchsorted(times, date_from, side='left'))
+        end = int(np.searchsorted(times, date_to, side='right'))
+        return Bars(data[start:end])
+
+    def last_time(self, symbol: str, timeframe: int) -> Optional[int]:
+        """Open time of the most recent archived bar"""
+        data = self._map(symbol, timeframe)
+        if len(data) == 0:
+            return None
+        return int(data['time'][-1])
+
+    def append(self, symbol: str, timeframe: int, bars: Bars) -> int:
+        """
+        Append closed bars newer than the last archived bar
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe in minutes
+            bars: Closed bars sorted by time
+
+        Returns:
+            Number of bars written
+        """
+        with self._writer(symbol, timeframe):
+            last_time = self.last_time(symbol, timeframe)
+            data = bars.data
+            if last_time is not None:
+                data = data[data['time'] > last_time]
+            if len(data) == 0:
+                return 0
+
+            path = self.path(symbol, timeframe)
+            with self._lock:
+                with open(path, 'ab') as f:
+                    # Drop a partial record left by an interrupted write
+                    whole = f.tell() - f.tell() % BAR_DTYPE.itemsize
+                    if whole != f.tell():
+                        f.truncate(whole)
+                    f.write(np.ascontiguousarray(data, dtype=BAR_DTYPE).tobytes())
+                self._maps.pop((symbol, timeframe), None)
+
+            return len(data)
+
+    def merge(self, symbol: str, timeframe: int, bars: Bars) -> int:
+        """
+        Insert bars anywhere in the history (e.g. backfilled older ranges)
+
+        Bars newer than the archive are appended; otherwise the file is
+        rewritten sorted by time, with the new bars replacing archived bars
+        that have the same open time. The rewrite goes through a temporary
+        file so an interruption never leaves a damaged archive.
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe in minutes
+            bars: Closed bars sorted by time
+
+        Returns:
+            Number of bars in the archive after merging
+        """
+        if len(bars) == 0:
+            return self.size(symbol, timeframe)
+
+        with self._writer(symbol, timeframe):
+            last_time = self.last_time(symbol, timeframe)
+            if last_time is None or bars.time[0] > last_time:
+                self.append(symbol, timeframe, bars)
+                return self.size(symbol, timeframe)
+
+            existing = self._map(symbol, timeframe)
+            combined = np.concatenate([bars.data.astype(BAR_DTYPE), existing])
+            # np.unique keeps the first occurrence, which is the newly merged bar
+            _, index = np.unique(combined['time'], return_index=True)
+            merged = combined[index]
+
+            path = self.path(symbol, timeframe)
+            with self._lock:
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(merged.tobytes())
+                os.replace(path + '.tmp', path)
+                self._maps.pop((symbol, timeframe), None)
+
+            return len(merged)
+
+    def _writer(self, symbol: str, timeframe: int) -> threading.RLock:
+        """Lock serializing the writes to one file (held across the last-time check and the write)"""
+        with self._lock:
+            return self._writers.setdefault((symbol, timeframe), threading.RLock())
+
+    def _map(self, symbol: str, timeframe: int) -> np.ndarray:
+        """Get a read-only memory map of a file, reopening it if it grew"""
+        key = (symbol, timeframe)
+        count = self.size(symbol, timeframe)
+
+        with self._lock:
+            cached = self._maps.get(key)
+            if cached is not None and cached[1] == count:
+                return cached[0]
+
+            if count == 0:
+                data = np.empty(0, dtype=BAR_DTYPE)
+            else:
+                data = np.memmap(self.path(symbol, timeframe), dtype=BAR_DTYPE, mode='r', shape=(count,))
+            self._maps[key] = (data, count)
+            return data
@@ -0,0 +1,160 @@
+"""
+Bar Buffer - Fixed-capacity, append-only bar history per symbol/timeframe
+"""
+
+import logging
+from typing import Optional
+import numpy as np
+
+from bars import Bars, BAR_DTYPE
+
+logger = logging.getLogger(__name__)
+
+
+class BarBuffer:
+    """
+    Append-only ring buffer of bars
+
+    Storage is twice the capacity so the most recent `capacity` bars are
+    always contiguous and can be handed out as zero-copy views. When the
+    write position reaches the end, the live window is moved to the front
+    of a new array (amortized O(1) per appended bar).
+
+    Stored bars are never overwritten, so a view handed out earlier keeps
+    its bars after later appends, resets and compactions; only the last
+    bar of a view may still change while it is forming.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        """
+        Initialize bar buffer
+
+        Args:
+            capacity: Number of bars of history to keep
+        """
+        self.capacity = capacity
+        self._data = np.zeros(capacity * 2, dtype=BAR_DTYPE)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def last_time(self) -> Optional[int]:
+        """Open time of the most recent (possibly still forming) bar"""
+        if self._end == self._start:
+            return None
+        return int(self._data['time'][self._end - 1])
+
+    def bars(self, count: Optional[int] = None) -> Bars:
+        """
+        Get a view of the most recent bars
+
+        Args:
+            count: Number of bars (default: all stored bars)
+
+        Returns:
+            Bars view into the buffer
+        """
+        start = self._start
+        if count is not None:
+            start = max(self._start, self._end - count)
+        return Bars(self._data[start:self._end])
+
+    def reset(self, bars: Bars):
+        """
+        Replace the whole history
+
+        Args:
+            bars: Bars sorted by time
+        """
+        data = bars.data[-self.capacity:]
+        self._data = np.zeros(self.capacity * 2, dtype=BAR_DTYPE)
+        self._data[:len(data)] = data
+        self._start = 0
+        self._end = len(data)
+
+    def merge(self, bars: Bars) -> bool:
+        """
+        Merge freshly fetched bars into the history
+
+        The stored last bar is replaced in place if it is present in
+        `bars` (it may still have been forming), and newer bars are
+        appended.
+
+        Args:
+            bars: Recent bars sorted by time, overlapping the stored history
+
+        Returns:
+            True if merged, False if `bars` does not overlap the stored
+            history (the caller should reset with a full fetch)
+        """
+        if len(bars) == 0:
+            return True
+
+        last_time = self.last_time
+        if last_time is None:
+            self.reset(bars)
+            return True
+
+        times = bars.time
+        if times[0] > last_time:
+            return False
+
+        pos = int(np.searchsorted(times, last_time))
+        if pos < len(times) and times[pos] == last_time:
+            self._data[self._end - 1] = bars.data[pos]
+            pos += 1
+
+        self._append(bars.data[pos:])
+        return True
+
+    def append(self, data: np.ndarray):
+        """
+        Append bar records newer than the stored last bar
+
+        Args:
+            data: BAR_DTYPE records sorted by time
+        """
+        self._append(data)
+
+    def update_last(self, high: float, low: float, close: float, volume: int):
+        """
+        Update the forming last bar in place
+
+        Args:
+            high: New high (kept if lower than the stored high)
+            low: New low (kept if higher than the stored low)
+            close: Latest price
+            volume: Tick volume to add
+        """
+        last = self._end - 1
+        self._data['high'][last] = max(self._data['high'][last], high)
+        self._data['low'][last] = min(self._data['low'][last], low)
+        self._data['close'][last] = close
+        self._data['tick_volume'][last] += volume
+
+    def _append(self, data: np.ndarray):
+        """Append records, compacting the storage when needed"""
+        count = len(data)
+        if count == 0:
+            return
+
+        if count >= self.capacity:
+            self._data = np.zeros(self.capacity * 2, dtype=BAR_DTYPE)
+            self._data[:self.capacity] = data[-self.capacity:]
+            self._start = 0
+            self._end = self.capacity
+            return
+
+        if self._end + count > len(self._data):
+            keep = min(len(self), self.capacity - count)
+            data_before, self._data = self._data, np.zeros(self.capacity * 2, dtype=BAR_DTYPE)
+            self._data[:keep] = data_before[self._end - keep:self._end]
+            self._start = 0
+            self._end = keep
+
+        self._data[self._end:self._end + count] = data
+        self._end += count
+        self._start = max(self._start, self._end - self.capacity)
@@ -0,0 +1,187 @@
+"""
+Bars - Columnar OHLC container and MT5 record layouts shared across the bridge
+"""
+
+import logging
+from typing import Optional, Dict, Any, List
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Record layout returned by MetaTrader5.copy_rates_* functions
+BAR_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8')
+])
+
+# Record layout returned by MetaTrader5.copy_ticks_* functions
+TICK_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+    ('last', '<f8'),
+    ('volume', '<u8'),
+    ('time_msc', '<i8'),
+    ('flags', '<u4'),
+    ('volume_real', '<f8')
+])
+
+
+class Bars:
+    """
+    Columnar view over an MT5 rates array
+
+    Columns are exposed as NumPy views into the underlying structured
+    array, so no per-bar Python objects are ever created.
+    """
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: np.ndarray):
+        """
+        Wrap a structured rates array
+
+        Args:
+            data: Structured array with at least time/open/high/low/close fields
+        """
+        if data.dtype != BAR_DTYPE:
+            data = _coerce(data)
+        self._data = data
+
+    @classmethod
+    def empty(cls) -> 'Bars':
+        """Create an empty container"""
+        return cls(np.empty(0, dtype=BAR_DTYPE))
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> 'Bars':
+        """
+        Build bars from a list of per-bar dicts (legacy format)
+
+        Args:
+            records: List of dicts with time, open, high, low, close, volume
+
+        Returns:
+            Bars instance
+        """
+        data = np.zeros(len(records), dtype=BAR_DTYPE)
+        for field in ('time', 'open', 'high', 'low', 'close'):
+            data[field] = [record.get(field, 0) for record in records]
+        data['tick_volume'] = [record.get('volume', 0) for record in records]
+        return cls(data)
+
+    @property
+    def data(self) -> np.ndarray:
+        """Underlying structured array"""
+        return self._data
+
+    @property
+    def time(self) -> np.ndarray:
+        return self._data['time']
+
+    @property
+    def open(self) -> np.ndarray:
+        return self._data['open']
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._data['high']
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._data['low']
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._data['close']
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self._data['tick_volume']
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getitem__(self, index):
+        """Slices return Bars views, integer indexes return a single bar dict"""
+        if isinstance(index, slice):
+            return Bars(self._data[index])
+        return self.bar(index)
+
+    def bar(self, index: int) -> Dict[str, Any]:
+        """Get a single bar as a dict"""
+        rate = self._data[index]
+        return {
+            'time': int(rate['time']),
+            'open': float(rate['open']),
+            'high': float(rate['high']),
+            'low': float(rate['low']),
+            'close': float(rate['close']),
+            'volume': int(rate['tick_volume'])
+        }
+
+    def tail(self, count: int) -> 'Bars':
+        """Get a view of the last `count` bars"""
+        if count >= len(self._data):
+            return self
+        return Bars(self._data[len(self._data) - count:])
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Convert to a list of per-bar dicts (legacy format, copies)"""
+        return [self.bar(i) for i in range(len(self._data))]
+
+    def to_dataframe(self):
+        """
+        Get a pandas DataFrame over the columns
+
+        Returns:
+            DataFrame indexed by bar open time
+        """
+        import pandas as pd
+
+        frame = pd.DataFrame({
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'volume': self.volume
+        }, index=pd.to_datetime(self.time, unit='s'), copy=False)
+        frame.index.name = 'time'
+        return frame
+
+
+def as_bars(rates) -> Optional[Bars]:
+    """
+    Normalize rates input to Bars
+
+    Args:
+        rates: Bars, structured array or list of per-bar dicts
+
+    Returns:
+        Bars instance or None
+    """
+    if rates is None:
+        return None
+    if isinstance(rates, Bars):
+        return rates
+    if isinstance(rates, np.ndarray):
+        return Bars(rates)
+    return Bars.from_records(list(rates))
+
+
+def _coerce(data: np.ndarray) -> np.ndarray:
+    """Copy a structured array with a compatible layout into BAR_DTYPE"""
+    result = np.zeros(len(data), dtype=BAR_DTYPE)
+    for field in BAR_DTYPE.names:
+        if field in data.dtype.names:
+            result[field] = data[field]
+    if 'volume' in data.dtype.names and 'tick_volume' not in data.dtype.names:
+        result['tick_volume'] = data['volume']
+    return result
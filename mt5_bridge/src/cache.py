@@ -0,0 +1,148 @@
+"""
+Cache - Size-bounded LRU cache with per-entry TTL and statistics
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    LRU cache with per-entry expiry on a monotonic clock
+
+    Entries are evicted least-recently-used first once `max_size` is
+    reached. Expired entries are dropped on access.
+    """
+
+    def __init__(self, max_size: int = 1024, default_ttl: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize cache
+
+        Args:
+            max_size: Maximum number of entries
+            default_ttl: Time to live in seconds when none is given on put
+            clock: Monotonic time source
+        """
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a fresh value
+
+        Args:
+            key: Cache key
+            default: Value returned on miss
+
+        Returns:
+            Cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if self.clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Store a value
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time to live in seconds (default: default_ttl)
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+
+        with self._lock:
+            self._entries[key] = (value, self.clock() + ttl)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Remove a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Remove the entries whose key matches a predicate
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def purge(self) -> int:
+        """
+        Drop all expired entries
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            now = self.clock()
+            expired = [key for key, (_, expires_at) in self._entries.items() if now >= expires_at]
+            for key in expired:
+                del self._entries[key]
+            self.expirations += len(expired)
+            return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and self.clock() < entry[1]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': (self.hits / lookups * 100) if lookups else 0
+        }
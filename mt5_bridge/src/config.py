@@ -0,0 +1,56 @@
+"""
+Config - Loads the bridge configuration file
+"""
+
+import logging
+import os
+from typing import Any, Dict
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.yaml')
+
+
+def load_config(path: str = None) -> Dict[str, Any]:
+    """
+    Load configuration from YAML
+
+    Args:
+        path: Config file path (default: MT5_CONFIG env var, then config.yaml
+              next to the src directory)
+
+    Returns:
+        Configuration dict (empty if the file is missing)
+    """
+    path = path or os.getenv('MT5_CONFIG', DEFAULT_CONFIG_PATH)
+
+    try:
+        with open(path, 'r') as f:
+            config = yaml.safe_load(f) or {}
+        logger.info(f"Configuration loaded from {path}")
+        return config
+    except FileNotFoundError:
+        logger.warning(f"Config file not found: {path}. Using defaults.")
+        return {}
+
+
+def get_setting(config: Dict[str, Any], path: str, default: Any = None) -> Any:
+    """
+    Get a nested setting by dotted path
+
+    Args:
+        config: Configuration dict
+        path: Dotted path, e.g. 'performance.timeout'
+        default: Value returned if any part of the path is missing
+
+    Returns:
+        Setting value or default
+    """
+    value = config
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return default
+        value = value[part]
+    return value
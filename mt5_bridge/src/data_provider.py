@@ -3,27 +3,58 @@ Data Provider - Fetches and manages market data
 """
 
 import logging
+import threading
+import time
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 
+from bars import Bars
+from bar_buffer import BarBuffer
+from cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
+# Default time to live per data kind, in seconds
+DEFAULT_CACHE_TTLS = {
+    'tick': 1,
+    'ohlc': 5,
+    'account': 5,
+    'positions': 2
+}
+
 
 class DataProvider:
     """Provides market data from MT5"""
     
-    def __init__(self, mt5_connector):
+    def __init__(self, mt5_connector, history_size: int = 1000, cache_size: int = 1024,
+                 cache_ttls: Optional[Dict[str, float]] = None,
+                 ohlc_ttls: Optional[Dict[int, float]] = None, archive=None):
         """
         Initialize data provider
         
         Args:
             mt5_connector: MT5 connector instance
+            history_size: Number of bars kept per symbol/timeframe
+            cache_size: Maximum number of cached responses
+            cache_ttls: Time to live per data kind (tick, ohlc, account, positions)
+            ohlc_ttls: Time to live for OHLC data per timeframe, overriding cache_ttls['ohlc']
+            archive: BarArchive used to warm start and persist closed bars
         """
         self.mt5 = mt5_connector
-        self.cache = {}
-        self.cache_ttl = 5  # 5 seconds
+        self.cache_ttls = {**DEFAULT_CACHE_TTLS, **(cache_ttls or {})}
+        self.ohlc_ttls = ohlc_ttls or {}
+        self.cache = TTLCache(max_size=cache_size, default_ttl=self.cache_ttls['ohlc'])
+        self.history_size = history_size
+        self.buffers = {}
+        self.last_refresh = {}
+        self._lock = threading.Lock()
+        self.tick_stream = None
+        self.archive = archive
+        self.aggregators = {}
+        self._seeded = set()
+        self._archived = {}
     
-    def get_ohlc(self, symbol: str, timeframe: int, count: int = 100) -> Optional[List[Dict[str, Any]]]:
+    def get_ohlc(self, symbol: str, timeframe: int, count: int = 100) -> Optional[Bars]:
         """
         Get OHLC data
         
@@ -33,32 +64,221 @@ class DataProvider:
             count: Number of candles to fetch
             
         Returns:
-            List of OHLC candles or None
+            Columnar OHLC bars or None
         """
         try:
-            cache_key = f"{symbol}_{timeframe}"
+            aggregator = self.aggregators.get(symbol)
+            if aggregator is not None and aggregator.has(timeframe) and count <= aggregator.history_size:
+                return self._get_aggregated(aggregator, timeframe, count)
+            
+            cache_key = ('ohlc', symbol, timeframe, count)
             
             # Check cache
-            if cache_key in self.cache:
-                cached_data, cached_time = self.cache[cache_key]
-                if (datetime.now() - cached_time).seconds < self.cache_ttl:
-                    return cached_data
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Fetch from MT5
-            rates = self.mt5.get_rates(symbol, timeframe, count)
+            # Refresh history from MT5
+            return self._complete_refresh(self._request_refresh(symbol, timeframe, count))
             
+        except Exception as e:
+            logger.error(f"Error getting OHLC data: {str(e)}")
+            return None
+    
+    def invalidate_ohlc(self, symbol: str, timeframe: int):
+        """Drop cached OHLC responses of a symbol/timeframe, e.g. when a bar has just closed"""
+        self.cache.invalidate_where(lambda key: key[:3] == ('ohlc', symbol, timeframe))
+    
+    def attach_aggregator(self, aggregator):
+        """
+        Serve a symbol's OHLC data from a local bar aggregator
+        
+        Args:
+            aggregator: BarAggregator for the symbol
+        """
+        self.aggregators[aggregator.symbol] = aggregator
+    
+    def _get_aggregated(self, aggregator, timeframe: int, count: int) -> Optional[Bars]:
+        """
+        Get bars from a local aggregator, seeding its history from MT5 once
+        
+        Args:
+            aggregator: BarAggregator for the symbol
+            timeframe: Timeframe in minutes
+            count: Number of candles
+            
+        Returns:
+            Columnar OHLC bars or None
+        """
+        key = (aggregator.symbol, timeframe)
+        if key not in self._seeded and aggregator.size(timeframe) < count:
+            rates = self._complete_refresh(self._request_refresh(aggregator.symbol, timeframe, aggregator.history_size))
             if rates is None:
-                logger.warning(f"Failed to get rates for {symbol}")
                 return None
+            aggregator.seed(timeframe, rates)
+            self._seeded.add(key)
+        
+        return aggregator.bars(timeframe, count)
+    
+    def refresh_aggregates(self, symbols: Optional[List[str]] = None):
+        """
+        Feed new M1 bars from MT5 into the attached aggregators
+        
+        Used when aggregation is driven by M1 bars instead of ticks. Only
+        the bars that can have changed since the previous call are fetched.
+        
+        Args:
+            symbols: Symbols to refresh (default: all aggregated symbols)
+        """
+        now = time.monotonic()
+        requests = []
+        
+        for symbol in symbols or list(self.aggregators):
+            key = (symbol, 'M1')
+            elapsed = now - self.last_refresh.get(key, now)
+            count = min(self.history_size, int(elapsed // 60) + 2)
+            requests.append((symbol, key, self.mt5.request_rates(symbol, 1, count)))
+        
+        for symbol, key, future in requests:
+            try:
+                rates = future.result(self.mt5.timeout)
+                if rates is None:
+                    logger.warning(f"Failed to get M1 rates for {symbol}")
+                    continue
+                self.aggregators[symbol].on_m1_bars(rates)
+                self.last_refresh[key] = now
+            except Exception as e:
+                logger.error(f"Error refreshing aggregates for {symbol}: {str(e)}")
+    
+    def _request_refresh(self, symbol: str, timeframe: int, count: int) -> tuple:
+        """
+        Start bringing the bar history for a symbol/timeframe up to date
+        
+        Only bars newer than the stored last bar are requested from MT5.
+        On first use the history is loaded from the archive when available,
+        otherwise (or when more history is needed than the buffer holds) a
+        full fetch is done.
+        
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe in minutes
+            count: Number of candles the caller needs
             
-            # Cache the data
-            self.cache[cache_key] = (rates, datetime.now())
+        Returns:
+            Refresh plan to pass to _complete_refresh
+        """
+        key = (symbol, timeframe)
+        now = time.monotonic()
+        
+        with self._lock:
+            buffer = self.buffers.get(key)
+            if buffer is None or buffer.capacity < count:
+                buffer = BarBuffer(max(count, self.history_size))
+                self.buffers[key] = buffer
+            warm_start = len(buffer) == 0 and self.archive is not None
+        
+        # Read the archive outside the lock so other symbols keep refreshing
+        archived = self.archive.read(symbol, timeframe, buffer.capacity) if warm_start else None
+        
+        with self._lock:
+            fetch_count = buffer.capacity
+            if len(buffer) == 0 and archived is not None and len(archived) > 0:
+                buffer.reset(archived)
+                self._archived[key] = buffer.last_time
+                # Bar times are in server time, so allow a day of clock offset
+                period = timeframe * 60
+                behind = int((time.time() - buffer.last_time) // period) + 2 + 86400 // period
+                fetch_count = min(buffer.capacity, max(2, behind))
+            elif len(buffer) > 0:
+                # Bars closed since last refresh, plus the forming bar and one for overlap
+                elapsed = now - self.last_refresh.get(key, now)
+                fetch_count = min(buffer.capacity, int(elapsed // (timeframe * 60)) + 2)
+        
+        future = self.mt5.request_rates(symbol, timeframe, fetch_count)
+        return symbol, timeframe, count, buffer, fetch_count, future, now
+    
+    def _complete_refresh(self, plan: tuple) -> Optional[Bars]:
+        """
+        Merge the fetched bars into the history and cache the result
+        
+        Falls back to a full fetch when the incremental fetch leaves a gap.
+        
+        Args:
+            plan: Refresh plan from _request_refresh
             
-            return rates
+        Returns:
+            Columnar OHLC bars or None
+        """
+        symbol, timeframe, count, buffer, fetch_count, future, now = plan
+        key = (symbol, timeframe)
+        
+        rates = future.result(self.mt5.timeout)
+        if rates is None:
+            logger.warning(f"Failed to get rates for {symbol}")
+            return None
+        
+        with self._lock:
+            if fetch_count == buffer.capacity:
+                buffer.reset(rates)
+                gap = False
+            else:
+                gap = not buffer.merge(rates)
+        
+        if gap:
+            # Reload without holding the lock so other symbols keep refreshing
+            logger.info(f"Gap in {symbol} M{timeframe} history, reloading")
+            rates = self.mt5.request_rates(symbol, timeframe, buffer.capacity).result(self.mt5.timeout)
+            if rates is None:
+                logger.warning(f"Failed to get rates for {symbol}")
+                return None
+        
+        with self._lock:
+            if gap:
+                buffer.reset(rates)
+            self.last_refresh[key] = now
+            result = buffer.bars(count)
             
-        except Exception as e:
-            logger.error(f"Error getting OHLC data: {str(e)}")
+            closed = None
+            if self.archive is not None:
+                # Boolean indexing copies, so later buffer updates cannot reach the write
+                data = buffer.bars().data[:-1]
+                closed = Bars(data[data['time'] > self._archived.get(key, -1)])
+        
+        if closed is not None and len(closed) > 0:
+            self.archive.append(symbol, timeframe, closed)
+            self._archived[key] = max(self._archived.get(key, -1), int(closed.time[-1]))
+        
+        self.cache.put(
+            ('ohlc', symbol, timeframe, count), result,
+            self.ohlc_ttls.get(timeframe, self.cache_ttls['ohlc'])
+        )
+        return result
+    
+    def get_history(self, symbol: str, timeframe: int, date_from: Optional[int] = None,
+                    date_to: Optional[int] = None) -> Optional[Bars]:
+        """
+        Get archived history without touching MT5
+        
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe in minutes
+            date_from: Start time in seconds (default: first archived bar)
+            date_to: End time in seconds (default: last archived bar)
+            
+        Returns:
+            Bars backed by the archive file, or None without an archive
+        """
+        if self.archive is None:
             return None
+        
+        if date_from is None and date_to is None:
+            return self.archive.read(symbol, timeframe)
+        
+        return self.archive.read_range(
+            symbol, timeframe,
+            date_from if date_from is not None else 0,
+            date_to if date_to is not None else 2 ** 62
+        )
     
     def get_tick_data(self, symbol: str) -> Optional[Dict[str, Any]]:
         """
@@ -71,48 +291,90 @@ class DataProvider:
             Tick data or None
         """
         try:
+            # Streamed ticks are always at least as fresh as a poll
+            if self.tick_stream is not None:
+                tick = self.tick_stream.last_tick(symbol)
+                if tick is not None:
+                    return tick
+            
+            cache_key = ('tick', symbol)
+            
+            tick = self.cache.get(cache_key)
+            if tick is not None:
+                return tick
+            
             symbol_info = self.mt5.get_symbol_info(symbol)
             
             if symbol_info is None:
                 logger.warning(f"Failed to get symbol info for {symbol}")
                 return None
             
-            return {
+            tick = {
                 'symbol': symbol,
                 'bid': symbol_info['bid'],
                 'ask': symbol_info['ask'],
                 'spread': symbol_info['spread'],
                 'time': symbol_info['time']
             }
+            self.cache.put(cache_key, tick, self.cache_ttls['tick'])
+            
+            return tick
             
         except Exception as e:
             logger.error(f"Error getting tick data: {str(e)}")
             return None
     
-    def get_multiple_symbols(self, symbols: List[str], timeframe: int) -> Dict[str, List[Dict[str, Any]]]:
+    def get_multiple_symbols(self, symbols: List[str], timeframe: int, count: int = 100) -> Dict[str, Bars]:
         """
         Get OHLC data for multiple symbols
         
         Args:
             symbols: List of trading symbols
             timeframe: Timeframe in minutes
+            count: Number of candles per symbol
             
         Returns:
             Dictionary of symbol -> OHLC data
         """
         data = {}
+        plans = []
         
+        # Issue all terminal requests up front so they are queued back to back
         for symbol in symbols:
-            rates = self.get_ohlc(symbol, timeframe)
-            if rates:
+            if symbol in self.aggregators:
+                rates = self.get_ohlc(symbol, timeframe, count)
+                if rates:
+                    data[symbol] = rates
+                continue
+            
+            rates = self.cache.get(('ohlc', symbol, timeframe, count))
+            if rates is not None:
                 data[symbol] = rates
+                continue
+            try:
+                plans.append(self._request_refresh(symbol, timeframe, count))
+            except Exception as e:
+                logger.error(f"Error requesting OHLC data for {symbol}: {str(e)}")
+        
+        for plan in plans:
+            try:
+                rates = self._complete_refresh(plan)
+                if rates:
+                    data[plan[0]] = rates
+            except Exception as e:
+                logger.error(f"Error getting OHLC data for {plan[0]}: {str(e)}")
         
         return data
     
     def get_account_info(self) -> Optional[Dict[str, Any]]:
         """Get account information"""
         try:
-            return self.mt5.get_account_info()
+            account_info = self.cache.get(('account',))
+            if account_info is None:
+                account_info = self.mt5.get_account_info()
+                if account_info is not None:
+                    self.cache.put(('account',), account_info, self.cache_ttls['account'])
+            return account_info
         except Exception as e:
             logger.error(f"Error getting account info: {str(e)}")
             return None
@@ -120,7 +382,12 @@ class DataProvider:
     def get_positions(self) -> Optional[List[Dict[str, Any]]]:
         """Get open positions"""
         try:
-            return self.mt5.get_positions()
+            positions = self.cache.get(('positions',))
+            if positions is None:
+                positions = self.mt5.get_positions()
+                if positions is not None:
+                    self.cache.put(('positions',), positions, self.cache_ttls['positions'])
+            return positions
         except Exception as e:
             logger.error(f"Error getting positions: {str(e)}")
             return None
@@ -128,8 +395,17 @@ class DataProvider:
     def clear_cache(self):
         """Clear data cache"""
         self.cache.clear()
+        self.buffers.clear()
+        self.last_refresh.clear()
+        self._seeded.clear()
         logger.info("Data cache cleared")
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss/eviction statistics"""
+        stats = self.cache.get_stats()
+        stats['bar_buffers'] = len(self.buffers)
+        return stats
+    
     def get_market_status(self) -> Dict[str, Any]:
         """Get market status"""
         try:
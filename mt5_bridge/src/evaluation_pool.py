@@ -0,0 +1,406 @@
+"""
+Evaluation Pool - Live strategy evaluation sharded across worker processes
+"""
+
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+
+import numpy as np
+
+from bars import BAR_DTYPE, Bars
+from indicator_graph import IndicatorEngine
+from lookback_planner import strategy_views
+
+logger = logging.getLogger(__name__)
+
+# Compact signal record returned by workers
+SIGNAL_DTYPE = np.dtype([
+    ('series', '<i4'),
+    ('strategy', '<i2'),
+    ('action', 'i1'),
+    ('confidence', '<f8'),
+    ('entry_price', '<f8'),
+    ('take_profit', '<f8'),
+    ('stop_loss', '<f8')
+])
+
+ACTIONS = {'BUY': 1, 'SELL': -1}
+ACTION_NAMES = {code: action for action, code in ACTIONS.items()}
+
+SHARD_KEYS = ('symbol', 'strategy')
+
+
+class _Worker:
+    """One evaluation process and the shared-memory block it reads bars from"""
+
+    def __init__(self, index: int, slots: Dict[int, Tuple[int, int, str, int, List[int]]],
+                 strategies: Dict[int, Any]):
+        """
+        Initialize worker (not started)
+
+        Args:
+            index: Worker number
+            slots: Series id -> (offset, capacity, symbol, timeframe, strategy ids) in the block
+            strategies: Strategy id -> instance evaluated by this worker
+        """
+        self.index = index
+        self.slots = slots
+        self.strategies = strategies
+        self.size = sum(slot[1] for slot in slots.values())
+        self.block = shared_memory.SharedMemory(create=True, size=max(self.size * BAR_DTYPE.itemsize, 1))
+        self.data = np.ndarray(self.size, dtype=BAR_DTYPE, buffer=self.block.buf)
+        self.process = None
+        self.connection = None
+
+    def start(self, context):
+        """Start (or restart) the process"""
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=_serve,
+            args=(child, self.block.name, self.size, self.slots, self.strategies),
+            name=f'evaluator-{self.index}',
+            daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def ready(self, timeout: float) -> bool:
+        """Wait for the process to attach its block and import the strategies"""
+        try:
+            if self.connection.poll(timeout):
+                self.connection.recv()
+                return True
+        except (EOFError, OSError):
+            pass
+        logger.error(f"Evaluation worker {self.index} failed to start")
+        return False
+
+    def stop(self, timeout: float):
+        """Ask the process to exit, terminating it if it does not"""
+        if self.process is None:
+            return
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.connection.close()
+        self.process = None
+
+    def release(self):
+        """Remove the shared-memory block"""
+        del self.data
+        self.block.close()
+        self.block.unlink()
+
+
+class EvaluationPool:
+    """
+    Evaluates strategies in worker processes, sharded by symbol or strategy
+
+    Every symbol/timeframe a worker evaluates has a fixed slot in a
+    shared-memory block owned by that worker. For a bar event the bridge
+    copies the latest bars into the slots and sends each worker only the
+    slot ids and lengths; workers slice each strategy's lookback as a Bars
+    view straight out of shared memory and reply with SIGNAL_DTYPE records. Each worker evaluates its
+    series with evaluate_series() through its own IndicatorEngine. Workers
+    run in parallel, and a worker that crashes or stops answering is
+    restarted and its shard retried once, without stopping the bridge.
+
+    Signals decoded from records carry no 'indicators' details.
+    """
+
+    def __init__(self, planner, workers: int = 2, shard_by: str = 'symbol', timeout: float = 10.0):
+        """
+        Initialize pool
+
+        Args:
+            planner: LookbackPlanner with the strategies registered per symbol/timeframe
+            workers: Number of worker processes
+            shard_by: 'symbol' (each worker owns some symbols) or 'strategy' (some strategies)
+            timeout: Seconds to wait for a worker's reply before restarting it
+        """
+        if shard_by not in SHARD_KEYS:
+            raise ValueError(f"Unknown shard key: {shard_by}")
+
+        self.planner = planner
+        self.workers = workers
+        self.shard_by = shard_by
+        self.timeout = timeout
+
+        self._context = multiprocessing.get_context('spawn')
+        self._pool = []
+        self._series = []
+        self._names = []
+        self._labels = {}
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'evaluations': 0,
+            'series': 0,
+            'signals': 0,
+            'restarts': 0,
+            'failures': 0,
+            'last_time': 0.0,
+            'max_time': 0.0
+        }
+
+    def start(self):
+        """Lay out the shared slots and start the workers"""
+        plan = self.planner.plan()
+        self._series = sorted(plan)
+        strategies = {}
+        for symbol, timeframe in self._series:
+            strategies.update(self.planner.strategies(symbol, timeframe))
+        self._names = sorted(strategies)
+        symbols = sorted({symbol for symbol, _ in self._series})
+
+        for index in range(self.workers):
+            slots, used, offset = {}, set(), 0
+            for series, (symbol, timeframe) in enumerate(self._series):
+                names = self.planner.strategies(symbol, timeframe)
+                if self.shard_by == 'symbol':
+                    owned = list(names) if symbols.index(symbol) % self.workers == index else []
+                else:
+                    owned = [name for name in names if self._names.index(name) % self.workers == index]
+                if not owned:
+                    continue
+
+                ids = [self._names.index(name) for name in owned]
+                slots[series] = (offset, plan[(symbol, timeframe)], symbol, timeframe, ids)
+                offset += plan[(symbol, timeframe)]
+                used.update(ids)
+
+            if slots:
+                owned_strategies = {strategy_id: strategies[self._names[strategy_id]] for strategy_id in used}
+                worker = _Worker(index, slots, owned_strategies)
+                worker.start(self._context)
+                self._pool.append(worker)
+
+        for worker in self._pool:
+            worker.ready(self.timeout)
+
+        logger.info(f"Evaluation pool started: {len(self._pool)} workers, "
+                    f"{len(self._series)} series sharded by {self.shard_by}")
+
+    def stop(self):
+        """Stop the workers and remove their shared memory"""
+        with self._lock:
+            for worker in self._pool:
+                worker.stop(self.timeout)
+                worker.release()
+            self._pool = []
+        logger.info("Evaluation pool stopped")
+
+    def evaluate(self, histories: Dict[Tuple[str, int], Bars]) -> List[Dict[str, Any]]:
+        """
+        Run the strategies registered on each given symbol/timeframe over its bars
+
+        Args:
+            histories: Dictionary of (symbol, timeframe) -> bars (most recent last)
+
+        Returns:
+            List of signals, each tagged with its timeframe
+        """
+        with self._lock:
+            started = time.monotonic()
+            batches = {}
+            for worker in self._pool:
+                batch = self._write(worker, histories)
+                if batch and self._send(worker, batch):
+                    batches[worker.index] = batch
+
+            signals = []
+            for worker in self._pool:
+                if worker.index in batches:
+                    signals.extend(self._collect(worker, batches[worker.index]))
+
+            elapsed = time.monotonic() - started
+            self.stats['evaluations'] += 1
+            self.stats['series'] += sum(len(batch) for batch in batches.values())
+            self.stats['signals'] += len(signals)
+            self.stats['last_time'] = elapsed
+            self.stats['max_time'] = max(self.stats['max_time'], elapsed)
+            return signals
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        return {
+            **self.stats,
+            'workers': len(self._pool),
+            'alive': sum(1 for worker in self._pool if worker.process and worker.process.is_alive())
+        }
+
+    def _write(self, worker: _Worker, histories: Dict[Tuple[str, int], Bars]) -> List[Tuple[int, int]]:
+        """Copy the latest bars of a worker's series into its slots"""
+        batch = []
+        for series, (offset, capacity, _, _, _) in worker.slots.items():
+            bars = histories.get(self._series[series])
+            if bars is None:
+                continue
+            length = min(len(bars), capacity)
+            worker.data[offset:offset + length] = bars.data[len(bars) - length:]
+            batch.append((series, length))
+        return batch
+
+    def _send(self, worker: _Worker, batch: List[Tuple[int, int]]) -> bool:
+        """Send a batch, restarting the worker once if its pipe is broken"""
+        for attempt in range(2):
+            try:
+                worker.connection.send(batch)
+                return True
+            except (OSError, ValueError) as e:
+                logger.error(f"Evaluation worker {worker.index} unreachable: {str(e)}")
+                self._restart(worker)
+        self.stats['failures'] += 1
+        return False
+
+    def _collect(self, worker: _Worker, batch: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """Wait for a worker's reply; restart it and retry once if it crashed or timed out"""
+        for attempt in range(2):
+            try:
+                deadline = time.monotonic() + self.timeout
+                while worker.connection.poll(max(0.0, deadline - time.monotonic())):
+                    message = worker.connection.recv()
+                    if isinstance(message, str):
+                        # Late start-up handshake
+                        continue
+                    records, labels = message
+                    self._labels.update(labels)
+                    return self._decode(records)
+                logger.error(f"Evaluation worker {worker.index} timed out")
+            except (EOFError, OSError) as e:
+                logger.error(f"Evaluation worker {worker.index} crashed: {str(e) or 'connection closed'}")
+
+            self._restart(worker)
+            if attempt == 0 and not self._send(worker, batch):
+                break
+
+        self.stats['failures'] += 1
+        logger.error(f"Evaluation worker {worker.index} skipped {len(batch)} series")
+        return []
+
+    def _restart(self, worker: _Worker):
+        """Replace a worker's process (the shared block is kept)"""
+        if worker.process is not None and worker.process.is_alive():
+            worker.process.terminate()
+        if worker.process is not None:
+            worker.process.join()
+            worker.connection.close()
+        worker.start(self._context)
+        worker.ready(self.timeout)
+        self.stats['restarts'] += 1
+        logger.warning(f"Evaluation worker {worker.index} restarted")
+
+    def _decode(self, records: np.ndarray) -> List[Dict[str, Any]]:
+        """Turn SIGNAL_DTYPE records back into signal dicts"""
+        signals = []
+        for record in records:
+            symbol, timeframe = self._series[record['series']]
+            signals.append({
+                'strategy': self._labels.get(int(record['strategy']), self._names[record['strategy']]),
+                'symbol': symbol,
+                'action': ACTION_NAMES[int(record['action'])],
+                'confidence': float(record['confidence']),
+                'entry_price': float(record['entry_price']),
+                'take_profit': float(record['take_profit']),
+                'stop_loss': float(record['stop_loss']),
+                'timeframe': timeframe
+            })
+        return signals
+
+
+def _serve(connection, block_name: str, size: int, slots: Dict[int, Tuple[int, int, str, int, List[int]]],
+           strategies: Dict[int, Any]):
+    """Worker process: evaluate batches of slots until told to stop"""
+    # Ctrl+C reaches the whole process group; the bridge stops workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    block = shared_memory.SharedMemory(name=block_name)
+    data = np.ndarray(size, dtype=BAR_DTYPE, buffer=block.buf)
+    engine = IndicatorEngine()
+    labels = {}
+    try:
+        connection.send('ready')
+        while True:
+            batch = connection.recv()
+            if batch is None:
+                break
+            connection.send(_evaluate(data, slots, strategies, engine, batch, labels))
+    except EOFError:
+        pass
+    finally:
+        del data
+        block.close()
+
+
+def _evaluate(data: np.ndarray, slots: Dict[int, Tuple[int, int, str, int, List[int]]], strategies: Dict[int, Any],
+              engine: IndicatorEngine, batch: List[Tuple[int, int]],
+              labels: Dict[int, str]) -> Tuple[np.ndarray, Dict[int, str]]:
+    """
+    Evaluate a batch of slots (in a worker)
+
+    Returns:
+        Tuple of (SIGNAL_DTYPE records, strategy labels not sent before)
+    """
+    ids, inputs = {}, []
+    for series, length in batch:
+        offset, _, symbol, timeframe, strategy_ids = slots[series]
+        ids[(symbol, timeframe)] = series
+        owned = {strategy_id: strategies[strategy_id] for strategy_id in strategy_ids}
+        for strategy_id, view in strategy_views(owned, Bars(data[offset:offset + length])).items():
+            inputs.append((symbol, timeframe, view, {strategy_id: owned[strategy_id]}))
+
+    records, new_labels = [], {}
+    for symbol, timeframe, strategy_id, result in evaluate_series(engine, inputs):
+        if strategy_id not in labels:
+            labels[strategy_id] = new_labels[strategy_id] = result['strategy']
+        records.append((ids[(symbol, timeframe)], strategy_id, ACTIONS[result['action']], result['confidence'],
+                        result['entry_price'], result['take_profit'], result['stop_loss']))
+    return np.array(records, dtype=SIGNAL_DTYPE), new_labels
+
+
+def evaluate_series(engine: IndicatorEngine, series: Iterable[Tuple[str, int, Bars, Dict[Hashable, Any]]]
+                    ) -> List[Tuple[str, int, Hashable, Dict[str, Any]]]:
+    """
+    Run strategies over many symbols/timeframes with one analyze_batch() call per group
+
+    Series of the same timeframe and length with the same strategies are
+    stacked into a closes matrix (symbols x bars). Their indicators are
+    resolved once for the whole group through the engine, and each
+    strategy then decides for every symbol of the group in one call.
+
+    Args:
+        engine: IndicatorEngine caching indicator values per symbol/timeframe
+        series: (symbol, timeframe, bars, strategies by key) per series,
+                e.g. one per strategy from LookbackPlanner.series()
+
+    Returns:
+        List of (symbol, timeframe, strategy key, signal)
+    """
+    groups = {}
+    for symbol, timeframe, bars, strategies in series:
+        if len(bars) == 0 or not strategies:
+            continue
+        key = (timeframe, len(bars), tuple(sorted(strategies)))
+        groups.setdefault(key, ([], [], strategies))
+        groups[key][0].append(symbol)
+        groups[key][1].append(bars)
+
+    results = []
+    for (timeframe, _, _), (symbols, histories, strategies) in groups.items():
+        closes = np.stack([bars.close for bars in histories])
+        for key, strategy in strategies.items():
+            indicators = engine.resolve_batch(symbols, timeframe, histories, strategy.indicators)
+            for symbol, signal in zip(symbols, strategy.analyze_batch(closes, symbols, indicators=indicators)):
+                if signal:
+                    results.append((symbol, timeframe, key, signal))
+    return results
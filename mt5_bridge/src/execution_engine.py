@@ -23,12 +23,13 @@ class ExecutionEngine:
         self.executed_trades = {}
         self.trade_counter = 0
     
-    def execute(self, signal: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def execute(self, signal: Dict[str, Any], snapshot=None) -> Optional[Dict[str, Any]]:
         """
         Execute a trading signal
         
         Args:
             signal: Trading signal with entry, SL, TP
+            snapshot: AccountSnapshot to size the order from (default: ask the terminal)
             
         Returns:
             Trade execution result or None
@@ -37,10 +38,11 @@ class ExecutionEngine:
             logger.info(f"📊 Executing {signal['action']} signal for {signal['symbol']}")
             
             # Send order to MT5
+            volume = self._calculate_volume(signal, snapshot)
             ticket = self.mt5.send_order(
                 symbol=signal['symbol'],
                 order_type=signal['action'],
-                volume=self._calculate_volume(signal),
+                volume=volume,
                 price=signal['entry_price'],
                 sl=signal['stop_loss'],
                 tp=signal['take_profit'],
@@ -60,6 +62,7 @@ class ExecutionEngine:
                 'entry_price': signal['entry_price'],
                 'stop_loss': signal['stop_loss'],
                 'take_profit': signal['take_profit'],
+                'volume': volume,
                 'confidence': signal['confidence'],
                 'executed_at': datetime.now().isoformat(),
                 'status': 'open'
@@ -96,8 +99,7 @@ class ExecutionEngine:
             trade_record = self.executed_trades[ticket]
             
             # Get volume from trade record
-            # In real implementation, would get from MT5
-            volume = 0.1  # Default volume
+            volume = trade_record.get('volume', 0.1)
             
             # Close order on MT5
             result = self.mt5.close_order(
@@ -133,19 +135,23 @@ class ExecutionEngine:
             logger.error(f"Error closing trade: {str(e)}")
             return None
     
-    def _calculate_volume(self, signal: Dict[str, Any]) -> float:
+    def _calculate_volume(self, signal: Dict[str, Any], snapshot=None) -> float:
         """
         Calculate trade volume based on risk
         
         Args:
             signal: Trading signal
+            snapshot: AccountSnapshot to read the balance from
             
         Returns:
             Volume to trade
         """
         try:
-            # Get account info
-            account_info = self.mt5.get_account_info()
+            if snapshot is not None:
+                account_info = snapshot.account
+            else:
+                # Get account info (shares any in-flight account request)
+                account_info = self.mt5.request_account_info().result(self.mt5.timeout)
             if not account_info:
                 return 0.1  # Default
             
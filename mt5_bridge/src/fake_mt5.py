@@ -0,0 +1,473 @@
+"""
+Fake MT5 - In-process stand-in for the MetaTrader5 module
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Dict, Optional
+import numpy as np
+
+from market_simulator import MarketSimulator, to_usd
+
+logger = logging.getLogger(__name__)
+
+AccountInfo = namedtuple('AccountInfo', [
+    'login', 'name', 'server', 'currency', 'balance', 'credit', 'equity',
+    'margin', 'margin_free', 'margin_level', 'leverage', 'profit'
+])
+
+SymbolInfo = namedtuple('SymbolInfo', [
+    'name', 'bid', 'ask', 'point', 'digits', 'spread', 'volume', 'time',
+    'trade_contract_size', 'volume_min', 'volume_max', 'volume_step'
+])
+
+Tick = namedtuple('Tick', ['time', 'bid', 'ask', 'last', 'volume', 'time_msc', 'flags', 'volume_real'])
+
+TradePosition = namedtuple('TradePosition', [
+    'ticket', 'time', 'time_msc', 'type', 'magic', 'identifier', 'volume',
+    'price_open', 'sl', 'tp', 'price_current', 'swap', 'profit', 'symbol', 'comment'
+])
+
+TradeDeal = namedtuple('TradeDeal', [
+    'ticket', 'order', 'time', 'time_msc', 'type', 'entry', 'position_id',
+    'volume', 'price', 'profit', 'symbol', 'comment', 'reason'
+])
+
+OrderSendResult = namedtuple('OrderSendResult', [
+    'retcode', 'deal', 'order', 'volume', 'price', 'bid', 'ask', 'comment', 'request_id', 'request'
+])
+
+
+class FakeMT5:
+    """
+    Simulated MetaTrader 5 terminal
+
+    Implements the part of the MetaTrader5 module API the connector uses,
+    with the same constants, return types and error conventions (None plus
+    last_error()). Quotes come from a MarketSimulator. Market orders fill
+    at the current bid/ask and become positions; stop loss and take profit
+    are checked against every simulated tick since the previous call, so
+    positions close on the tick that crosses their level. Balance, equity
+    and margin follow the open positions.
+
+    Latency, jitter and order rejections can be injected to exercise the
+    bridge under realistic terminal behaviour. All randomness is seeded.
+    """
+
+    TIMEFRAME_M1 = 1
+    TIMEFRAME_M5 = 5
+    TIMEFRAME_M15 = 15
+    TIMEFRAME_M30 = 30
+    TIMEFRAME_H1 = 16385
+    TIMEFRAME_H4 = 16388
+    TIMEFRAME_D1 = 16408
+
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    POSITION_TYPE_BUY = 0
+    POSITION_TYPE_SELL = 1
+    DEAL_TYPE_BUY = 0
+    DEAL_TYPE_SELL = 1
+    DEAL_ENTRY_IN = 0
+    DEAL_ENTRY_OUT = 1
+    DEAL_REASON_CLIENT = 0
+    DEAL_REASON_SL = 4
+    DEAL_REASON_TP = 5
+
+    TRADE_ACTION_DEAL = 1
+    ORDER_TIME_GTC = 0
+    ORDER_FILLING_FOK = 0
+    ORDER_FILLING_IOC = 1
+    COPY_TICKS_ALL = -1
+
+    TRADE_RETCODE_REQUOTE = 10004
+    TRADE_RETCODE_REJECT = 10006
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_INVALID = 10013
+    TRADE_RETCODE_INVALID_VOLUME = 10014
+    TRADE_RETCODE_INVALID_STOPS = 10016
+    TRADE_RETCODE_MARKET_CLOSED = 10018
+    TRADE_RETCODE_NO_MONEY = 10019
+    TRADE_RETCODE_POSITION_CLOSED = 10036
+
+    RES_S_OK = 1
+    RES_E_NOT_FOUND = -5
+    RES_E_INTERNAL_FAIL_INIT = -10003
+
+    def __init__(self, simulator: Optional[MarketSimulator] = None, balance: float = 10000.0,
+                 leverage: int = 100, latency: Optional[Dict[str, float]] = None,
+                 jitter: float = 0.0, reject_rate: float = 0.0, requote_rate: float = 0.0,
+                 seed: int = 0):
+        """
+        Initialize fake terminal
+
+        Args:
+            simulator: Market simulator providing quotes (default: seeded simulator)
+            balance: Starting account balance in USD
+            leverage: Account leverage
+            latency: Base delay in seconds per function name, with a 'default' entry
+                     (e.g. {'default': 0.001, 'order_send': 0.02})
+            jitter: Mean of an exponentially distributed extra delay per call, in seconds
+            reject_rate: Probability that an order is rejected
+            requote_rate: Probability that an order is requoted
+            seed: Seed for latency and rejection draws
+        """
+        self.simulator = simulator if simulator is not None else MarketSimulator()
+        self.leverage = leverage
+        self.latency = {'default': 0.0, **(latency or {})}
+        self.jitter = jitter
+        self.reject_rate = reject_rate
+        self.requote_rate = requote_rate
+
+        self.balance = balance
+        self.positions = {}
+        self.deals = []
+        self.initialized = False
+        self.calls = {}
+
+        self._rng = np.random.default_rng(seed)
+        self._next_ticket = 100000
+        self._checked_msc = {}
+        self._error = (self.RES_S_OK, 'Success')
+        self._lock = threading.RLock()
+        self._timeframes = {
+            getattr(self, name): int(name[11:]) * {'M': 1, 'H': 60, 'D': 1440}[name[10]]
+            for name in dir(self) if name.startswith('TIMEFRAME_')
+        }
+
+    # Session
+
+    def initialize(self, *args, **kwargs) -> bool:
+        """Start the terminal connection"""
+        self._call('initialize')
+        self.initialized = True
+        self._error = (self.RES_S_OK, 'Success')
+        return True
+
+    def login(self, login: int, password: str = '', server: str = '', timeout: int = 60000) -> bool:
+        """Log in to a trading account"""
+        self._call('login')
+        return self.initialized
+
+    def shutdown(self) -> bool:
+        """Close the terminal connection"""
+        self._call('shutdown')
+        self.initialized = False
+        return True
+
+    def last_error(self) -> tuple:
+        """Code and description of the last error"""
+        return self._error
+
+    # Market data
+
+    def account_info(self) -> Optional[AccountInfo]:
+        """Account balance, equity and margin"""
+        if not self._call('account_info'):
+            return None
+
+        with self._lock:
+            self._check_stops()
+            state = self._account_state()
+
+        equity, margin, profit = state['equity'], state['margin'], state['profit']
+        return AccountInfo(
+            login=12345678, name='Demo Account', server='Demo Server', currency='USD',
+            balance=round(self.balance, 2), credit=0.0, equity=round(equity, 2),
+            margin=round(margin, 2), margin_free=round(equity - margin, 2),
+            margin_level=round(equity / margin * 100, 2) if margin else 0.0,
+            leverage=self.leverage, profit=round(profit, 2)
+        )
+
+    def symbol_info(self, symbol: str) -> Optional[SymbolInfo]:
+        """Symbol specification with the current quote"""
+        if not self._call('symbol_info'):
+            return None
+
+        profile = self.simulator.profile(symbol)
+        tick = self.simulator.tick(symbol)
+        return SymbolInfo(
+            name=symbol, bid=tick['bid'], ask=tick['ask'], point=profile['point'],
+            digits=profile['digits'],
+            spread=int(round((tick['ask'] - tick['bid']) / profile['point'])),
+            volume=0, time=tick['time'], trade_contract_size=profile['contract_size'],
+            volume_min=0.01, volume_max=100.0, volume_step=0.01
+        )
+
+    def symbol_info_tick(self, symbol: str) -> Optional[Tick]:
+        """Most recent tick"""
+        if not self._call('symbol_info_tick'):
+            return None
+
+        tick = self.simulator.tick(symbol)
+        return Tick(time=tick['time'], bid=tick['bid'], ask=tick['ask'], last=0.0, volume=0,
+                    time_msc=tick['time_msc'], flags=6, volume_real=0.0)
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int) -> Optional[np.ndarray]:
+        """Bars counted back from the current one"""
+        if not self._call('copy_rates_from_pos'):
+            return None
+
+        minutes = self._timeframes.get(timeframe)
+        if minutes is None:
+            return self._fail(self.RES_E_NOT_FOUND, 'Invalid timeframe')
+
+        data = self.simulator.rates(symbol, minutes, start_pos + count).data
+        return data[:len(data) - start_pos].copy()
+
+    def copy_rates_range(self, symbol: str, timeframe: int, date_from, date_to) -> Optional[np.ndarray]:
+        """Bars with open time in [date_from, date_to]"""
+        if not self._call('copy_rates_range'):
+            return None
+
+        minutes = self._timeframes.get(timeframe)
+        if minutes is None:
+            return self._fail(self.RES_E_NOT_FOUND, 'Invalid timeframe')
+
+        return self.simulator.rates_range(symbol, minutes, _seconds(date_from), _seconds(date_to)).data.copy()
+
+    def copy_ticks_from(self, symbol: str, date_from, count: int, flags: int) -> Optional[np.ndarray]:
+        """Up to `count` ticks starting at date_from"""
+        if not self._call('copy_ticks_from'):
+            return None
+
+        return self.simulator.ticks(symbol, _seconds(date_from) * 1000 - 1)[:count]
+
+    # Trading
+
+    def positions_get(self, symbol: Optional[str] = None, ticket: Optional[int] = None) -> Optional[tuple]:
+        """Open positions, optionally filtered by symbol or ticket"""
+        if not self._call('positions_get'):
+            return None
+
+        with self._lock:
+            self._check_stops()
+            return tuple(
+                self._snapshot(position) for position in self.positions.values()
+                if (symbol is None or position['symbol'] == symbol)
+                and (ticket is None or position['ticket'] == ticket)
+            )
+
+    def positions_total(self) -> int:
+        """Number of open positions"""
+        return len(self.positions_get() or ())
+
+    def history_deals_get(self, *args, **kwargs) -> tuple:
+        """All deals executed so far"""
+        self._call('history_deals_get')
+        with self._lock:
+            return tuple(self.deals)
+
+    def order_send(self, request: Dict[str, Any]) -> Optional[OrderSendResult]:
+        """
+        Execute a market order
+
+        A request with a 'position' ticket closes (part of) that position;
+        any other deal opens a new position.
+        """
+        if not self._call('order_send'):
+            return None
+
+        with self._lock:
+            self._check_stops()
+
+            symbol = request.get('symbol', '')
+            tick = self.simulator.tick(symbol)
+
+            def result(retcode: int, comment: str, ticket: int = 0, volume: float = 0.0,
+                       price: float = 0.0) -> OrderSendResult:
+                return OrderSendResult(retcode=retcode, deal=ticket, order=ticket, volume=volume,
+                                       price=price, bid=tick['bid'], ask=tick['ask'],
+                                       comment=comment, request_id=0, request=request)
+
+            if request.get('action') != self.TRADE_ACTION_DEAL or request.get('type') not in (
+                    self.ORDER_TYPE_BUY, self.ORDER_TYPE_SELL):
+                return result(self.TRADE_RETCODE_INVALID, 'Invalid request')
+
+            volume = float(request.get('volume', 0.0))
+            if volume < 0.01 or volume > 100.0 or abs(round(volume / 0.01) * 0.01 - volume) > 1e-9:
+                return result(self.TRADE_RETCODE_INVALID_VOLUME, 'Invalid volume')
+
+            if not self.simulator.is_open():
+                return result(self.TRADE_RETCODE_MARKET_CLOSED, 'Market closed')
+
+            draw = self._rng.random()
+            if draw < self.reject_rate:
+                return result(self.TRADE_RETCODE_REJECT, 'Request rejected')
+            if draw < self.reject_rate + self.requote_rate:
+                return result(self.TRADE_RETCODE_REQUOTE, 'Requote')
+
+            is_buy = request['type'] == self.ORDER_TYPE_BUY
+            price = tick['ask'] if is_buy else tick['bid']
+
+            if request.get('position'):
+                position = self.positions.get(request['position'])
+                if position is None:
+                    return result(self.TRADE_RETCODE_POSITION_CLOSED, 'Position doesn\'t exist')
+                if position['type'] == request['type']:
+                    return result(self.TRADE_RETCODE_INVALID, 'Invalid request')
+
+                volume = min(volume, position['volume'])
+                deal = self._close(position, volume, price, self.DEAL_REASON_CLIENT)
+                return result(self.TRADE_RETCODE_DONE, 'Request executed', deal, volume, price)
+
+            sl = float(request.get('sl') or 0.0)
+            tp = float(request.get('tp') or 0.0)
+            exit_price = tick['bid'] if is_buy else tick['ask']
+            if (sl and (sl >= exit_price if is_buy else sl <= exit_price)) or \
+                    (tp and (tp <= exit_price if is_buy else tp >= exit_price)):
+                return result(self.TRADE_RETCODE_INVALID_STOPS, 'Invalid stops')
+
+            position = {
+                'ticket': self._ticket(), 'symbol': symbol, 'type': request['type'],
+                'volume': volume, 'price_open': price, 'sl': sl, 'tp': tp,
+                'time_msc': tick['time_msc'], 'magic': int(request.get('magic', 0)),
+                'comment': request.get('comment', '')
+            }
+
+            account = self._account_state()
+            if self._margin(position) > account['equity'] - account['margin']:
+                return result(self.TRADE_RETCODE_NO_MONEY, 'No money')
+
+            if not any(p['symbol'] == symbol for p in self.positions.values()):
+                # Nothing to check before this position's open
+                self._checked_msc[symbol] = tick['time_msc']
+            self.positions[position['ticket']] = position
+            self._record_deal(position, volume, price, self.DEAL_ENTRY_IN, 0.0, self.DEAL_REASON_CLIENT)
+            return result(self.TRADE_RETCODE_DONE, 'Request executed', position['ticket'], volume, price)
+
+    # Internals
+
+    def _call(self, name: str) -> bool:
+        """Count and delay a call; False if the terminal is not initialized"""
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+        delay = self.latency.get(name, self.latency['default'])
+        if self.jitter:
+            delay += self._rng.exponential(self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if not self.initialized and name not in ('initialize', 'shutdown'):
+            self._fail(self.RES_E_INTERNAL_FAIL_INIT, 'Terminal not initialized')
+            return False
+        return True
+
+    def _fail(self, code: int, message: str) -> None:
+        """Record an error and return None like the terminal does"""
+        self._error = (code, message)
+        return None
+
+    def _ticket(self) -> int:
+        """Next order/position/deal ticket"""
+        self._next_ticket += 1
+        return self._next_ticket
+
+    def _check_stops(self):
+        """Close positions whose stop loss or take profit was crossed by any tick since the last check"""
+        now_msc = int(self.simulator.now() * 1000)
+        symbols = {position['symbol'] for position in self.positions.values()}
+
+        for symbol in symbols:
+            since = self._checked_msc.get(symbol, now_msc)
+            self._checked_msc[symbol] = now_msc
+            if since >= now_msc:
+                continue
+
+            ticks = self.simulator.ticks(symbol, since, now_msc)
+            if len(ticks) == 0:
+                continue
+
+            for position in [p for p in self.positions.values() if p['symbol'] == symbol]:
+                is_buy = position['type'] == self.POSITION_TYPE_BUY
+                prices = ticks['bid'] if is_buy else ticks['ask']
+                direction = 1.0 if is_buy else -1.0
+
+                # Adverse move below the stop, favourable move beyond the target
+                hits = np.zeros(len(ticks), dtype=bool)
+                if position['sl']:
+                    hits |= direction * (prices - position['sl']) <= 0
+                if position['tp']:
+                    hits |= direction * (prices - position['tp']) >= 0
+                hits &= ticks['time_msc'] > position['time_msc']
+                if not hits.any():
+                    continue
+
+                index = int(np.argmax(hits))
+                price = float(prices[index])
+                stopped = position['sl'] and direction * (price - position['sl']) <= 0
+                self._close(position, position['volume'], price,
+                            self.DEAL_REASON_SL if stopped else self.DEAL_REASON_TP,
+                            int(ticks['time_msc'][index]))
+
+    def _close(self, position: Dict[str, Any], volume: float, price: float, reason: int,
+               time_msc: Optional[int] = None) -> int:
+        """Close (part of) a position and book its profit"""
+        profit = self._profit(position, price, volume)
+        self.balance += profit
+
+        position['volume'] = round(position['volume'] - volume, 2)
+        if position['volume'] <= 0:
+            del self.positions[position['ticket']]
+
+        return self._record_deal(position, volume, price, self.DEAL_ENTRY_OUT, profit, reason, time_msc)
+
+    def _record_deal(self, position: Dict[str, Any], volume: float, price: float, entry: int,
+                     profit: float, reason: int, time_msc: Optional[int] = None) -> int:
+        """Append a deal to the history"""
+        time_msc = time_msc if time_msc is not None else int(self.simulator.now() * 1000)
+        deal_type = position['type'] if entry == self.DEAL_ENTRY_IN else 1 - position['type']
+        ticket = self._ticket()
+        self.deals.append(TradeDeal(
+            ticket=ticket, order=ticket, time=time_msc // 1000, time_msc=time_msc, type=deal_type,
+            entry=entry, position_id=position['ticket'], volume=volume, price=price,
+            profit=round(profit, 2), symbol=position['symbol'], comment=position['comment'], reason=reason
+        ))
+        return ticket
+
+    def _profit(self, position: Dict[str, Any], price: Optional[float] = None,
+                volume: Optional[float] = None) -> float:
+        """Profit in USD at a closing price (default: current quote)"""
+        if price is None:
+            tick = self.simulator.tick(position['symbol'])
+            price = tick['bid'] if position['type'] == self.POSITION_TYPE_BUY else tick['ask']
+        volume = position['volume'] if volume is None else volume
+
+        direction = 1.0 if position['type'] == self.POSITION_TYPE_BUY else -1.0
+        contract_size = self.simulator.profile(position['symbol'])['contract_size']
+        quote_profit = direction * (price - position['price_open']) * volume * contract_size
+        return to_usd(position['symbol'], quote_profit, price)
+
+    def _margin(self, position: Dict[str, Any]) -> float:
+        """Margin in USD required by a position"""
+        contract_size = self.simulator.profile(position['symbol'])['contract_size']
+        notional = position['volume'] * contract_size * position['price_open']
+        return to_usd(position['symbol'], notional, position['price_open']) / self.leverage
+
+    def _account_state(self) -> Dict[str, float]:
+        """Current equity and margin"""
+        profit = sum((self._profit(position) for position in self.positions.values()), 0.0)
+        margin = sum((self._margin(position) for position in self.positions.values()), 0.0)
+        return {'equity': self.balance + profit, 'margin': margin, 'profit': profit}
+
+    def _snapshot(self, position: Dict[str, Any]) -> TradePosition:
+        """Position as the terminal reports it"""
+        tick = self.simulator.tick(position['symbol'])
+        current = tick['bid'] if position['type'] == self.POSITION_TYPE_BUY else tick['ask']
+        return TradePosition(
+            ticket=position['ticket'], time=position['time_msc'] // 1000, time_msc=position['time_msc'],
+            type=position['type'], magic=position['magic'], identifier=position['ticket'],
+            volume=position['volume'], price_open=position['price_open'], sl=position['sl'],
+            tp=position['tp'], price_current=current, swap=0.0,
+            profit=round(self._profit(position, current), 2), symbol=position['symbol'],
+            comment=position['comment']
+        )
+
+
+def _seconds(value) -> int:
+    """Timestamp in seconds from an int or a datetime"""
+    if hasattr(value, 'timestamp'):
+        return int(value.timestamp())
+    return int(value)
@@ -0,0 +1,436 @@
+"""
+Fill Simulator - Vectorized trade fills, SL/TP exits and PnL for signal streams
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+from bars import Bars, as_bars
+from market_simulator import DEFAULT_PROFILE, DEFAULT_PROFILES, to_usd
+
+logger = logging.getLogger(__name__)
+
+# Exit reasons
+EXIT_STOP_LOSS = 0
+EXIT_TAKE_PROFIT = 1
+EXIT_TIMEOUT = 2  # held for max_bars
+EXIT_END = 3  # history ended with the trade open
+
+EXIT_REASONS = {
+    EXIT_STOP_LOSS: 'stop_loss',
+    EXIT_TAKE_PROFIT: 'take_profit',
+    EXIT_TIMEOUT: 'timeout',
+    EXIT_END: 'end'
+}
+
+# Record layout of simulated trades
+TRADE_DTYPE = np.dtype([
+    ('entry_index', '<i8'),
+    ('exit_index', '<i8'),
+    ('entry_time', '<i8'),
+    ('exit_time', '<i8'),
+    ('direction', '<i1'),  # 1 buy / -1 sell
+    ('volume', '<f8'),
+    ('confidence', '<f8'),
+    ('entry_price', '<f8'),
+    ('exit_price', '<f8'),
+    ('stop_loss', '<f8'),
+    ('take_profit', '<f8'),
+    ('reason', '<i1'),
+    ('gross', '<f8'),  # account currency, before costs
+    ('commission', '<f8'),
+    ('swap', '<f8'),
+    ('profit', '<f8')
+])
+
+SECONDS_PER_DAY = 86400
+TRIPLE_SWAP_WEEKDAY = 2  # Wednesday rollover is charged three nights
+SATURDAY, SUNDAY = 5, 6  # no rollover at the end of weekend days
+
+
+@dataclass
+class SimulationResult:
+    """Trades and equity curve of one simulated signal stream"""
+
+    symbol: str
+    strategy: str
+    time: np.ndarray  # bar open times
+    equity: np.ndarray  # account equity at each bar's close
+    trades: np.ndarray  # TRADE_DTYPE records, in entry order
+    initial_balance: float
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get trade and equity statistics"""
+        profit = self.trades['profit']
+        wins = profit[profit > 0]
+        losses = profit[profit < 0]
+        total_wins = float(wins.sum())
+        total_losses = float(-losses.sum())
+
+        peak = np.maximum.accumulate(self.equity) if len(self.equity) else self.equity
+        drawdown = float(((peak - self.equity) / peak).max() * 100) if len(self.equity) else 0.0
+
+        return {
+            'total_trades': len(profit),
+            'winning_trades': len(wins),
+            'losing_trades': len(losses),
+            'win_rate': (len(wins) / len(profit) * 100) if len(profit) else 0,
+            'total_profit': float(profit.sum()),
+            'average_win': (total_wins / len(wins)) if len(wins) else 0,
+            'average_loss': (total_losses / len(losses)) if len(losses) else 0,
+            'profit_factor': (total_wins / total_losses) if total_losses > 0 else 0,
+            'total_commission': float(self.trades['commission'].sum()),
+            'total_swap': float(self.trades['swap'].sum()),
+            'final_equity': float(self.equity[-1]) if len(self.equity) else self.initial_balance,
+            'max_drawdown_percent': drawdown
+        }
+
+    def to_dataframe(self):
+        """
+        Get a pandas DataFrame of the trades
+
+        Returns:
+            DataFrame with one row per trade and the exit reason by name
+        """
+        import pandas as pd
+
+        frame = pd.DataFrame(self.trades)
+        frame['entry_time'] = pd.to_datetime(frame['entry_time'], unit='s')
+        frame['exit_time'] = pd.to_datetime(frame['exit_time'], unit='s')
+        frame['reason'] = frame['reason'].map(EXIT_REASONS)
+        return frame
+
+
+class FillSimulator:
+    """
+    Resolves signal streams into trades, costs and an equity curve
+
+    A signal on a bar's close fills at the next bar's open, buys at the ask
+    and sells at the bid. Exits are found with array operations over
+    growing windows of bars after each entry: longs close on the bid, so
+    SL/TP are checked against the bar's low/high, shorts on the ask (bid
+    bars shifted by the spread). A bar that gaps through a level fills at
+    its open. When one bar touches both the stop and the target the order
+    inside the bar is unknown and `ambiguous` decides: 'stop' (pessimistic),
+    'target', or 'open' (the level nearer to the bar's open first).
+    """
+
+    def __init__(self, volume: float = 0.1, initial_balance: float = 10000.0,
+                 spread: Optional[float] = None, slippage: float = 0.0, commission: float = 0.0,
+                 swap_long: float = 0.0, swap_short: float = 0.0, max_bars: int = 1000,
+                 ambiguous: str = 'stop', overlap: bool = False,
+                 profiles: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Initialize simulator
+
+        Args:
+            volume: Lots per trade
+            initial_balance: Starting balance in account currency
+            spread: Spread in points (default: each bar's recorded spread, or the symbol profile's)
+            slippage: Adverse slippage in points on market fills (entries, stops and forced exits)
+            commission: Commission per lot per side in account currency
+            swap_long: Swap per lot per night for buys in account currency (negative is a charge)
+            swap_short: Swap per lot per night for sells in account currency
+            max_bars: Bars a trade is held at most before it is closed at the close
+            ambiguous: Exit when SL and TP are both inside one bar: 'stop', 'target' or 'open'
+            overlap: Take every signal as its own trade instead of one position at a time
+            profiles: Per-symbol overrides of point, spread and contract_size
+        """
+        if ambiguous not in ('stop', 'target', 'open'):
+            raise ValueError(f"Unknown ambiguous fill rule: {ambiguous}")
+
+        self.volume = volume
+        self.initial_balance = initial_balance
+        self.spread = spread
+        self.slippage = slippage
+        self.commission = commission
+        self.swap_long = swap_long
+        self.swap_short = swap_short
+        self.max_bars = max_bars
+        self.ambiguous = ambiguous
+        self.overlap = overlap
+        self.profiles = {**DEFAULT_PROFILES, **(profiles or {})}
+
+    def profile(self, symbol: str) -> Dict[str, Any]:
+        """Contract parameters for a symbol"""
+        return {**DEFAULT_PROFILE, **self.profiles.get(symbol, {})}
+
+    def simulate(self, signals) -> SimulationResult:
+        """
+        Simulate a signal series (e.g. a backtester SignalSeries)
+
+        Args:
+            signals: Object with symbol, strategy, bars, action, confidence,
+                     stop_loss and take_profit
+
+        Returns:
+            Simulation result
+        """
+        return self.simulate_arrays(
+            signals.symbol, signals.bars, signals.action, signals.stop_loss, signals.take_profit,
+            signals.confidence, strategy=signals.strategy
+        )
+
+    def simulate_all(self, results: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, SimulationResult]]:
+        """
+        Simulate backtest output for several symbols
+
+        Args:
+            results: Dictionary of symbol -> strategy name -> signal series
+
+        Returns:
+            Dictionary of symbol -> strategy name -> simulation result
+        """
+        return {
+            symbol: {name: self.simulate(signals) for name, signals in series.items()}
+            for symbol, series in results.items()
+        }
+
+    def simulate_arrays(self, symbol: str, bars: Bars, action: np.ndarray, stop_loss: np.ndarray,
+                        take_profit: np.ndarray, confidence: Optional[np.ndarray] = None,
+                        strategy: str = '') -> SimulationResult:
+        """
+        Simulate per-bar signals over bars
+
+        Args:
+            symbol: Trading symbol
+            bars: Bars the signals were generated on (bid prices)
+            action: Per-bar action (1 buy / -1 sell / 0 none), decided on the bar's close
+            stop_loss: Per-bar stop loss price (NaN for none)
+            take_profit: Per-bar take profit price (NaN for none)
+            confidence: Per-bar confidence, recorded on trades
+            strategy: Strategy name, recorded on the result
+
+        Returns:
+            Simulation result
+        """
+        bars = as_bars(bars)
+        n = len(bars)
+        profile = self.profile(symbol)
+        point = profile['point']
+        spreads = self._spreads(bars, profile)
+        slippage = self.slippage * point
+
+        # Signals fill at the next bar's open
+        signal_index = np.flatnonzero(np.asarray(action)[:n - 1] != 0)
+        entry = signal_index + 1
+        direction = np.sign(np.asarray(action)[signal_index]).astype(np.int8)
+        stops = np.asarray(stop_loss, dtype=np.float64)[signal_index]
+        targets = np.asarray(take_profit, dtype=np.float64)[signal_index]
+        entry_price = bars.open[entry] + np.where(direction > 0, spreads[entry], 0.0) + direction * slippage
+
+        exit_index, exit_price, reason = self._resolve_exits(
+            bars, spreads, slippage, direction, entry, stops, targets
+        )
+
+        if not self.overlap and len(entry):
+            taken = self._one_at_a_time(entry, exit_index)
+            signal_index, entry, direction = signal_index[taken], entry[taken], direction[taken]
+            stops, targets, entry_price = stops[taken], targets[taken], entry_price[taken]
+            exit_index, exit_price, reason = exit_index[taken], exit_price[taken], reason[taken]
+
+        trades = np.zeros(len(entry), dtype=TRADE_DTYPE)
+        trades['entry_index'] = entry
+        trades['exit_index'] = exit_index
+        trades['entry_time'] = bars.time[entry]
+        trades['exit_time'] = bars.time[exit_index]
+        trades['direction'] = direction
+        trades['volume'] = self.volume
+        trades['confidence'] = np.asarray(confidence)[signal_index] if confidence is not None else np.nan
+        trades['entry_price'] = entry_price
+        trades['exit_price'] = exit_price
+        trades['stop_loss'] = stops
+        trades['take_profit'] = targets
+        trades['reason'] = reason
+
+        units = self.volume * profile['contract_size']
+        trades['gross'] = to_usd(symbol, direction * (exit_price - entry_price) * units, exit_price)
+        trades['commission'] = 2 * self.commission * self.volume
+        trades['swap'] = self.volume * np.where(direction > 0, self.swap_long, self.swap_short) * _rollovers(
+            trades['entry_time'], trades['exit_time']
+        )
+        trades['profit'] = trades['gross'] - trades['commission'] + trades['swap']
+
+        equity = self._equity(symbol, bars, spreads, trades, units)
+        return SimulationResult(symbol, strategy, bars.time, equity, trades, self.initial_balance)
+
+    def _spreads(self, bars: Bars, profile: Dict[str, Any]) -> np.ndarray:
+        """Per-bar spread in price units"""
+        if self.spread is not None:
+            return np.full(len(bars), self.spread * profile['point'])
+        recorded = bars.data['spread'] * profile['point']
+        return np.where(recorded > 0, recorded, profile['spread'])
+
+    def _resolve_exits(self, bars: Bars, spreads: np.ndarray, slippage: float, direction: np.ndarray,
+                       entry: np.ndarray, stops: np.ndarray,
+                       targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find each trade's exit bar, price and reason
+
+        Unresolved trades are scanned over windows that double in width, so
+        the work follows how long trades are actually held rather than max_bars.
+
+        Returns:
+            Tuple of (exit bar index, exit price, exit reason) per trade
+        """
+        n = len(bars)
+        opens, highs, lows, closes = bars.open, bars.high, bars.low, bars.close
+        exit_index = np.full(len(entry), -1, dtype=np.int64)
+        exit_price = np.full(len(entry), np.nan)
+        reason = np.full(len(entry), EXIT_END, dtype=np.int8)
+
+        pending = np.arange(len(entry))
+        offset, width = 0, 16
+        while len(pending) and offset < self.max_bars:
+            width = min(width, self.max_bars - offset)
+            index = entry[pending, None] + offset + np.arange(width)
+            valid = index < n
+            index = np.minimum(index, n - 1)
+
+            # Positions close on the bid (longs) or the ask (shorts)
+            long = direction[pending, None] > 0
+            shift = np.where(long, 0.0, spreads[index])
+            high = highs[index] + shift
+            low = lows[index] + shift
+            sl = stops[pending, None]
+            tp = targets[pending, None]
+            stop_hit = valid & np.where(long, low <= sl, high >= sl)
+            target_hit = valid & np.where(long, high >= tp, low <= tp)
+
+            hit = stop_hit | target_hit
+            rows = np.flatnonzero(hit.any(axis=1))
+            columns = hit[rows].argmax(axis=1)
+            if len(rows):
+                trades = pending[rows]
+                bar = index[rows, columns]
+                is_long = direction[trades] > 0
+                bar_open = opens[bar] + np.where(is_long, 0.0, spreads[bar])
+                use_stop = self._stop_first(stop_hit[rows, columns], target_hit[rows, columns],
+                                            bar_open, stops[trades], targets[trades])
+
+                # A bar gapping through a level fills at its open
+                stop_price = np.where(is_long, np.minimum(stops[trades], bar_open),
+                                      np.maximum(stops[trades], bar_open)) - direction[trades] * slippage
+                target_price = np.where(is_long, np.maximum(targets[trades], bar_open),
+                                        np.minimum(targets[trades], bar_open))
+
+                exit_index[trades] = bar
+                exit_price[trades] = np.where(use_stop, stop_price, target_price)
+                reason[trades] = np.where(use_stop, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT)
+
+            # Keep scanning trades with neither level hit while history remains
+            unresolved = np.ones(len(pending), dtype=bool)
+            unresolved[rows] = False
+            pending = pending[unresolved & valid[:, -1]]
+            offset += width
+            width *= 2
+
+        # Trades still open close at the close: after max_bars, or at the end of history
+        open_trades = np.flatnonzero(exit_index < 0)
+        if len(open_trades):
+            last = entry[open_trades] + self.max_bars - 1
+            bar = np.minimum(last, n - 1)
+            spread = np.where(direction[open_trades] > 0, 0.0, spreads[bar])
+            exit_index[open_trades] = bar
+            exit_price[open_trades] = closes[bar] + spread - direction[open_trades] * slippage
+            reason[open_trades] = np.where(last <= n - 1, EXIT_TIMEOUT, EXIT_END)
+
+        return exit_index, exit_price, reason
+
+    def _stop_first(self, stop_hit: np.ndarray, target_hit: np.ndarray, bar_open: np.ndarray,
+                    stops: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Whether the stop is taken on the exit bar, applying the ambiguous fill rule"""
+        if self.ambiguous == 'target':
+            return stop_hit & ~target_hit
+        if self.ambiguous == 'open':
+            nearer = np.abs(bar_open - stops) <= np.abs(targets - bar_open)
+            return stop_hit & (~target_hit | nearer)
+        return stop_hit
+
+    @staticmethod
+    def _one_at_a_time(entry: np.ndarray, exit_index: np.ndarray) -> np.ndarray:
+        """
+        Select the trades taken when only one position is held at a time
+
+        Every candidate's exit is already known, so the next trade is the
+        first candidate entering after the current one exits; only the
+        chain of taken trades is walked.
+
+        Returns:
+            Indexes of the taken candidates
+        """
+        following = np.searchsorted(entry, exit_index, side='right')
+        taken = []
+        current = 0
+        while current < len(entry):
+            taken.append(current)
+            current = following[current]
+        return np.asarray(taken, dtype=np.int64)
+
+    def _equity(self, symbol: str, bars: Bars, spreads: np.ndarray, trades: np.ndarray,
+                units: float) -> np.ndarray:
+        """
+        Equity at each bar's close: balance plus open positions marked to market
+
+        Open exposure is accumulated with difference arrays, so the curve
+        costs the same however many trades overlap.
+        """
+        n = len(bars)
+        entry, exit_index = trades['entry_index'], trades['exit_index']
+        signed = trades['direction'] * units
+        short = np.where(trades['direction'] < 0, units, 0.0)
+
+        def exposure(amount: np.ndarray) -> np.ndarray:
+            """Sum of amount over trades open on each bar (entered, not yet exited)"""
+            change = np.bincount(entry, weights=amount, minlength=n + 1)
+            change -= np.bincount(exit_index, weights=amount, minlength=n + 1)
+            return np.cumsum(change[:n])
+
+        # Longs are marked at the bid (close), shorts at the ask
+        unrealized = (bars.close * exposure(signed) - exposure(signed * trades['entry_price'])
+                      - spreads * exposure(short))
+        realized = np.cumsum(np.bincount(exit_index, weights=trades['profit'], minlength=n)[:n])
+        return self.initial_balance + realized + to_usd(symbol, unrealized, bars.close)
+
+
+def _rollovers(entry_time: np.ndarray, exit_time: np.ndarray) -> np.ndarray:
+    """Nights charged swap between entry and exit: weekday rollovers, the Wednesday one counting three"""
+    first = entry_time // SECONDS_PER_DAY
+    last = exit_time // SECONDS_PER_DAY
+    weekend = _nights(first, last, SATURDAY) + _nights(first, last, SUNDAY)
+    return (last - first) - weekend + 2 * _nights(first, last, TRIPLE_SWAP_WEEKDAY)
+
+
+def _nights(first: np.ndarray, last: np.ndarray, weekday: int) -> np.ndarray:
+    """Midnights from day `first` to day `last` that end the given weekday (Monday = 0)"""
+    # Day numbers falling on the weekday (1970-01-01 was a Thursday)
+    residue = (weekday - 3) % 7
+    return (last - residue + 6) // 7 - (first - residue + 6) // 7
+
+
+def portfolio_equity(results: List[SimulationResult],
+                     initial_balance: float = 10000.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Combine simulations on one account
+
+    Each result's profit and loss is carried forward to the union of bar
+    times and summed.
+
+    Args:
+        results: Simulation results
+        initial_balance: Starting balance of the combined account
+
+    Returns:
+        Tuple of (times, equity)
+    """
+    if not results:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    times = np.unique(np.concatenate([result.time for result in results]))
+    equity = np.full(len(times), float(initial_balance))
+    for result in results:
+        position = np.searchsorted(result.time, times, side='right') - 1
+        pnl = np.where(position >= 0, result.equity[np.maximum(position, 0)] - result.initial_balance, 0.0)
+        equity += pnl
+    return times, equity
@@ -0,0 +1,436 @@
+"""
+Indicator Graph - Deduplicated, memoized indicator computation shared by strategies
+"""
+
+import logging
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from bars import Bars
+from indicators import sma, rolling_std, ema, wilder, rsi, SMA, EMA, Wilder, RSI, BollingerBands
+
+logger = logging.getLogger(__name__)
+
+# Weight an EMA/Wilder seed may still carry once warmed up
+CONVERGENCE_TOLERANCE = 1e-3
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """
+    Declaration of one indicator a strategy needs
+
+    Specs with the same kind, parameters and source compare equal, which is
+    what lets strategies share a computation.
+    """
+
+    kind: str
+    params: Tuple[Tuple[str, Any], ...] = ()
+    source: str = 'close'
+
+    @classmethod
+    def of(cls, kind: str, source: str = 'close', **params) -> 'IndicatorSpec':
+        """Create a spec, e.g. IndicatorSpec.of('sma', period=20)"""
+        return cls(kind, tuple(sorted(params.items())), source)
+
+    def param(self, name: str) -> Any:
+        """Get a parameter value"""
+        return dict(self.params)[name]
+
+
+def dependencies(spec: IndicatorSpec) -> List[IndicatorSpec]:
+    """Indicators a spec is computed from"""
+    if spec.kind == 'bollinger':
+        period = spec.param('period')
+        return [IndicatorSpec.of('sma', spec.source, period=period),
+                IndicatorSpec.of('std', spec.source, period=period)]
+    return []
+
+
+def warmup(spec: IndicatorSpec) -> int:
+    """
+    Bars needed before an indicator's latest value is usable
+
+    That is the bars up to its first value, plus for recursive smoothing
+    (EMA, Wilder, RSI) the bars for the seed's weight to decay below
+    CONVERGENCE_TOLERANCE, so values no longer depend on where the window starts.
+    """
+    period = spec.param('period')
+    if spec.kind == 'ema':
+        return period + _convergence(2 / (period + 1))
+    if spec.kind == 'wilder':
+        return period + _convergence(1 / period)
+    if spec.kind == 'rsi':
+        return period + 1 + _convergence(1 / period)
+    return period
+
+
+def _convergence(alpha: float) -> int:
+    """Bars for a smoothing seed's weight (1 - alpha)^n to fall below CONVERGENCE_TOLERANCE"""
+    if alpha >= 1:
+        return 0
+    return math.ceil(math.log(CONVERGENCE_TOLERANCE) / math.log(1 - alpha))
+
+
+def required_history(named: Dict[str, IndicatorSpec]) -> int:
+    """Bars for every indicator to have usable previous and current values"""
+    return max((warmup(spec) for spec in plan(named.values())), default=0) + 1
+
+
+def _compute(spec: IndicatorSpec, source: np.ndarray, inputs: List[Any]) -> Any:
+    """Compute one node from its source series and dependency results"""
+    if spec.kind == 'sma':
+        return sma(source, spec.param('period'))
+    if spec.kind == 'std':
+        return rolling_std(source, spec.param('period'))[1]
+    if spec.kind == 'ema':
+        return ema(source, spec.param('period'))
+    if spec.kind == 'wilder':
+        return wilder(source, spec.param('period'))
+    if spec.kind == 'rsi':
+        return rsi(source, spec.param('period'))
+    if spec.kind == 'bollinger':
+        middle, std = inputs
+        std_dev = spec.param('std_dev')
+        return middle, middle + std * std_dev, middle - std * std_dev
+    raise ValueError(f"Unknown indicator: {spec.kind}")
+
+
+def plan(specs: Iterable[IndicatorSpec]) -> List[IndicatorSpec]:
+    """
+    Order the nodes needed for a set of specs
+
+    Returns:
+        Unique specs, each after its dependencies
+    """
+    ordered = []
+    seen = set()
+
+    def visit(spec: IndicatorSpec):
+        if spec in seen:
+            return
+        seen.add(spec)
+        for dependency in dependencies(spec):
+            visit(dependency)
+        ordered.append(spec)
+
+    for spec in specs:
+        visit(spec)
+    return ordered
+
+
+def _source(bars: Union[Bars, np.ndarray], source: str) -> np.ndarray:
+    """Input series of a spec; a plain array (e.g. symbols x bars closes) is used as is"""
+    if isinstance(bars, np.ndarray):
+        return bars
+    return getattr(bars, source)
+
+
+def evaluate(bars: Union[Bars, np.ndarray], specs: Iterable[IndicatorSpec],
+             values: Optional[Dict[IndicatorSpec, Any]] = None) -> Dict[IndicatorSpec, Any]:
+    """
+    Compute specs over bars, skipping nodes already in `values`
+
+    Args:
+        bars: Bars to compute on, or an array of closes (1-D, or 2-D with one symbol per row)
+        specs: Indicators wanted
+        values: Previously computed nodes for the same bars (updated in place)
+
+    Returns:
+        Dictionary of spec -> result for every node computed or reused
+    """
+    values = {} if values is None else values
+    for spec in plan(specs):
+        if spec not in values:
+            inputs = [values[dependency] for dependency in dependencies(spec)]
+            values[spec] = _compute(spec, _source(bars, spec.source), inputs)
+    return values
+
+
+def compute_indicators(bars: Union[Bars, np.ndarray], named: Dict[str, IndicatorSpec]) -> Dict[str, Any]:
+    """Compute a strategy's named indicators without caching"""
+    values = evaluate(bars, named.values())
+    return {name: values[spec] for name, spec in named.items()}
+
+
+class IndicatorEngine:
+    """
+    Per-bar indicator cache shared by all strategies
+
+    For each (symbol, timeframe) and window length the engine keeps the
+    nodes computed for the latest bars it was given. A node is computed once
+    and reused by every strategy evaluated on that window that declares it
+    (directly or as a dependency) until the bars change: a new bar, or a
+    new price on the forming bar.
+    """
+
+    def __init__(self):
+        """Initialize engine"""
+        self._memo = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compute(self, symbol: str, timeframe: int, bars: Bars,
+                specs: Iterable[IndicatorSpec]) -> Dict[IndicatorSpec, Any]:
+        """
+        Get indicator values, computing only nodes not cached for these bars
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe in minutes
+            bars: Bars the indicators are computed on
+            specs: Indicators wanted
+
+        Returns:
+            Dictionary of spec -> result
+        """
+        specs = list(specs)
+        key = self._bars_key(bars)
+
+        with self._lock:
+            values = self._values(symbol, timeframe, bars, key)
+
+            # Count every node needed, so a dependency shared with another strategy is a hit
+            needed = plan(specs)
+            missing = sum(spec not in values for spec in needed)
+            self.hits += len(needed) - missing
+            self.misses += missing
+            evaluate(bars, specs, values)
+            return {spec: values[spec] for spec in specs}
+
+    def resolve(self, symbol: str, timeframe: int, bars: Bars,
+                named: Dict[str, IndicatorSpec]) -> Dict[str, Any]:
+        """
+        Get a strategy's named indicators, e.g. for analyze(..., indicators=...)
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe in minutes
+            bars: Bars the indicators are computed on
+            named: Strategy's indicator declarations (name -> spec)
+
+        Returns:
+            Dictionary of name -> result
+        """
+        values = self.compute(symbol, timeframe, bars, named.values())
+        return {name: values[spec] for name, spec in named.items()}
+
+    def compute_batch(self, symbols: Sequence[str], timeframe: int, bars: Sequence[Bars],
+                      specs: Iterable[IndicatorSpec]) -> Dict[IndicatorSpec, Any]:
+        """
+        Get indicator values for same-length series, one row per symbol
+
+        Nodes missing for any of the series are computed for all of them in
+        one vectorized pass over the stacked series, and cached per series
+        as in compute().
+
+        Args:
+            symbols: Trading symbols
+            timeframe: Timeframe in minutes
+            bars: Bars of each symbol, all of the same length
+            specs: Indicators wanted
+
+        Returns:
+            Dictionary of spec -> result (symbols x bars)
+        """
+        specs = list(specs)
+        needed = plan(specs)
+
+        with self._lock:
+            memos = []
+            for symbol, series in zip(symbols, bars):
+                memos.append(self._values(symbol, timeframe, series, self._bars_key(series)))
+
+            missing = [spec for spec in needed if not all(spec in values for values in memos)]
+            self.hits += (len(needed) - len(missing)) * len(memos)
+            self.misses += len(missing) * len(memos)
+
+            computed = {}
+            for source in {spec.source for spec in missing}:
+                matrix = np.stack([getattr(series, source) for series in bars])
+                evaluate(matrix, [spec for spec in missing if spec.source == source], computed)
+            for spec, value in computed.items():
+                for row, values in enumerate(memos):
+                    values[spec] = _row(value, row)
+
+            return {
+                spec: computed[spec] if spec in computed else _stack([values[spec] for values in memos])
+                for spec in specs
+            }
+
+    def resolve_batch(self, symbols: Sequence[str], timeframe: int, bars: Sequence[Bars],
+                      named: Dict[str, IndicatorSpec]) -> Dict[str, Any]:
+        """
+        Get a strategy's named indicators for same-length series, e.g. for analyze_batch(..., indicators=...)
+
+        Returns:
+            Dictionary of name -> result (symbols x bars)
+        """
+        values = self.compute_batch(symbols, timeframe, bars, named.values())
+        return {name: values[spec] for name, spec in named.items()}
+
+    def clear(self):
+        """Drop all cached values"""
+        with self._lock:
+            self._memo.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'windows': len(self._memo),
+                'nodes': sum(len(values) for _, values in self._memo.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    def _values(self, symbol: str, timeframe: int, bars: Bars, key: tuple) -> Dict[IndicatorSpec, Any]:
+        """Cached nodes of a window (emptied when its bars changed); call with the lock held"""
+        cached = self._memo.get((symbol, timeframe, len(bars)))
+        if cached is None or cached[0] != key:
+            cached = (key, {})
+            self._memo[(symbol, timeframe, len(bars))] = cached
+        return cached[1]
+
+    @staticmethod
+    def _bars_key(bars: Bars) -> tuple:
+        """
+        Identify a bar window: its span, length and a checksum of its closes
+
+        The checksum catches bars rewritten inside the window (e.g. by an
+        archive merge or backfill), not only a new price on the forming bar.
+        """
+        if len(bars) == 0:
+            return (0,)
+        return (len(bars), int(bars.time[0]), int(bars.time[-1]), hash(bars.close.tobytes()))
+
+
+def _row(value: Any, row: int) -> Any:
+    """One symbol's row of a batch result (or of each part of a tuple result)"""
+    if isinstance(value, tuple):
+        return tuple(item[row] for item in value)
+    return value[row]
+
+
+def _stack(rows: List[Any]) -> Any:
+    """Batch result from per-symbol rows (or tuples of rows)"""
+    if isinstance(rows[0], tuple):
+        return tuple(np.stack(parts) for parts in zip(*rows))
+    return np.stack(rows)
+
+
+def pairwise(value: Any) -> Any:
+    """
+    Previous and current value at every bar, e.g. to decide on a whole history at once
+
+    Args:
+        value: Series along the last axis, or a tuple of series
+
+    Returns:
+        Array with a trailing (previous, current) axis, the first bar's previous
+        value being NaN; a tuple of such arrays for a tuple input
+    """
+    if isinstance(value, tuple):
+        return tuple(pairwise(item) for item in value)
+    value = np.asarray(value, dtype=np.float64)
+    padded = np.concatenate([np.full(value.shape[:-1] + (1,), np.nan), value], axis=-1)
+    return np.lib.stride_tricks.sliding_window_view(padded, 2, axis=-1)
+
+
+def create_stream(spec: IndicatorSpec):
+    """Streaming indicator for a spec"""
+    if spec.kind == 'sma':
+        return SMA(spec.param('period'))
+    if spec.kind == 'ema':
+        return EMA(spec.param('period'))
+    if spec.kind == 'wilder':
+        return Wilder(spec.param('period'))
+    if spec.kind == 'rsi':
+        return RSI(spec.param('period'))
+    if spec.kind == 'bollinger':
+        return BollingerBands(spec.param('period'), spec.param('std_dev'))
+    raise ValueError(f"No streaming form for indicator: {spec.kind}")
+
+
+def _current(stream) -> Any:
+    """Latest value of a streaming indicator, shaped like the batch result"""
+    if isinstance(stream, BollingerBands):
+        return stream.middle, stream.upper, stream.lower
+    return stream.value
+
+
+def _pair(previous: Any, current: Any) -> Any:
+    """Two-bar series (previous, current) of a value or a tuple of values"""
+    if isinstance(current, tuple):
+        return tuple(np.array([p, c]) for p, c in zip(previous, current))
+    return np.array([previous, current])
+
+
+class IndicatorStream:
+    """
+    Incremental values of a strategy's named indicators for one series
+
+    update() adds a closed bar's price; peek() evaluates a price on the
+    forming bar without changing state. Both return the last two closes
+    and indicator values as short arrays, which is all a strategy's
+    decision needs, so each event costs the same however long the history.
+    Values are bit-identical to the batch indicators over the same closes.
+    """
+
+    def __init__(self, named: Dict[str, IndicatorSpec]):
+        """
+        Initialize stream
+
+        Args:
+            named: Strategy's indicator declarations (name -> spec)
+        """
+        self.streams = {name: create_stream(spec) for name, spec in named.items()}
+        self.count = 0
+        self.close = math.nan
+        self.values = {name: _current(stream) for name, stream in self.streams.items()}
+
+    def update(self, price: float) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Add a closed bar's price
+
+        Returns:
+            Tuple of (closes, indicators), each holding (previous, current)
+        """
+        current = {name: stream.update(price) for name, stream in self.streams.items()}
+        window = self._window(price, current)
+        self.count += 1
+        self.close = price
+        self.values = current
+        return window
+
+    def peek(self, price: float) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Evaluate a price on the forming bar without adding it
+
+        Returns:
+            Tuple of (closes, indicators), each holding (previous, current)
+        """
+        return self._window(price, {name: stream.peek(price) for name, stream in self.streams.items()})
+
+    def prime(self, closes: np.ndarray):
+        """Load closed-bar history in one batch pass"""
+        closes = np.asarray(closes, dtype=np.float64)
+        if len(closes) == 0:
+            return
+        for stream in self.streams.values():
+            stream.prime(closes)
+        self.count = len(closes)
+        self.close = float(closes[-1])
+        self.values = {name: _current(stream) for name, stream in self.streams.items()}
+
+    def _window(self, price: float, current: Dict[str, Any]) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Previous and current closes and indicator values"""
+        return np.array([self.close, price]), {
+            name: _pair(self.values[name], value) for name, value in current.items()
+        }
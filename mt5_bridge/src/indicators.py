@@ -0,0 +1,411 @@
+"""
+Indicators - Shared technical indicators in batch and streaming form
+"""
+
+import logging
+import math
+from typing import Tuple
+import numpy as np
+from scipy.signal import lfilter
+
+logger = logging.getLogger(__name__)
+
+# Batch functions work on the last axis of 1-D or 2-D arrays and pad the
+# warm-up period with NaN. Each has a streaming class that updates in O(1)
+# per value using the same floating point operations in the same order, so
+# feeding a series value by value gives bit-identical results to the batch
+# function over the whole series.
+#
+# Sums are taken over differences from the first value of the series. This
+# keeps the running sums small (prices drift far less than they accumulate),
+# so rolling means and variances from cumulative sums stay accurate over
+# long histories.
+
+
+def sma(data: np.ndarray, period: int) -> np.ndarray:
+    """
+    Simple moving average from cumulative sums
+
+    Args:
+        data: Values (1-D, or 2-D with one series per row)
+        period: Window length
+
+    Returns:
+        Array shaped like data, NaN until the window is full
+    """
+    data = np.asarray(data, dtype=np.float64)
+    out = np.full(data.shape, np.nan)
+    if data.shape[-1] < period:
+        return out
+
+    origin, sums = _shifted_cumsum(data)
+    out[..., period - 1:] = _window(sums, period) / period + origin
+    return out
+
+
+def rolling_std(data: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rolling mean and population standard deviation from cumulative sums
+
+    Args:
+        data: Values (1-D, or 2-D with one series per row)
+        period: Window length
+
+    Returns:
+        Tuple of (mean, std) arrays shaped like data
+    """
+    data = np.asarray(data, dtype=np.float64)
+    mean = np.full(data.shape, np.nan)
+    std = np.full(data.shape, np.nan)
+    if data.shape[-1] < period:
+        return mean, std
+
+    origin, sums = _shifted_cumsum(data)
+    squares = np.cumsum((data - origin) * (data - origin), axis=-1)
+
+    shifted_mean = _window(sums, period) / period
+    variance = _window(squares, period) / period - shifted_mean * shifted_mean
+    mean[..., period - 1:] = shifted_mean + origin
+    std[..., period - 1:] = np.sqrt(np.maximum(variance, 0.0))
+    return mean, std
+
+
+def bollinger_bands(data: np.ndarray, period: int, std_dev: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bollinger Bands
+
+    Returns:
+        Tuple of (middle, upper, lower) arrays shaped like data
+    """
+    middle, std = rolling_std(data, period)
+    return middle, middle + std * std_dev, middle - std * std_dev
+
+
+def ema(data: np.ndarray, period: int) -> np.ndarray:
+    """
+    Exponential moving average (alpha = 2 / (period + 1)), seeded with the SMA of the first period
+
+    Returns:
+        Array shaped like data, NaN before the first full period
+    """
+    return _smooth(data, period, 2 / (period + 1))
+
+
+def wilder(data: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder smoothing (alpha = 1 / period), seeded with the SMA of the first period
+
+    Returns:
+        Array shaped like data, NaN before the first full period
+    """
+    return _smooth(data, period, 1 / period)
+
+
+def rsi(data: np.ndarray, period: int) -> np.ndarray:
+    """
+    Relative Strength Index with Wilder smoothing
+
+    Returns:
+        Array shaped like data, NaN for the first `period` values
+    """
+    data = np.asarray(data, dtype=np.float64)
+    out = np.full(data.shape, np.nan)
+    if data.shape[-1] < period + 1:
+        return out
+
+    deltas = np.diff(data, axis=-1)
+    avg_gains = wilder(np.where(deltas > 0, deltas, 0.0), period)[..., period - 1:]
+    avg_losses = wilder(np.where(deltas < 0, -deltas, 0.0), period)[..., period - 1:]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100 - 100 / (1 + avg_gains / avg_losses)
+    out[..., period:] = np.where(avg_losses != 0, values, np.where(avg_gains > 0, 100.0, 0.0))
+    return out
+
+
+def _shifted_cumsum(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """First value of each series and the running sum of differences from it"""
+    origin = data[..., :1]
+    return origin, np.cumsum(data - origin, axis=-1)
+
+
+def _window(sums: np.ndarray, period: int) -> np.ndarray:
+    """Sum of each full window from a running sum (sums[i] - sums[i - period])"""
+    lagged = np.concatenate([np.zeros(sums.shape[:-1] + (1,)), sums[..., :sums.shape[-1] - period]], axis=-1)
+    return sums[..., period - 1:] - lagged
+
+
+def _smooth(data: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """y = alpha * x + (1 - alpha) * y_prev, seeded with the SMA of the first period"""
+    data = np.asarray(data, dtype=np.float64)
+    out = np.full(data.shape, np.nan)
+    if data.shape[-1] < period:
+        return out
+
+    seed = sma(data[..., :period], period)[..., -1:]
+    out[..., period - 1:period] = seed
+    if data.shape[-1] > period:
+        decay = 1 - alpha
+        out[..., period:], _ = lfilter([alpha], [1.0, -decay], data[..., period:], axis=-1, zi=decay * seed)
+    return out
+
+
+class SMA:
+    """Streaming simple moving average"""
+
+    def __init__(self, period: int):
+        """
+        Initialize indicator
+
+        Args:
+            period: Window length
+        """
+        self.period = period
+        self.count = 0
+        self.value = math.nan
+        self._origin = 0.0
+        self._sum = 0.0
+        self._sums = [0.0] * period
+
+    def update(self, value: float) -> float:
+        """Add a value and get the new average (NaN until the window is full)"""
+        if self.count == 0:
+            self._origin = value
+        self._sum += value - self._origin
+
+        slot = self.count % self.period
+        lagged = self._sums[slot]
+        self._sums[slot] = self._sum
+        self.count += 1
+
+        if self.count >= self.period:
+            self.value = (self._sum - lagged) / self.period + self._origin
+        return self.value
+
+    def peek(self, value: float) -> float:
+        """Get the average update() would return for a value, without adding it"""
+        if self.count + 1 < self.period:
+            return self.value
+        origin = value if self.count == 0 else self._origin
+        total = self._sum + (value - origin)
+        return (total - self._sums[self.count % self.period]) / self.period + origin
+
+    def prime(self, data: np.ndarray) -> np.ndarray:
+        """
+        Load history in one batch pass and continue streaming from its end
+
+        Returns:
+            The batch result for the history
+        """
+        data = np.asarray(data, dtype=np.float64)
+        result = sma(data, self.period)
+        if len(data):
+            origin, sums = _shifted_cumsum(data)
+            self._origin = float(origin[0])
+            self.count = len(data)
+            self._sum = float(sums[-1])
+            for i in range(max(0, self.count - self.period), self.count):
+                self._sums[i % self.period] = float(sums[i])
+            self.value = float(result[-1])
+        return result
+
+
+class BollingerBands:
+    """Streaming Bollinger Bands"""
+
+    def __init__(self, period: int, std_dev: float):
+        """
+        Initialize indicator
+
+        Args:
+            period: Window length
+            std_dev: Band width in standard deviations
+        """
+        self.period = period
+        self.std_dev = std_dev
+        self.count = 0
+        self.middle = self.upper = self.lower = self.std = math.nan
+        self._origin = 0.0
+        self._sum = 0.0
+        self._squares = 0.0
+        self._sums = [0.0] * period
+        self._square_sums = [0.0] * period
+
+    def update(self, value: float) -> Tuple[float, float, float]:
+        """Add a value and get (middle, upper, lower)"""
+        if self.count == 0:
+            self._origin = value
+        shifted = value - self._origin
+        self._sum += shifted
+        self._squares += shifted * shifted
+
+        slot = self.count % self.period
+        lagged, lagged_squares = self._sums[slot], self._square_sums[slot]
+        self._sums[slot], self._square_sums[slot] = self._sum, self._squares
+        self.count += 1
+
+        if self.count >= self.period:
+            self.middle, self.std = self._bands(self._sum - lagged, self._squares - lagged_squares, self._origin)
+            self.upper = self.middle + self.std * self.std_dev
+            self.lower = self.middle - self.std * self.std_dev
+        return self.middle, self.upper, self.lower
+
+    def peek(self, value: float) -> Tuple[float, float, float]:
+        """Get the bands update() would return for a value, without adding it"""
+        if self.count + 1 < self.period:
+            return self.middle, self.upper, self.lower
+        origin = value if self.count == 0 else self._origin
+        shifted = value - origin
+        slot = self.count % self.period
+        middle, std = self._bands(self._sum + shifted - self._sums[slot],
+                                  self._squares + shifted * shifted - self._square_sums[slot], origin)
+        return middle, middle + std * self.std_dev, middle - std * self.std_dev
+
+    def _bands(self, window_sum: float, window_squares: float, origin: float) -> Tuple[float, float]:
+        """Mean and standard deviation of a window from its shifted sums"""
+        shifted_mean = window_sum / self.period
+        variance = window_squares / self.period - shifted_mean * shifted_mean
+        return shifted_mean + origin, math.sqrt(max(variance, 0.0))
+
+    def prime(self, data: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Load history in one batch pass and continue streaming from its end
+
+        Returns:
+            The batch (middle, upper, lower) for the history
+        """
+        data = np.asarray(data, dtype=np.float64)
+        middle, std = rolling_std(data, self.period)
+        result = (middle, middle + std * self.std_dev, middle - std * self.std_dev)
+        if len(data):
+            origin, sums = _shifted_cumsum(data)
+            squares = np.cumsum((data - origin) * (data - origin))
+            self._origin = float(origin[0])
+            self.count = len(data)
+            self._sum, self._squares = float(sums[-1]), float(squares[-1])
+            for i in range(max(0, self.count - self.period), self.count):
+                self._sums[i % self.period] = float(sums[i])
+                self._square_sums[i % self.period] = float(squares[i])
+            self.std = float(std[-1])
+            self.middle, self.upper, self.lower = (float(band[-1]) for band in result)
+        return result
+
+
+class EMA:
+    """Streaming exponential moving average"""
+
+    def __init__(self, period: int, alpha: float = None):
+        """
+        Initialize indicator
+
+        Args:
+            period: Period (seeding window, and alpha = 2 / (period + 1) by default)
+            alpha: Smoothing factor override
+        """
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2 / (period + 1)
+        self.count = 0
+        self.value = math.nan
+        self._decay = 1 - self.alpha
+        self._seed = SMA(period)
+
+    def update(self, value: float) -> float:
+        """Add a value and get the new average (NaN until the first full period)"""
+        if self.count < self.period:
+            self.value = self._seed.update(value)
+        else:
+            self.value = self.alpha * value + self._decay * self.value
+        self.count += 1
+        return self.value
+
+    def peek(self, value: float) -> float:
+        """Get the average update() would return for a value, without adding it"""
+        if self.count < self.period:
+            return self._seed.peek(value)
+        return self.alpha * value + self._decay * self.value
+
+    def prime(self, data: np.ndarray) -> np.ndarray:
+        """
+        Load history in one batch pass and continue streaming from its end
+
+        Returns:
+            The batch result for the history
+        """
+        data = np.asarray(data, dtype=np.float64)
+        result = _smooth(data, self.period, self.alpha)
+        self._seed.prime(data[:self.period])
+        self.count = len(data)
+        if len(data):
+            self.value = float(result[-1])
+        return result
+
+
+class Wilder(EMA):
+    """Streaming Wilder smoothing (alpha = 1 / period)"""
+
+    def __init__(self, period: int):
+        super().__init__(period, alpha=1 / period)
+
+
+class RSI:
+    """Streaming Relative Strength Index"""
+
+    def __init__(self, period: int):
+        """
+        Initialize indicator
+
+        Args:
+            period: RSI period
+        """
+        self.period = period
+        self.value = math.nan
+        self._previous = None
+        self._gains = Wilder(period)
+        self._losses = Wilder(period)
+
+    def update(self, value: float) -> float:
+        """Add a price and get the new RSI (NaN for the first `period` prices)"""
+        previous, self._previous = self._previous, value
+        if previous is None:
+            return self.value
+
+        delta = value - previous
+        avg_gain = self._gains.update(delta if delta > 0 else 0.0)
+        avg_loss = self._losses.update(-delta if delta < 0 else 0.0)
+        if not math.isnan(avg_gain):
+            self.value = _rsi_value(avg_gain, avg_loss)
+        return self.value
+
+    def peek(self, value: float) -> float:
+        """Get the RSI update() would return for a price, without adding it"""
+        if self._previous is None:
+            return self.value
+
+        delta = value - self._previous
+        avg_gain = self._gains.peek(delta if delta > 0 else 0.0)
+        avg_loss = self._losses.peek(-delta if delta < 0 else 0.0)
+        return self.value if math.isnan(avg_gain) else _rsi_value(avg_gain, avg_loss)
+
+    def prime(self, data: np.ndarray) -> np.ndarray:
+        """
+        Load history in one batch pass and continue streaming from its end
+
+        Returns:
+            The batch result for the history
+        """
+        data = np.asarray(data, dtype=np.float64)
+        result = rsi(data, self.period)
+        if len(data):
+            deltas = np.diff(data)
+            self._gains.prime(np.where(deltas > 0, deltas, 0.0))
+            self._losses.prime(np.where(deltas < 0, -deltas, 0.0))
+            self._previous = float(data[-1])
+            self.value = float(result[-1])
+        return result
+
+
+def _rsi_value(avg_gain: float, avg_loss: float) -> float:
+    """RSI from smoothed gains and losses"""
+    if avg_loss != 0:
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+    return 100.0 if avg_gain > 0 else 0.0
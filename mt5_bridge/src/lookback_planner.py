@@ -0,0 +1,158 @@
+"""
+Lookback Planner - Sizes history fetches by what the registered strategies need
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from bars import Bars
+
+logger = logging.getLogger(__name__)
+
+
+def strategy_views(strategies: Dict[Hashable, Any], bars: Bars) -> Dict[Hashable, Bars]:
+    """Zero-copy view of the most recent `lookback` bars for each strategy (by key)"""
+    return {key: bars.tail(strategy.lookback) for key, strategy in strategies.items()}
+
+
+class LookbackPlanner:
+    """
+    Collects the history each strategy needs per symbol/timeframe
+
+    Strategies declare `lookback`: the bars analyze() needs, including
+    indicator warm-up. The planner keeps the largest requirement per symbol
+    and timeframe, fetches that many bars once for all strategies, and hands
+    each strategy a zero-copy view of the most recent bars it asked for.
+    """
+
+    def __init__(self):
+        """Initialize planner"""
+        self._strategies = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, strategy: Any, symbols: Iterable[str], timeframes: Iterable[int]):
+        """
+        Register a strategy for symbols and timeframes
+
+        Args:
+            name: Strategy name
+            strategy: Strategy instance with a lookback attribute
+            symbols: Trading symbols it runs on
+            timeframes: Timeframes in minutes it runs on
+        """
+        with self._lock:
+            for symbol in symbols:
+                for timeframe in timeframes:
+                    self._strategies.setdefault((symbol, timeframe), {})[name] = strategy
+        logger.debug(f"Registered {name} with a lookback of {strategy.lookback} bars")
+
+    def unregister(self, name: str):
+        """Remove a strategy from every symbol/timeframe"""
+        with self._lock:
+            for key in list(self._strategies):
+                self._strategies[key].pop(name, None)
+                if not self._strategies[key]:
+                    del self._strategies[key]
+
+    def strategies(self, symbol: str, timeframe: int) -> Dict[str, Any]:
+        """Strategies registered for a symbol/timeframe (name -> instance)"""
+        with self._lock:
+            return dict(self._strategies.get((symbol, timeframe), {}))
+
+    def requirement(self, symbol: str, timeframe: int) -> int:
+        """Bars to fetch for a symbol/timeframe: the largest lookback plus the forming bar (0 if unused)"""
+        lookback = max((strategy.lookback for strategy in self.strategies(symbol, timeframe).values()), default=0)
+        return lookback + 1 if lookback else 0
+
+    def plan(self, symbols: Optional[Iterable[str]] = None,
+             timeframes: Optional[Iterable[int]] = None) -> Dict[Tuple[str, int], int]:
+        """
+        Get the fetch size of every registered symbol/timeframe
+
+        Args:
+            symbols: Restrict to these symbols (default: all)
+            timeframes: Restrict to these timeframes (default: all)
+
+        Returns:
+            Dictionary of (symbol, timeframe) -> bars to fetch
+        """
+        symbols = set(symbols) if symbols is not None else None
+        timeframes = set(timeframes) if timeframes is not None else None
+        with self._lock:
+            keys = list(self._strategies)
+        return {
+            (symbol, timeframe): self.requirement(symbol, timeframe)
+            for symbol, timeframe in keys
+            if (symbols is None or symbol in symbols) and (timeframes is None or timeframe in timeframes)
+        }
+
+    @property
+    def max_lookback(self) -> int:
+        """Largest fetch size over all symbols/timeframes"""
+        return max(self.plan().values(), default=0)
+
+    def fetch(self, data_provider, symbols: Optional[Iterable[str]] = None,
+              timeframes: Optional[Iterable[int]] = None) -> Dict[Tuple[str, int], Bars]:
+        """
+        Fetch each symbol/timeframe once, sized for its most demanding strategy
+
+        Symbols needing the same timeframe and size are requested together.
+
+        Args:
+            data_provider: DataProvider instance
+            symbols: Restrict to these symbols (default: all)
+            timeframes: Restrict to these timeframes (default: all)
+
+        Returns:
+            Dictionary of (symbol, timeframe) -> bars
+        """
+        groups = {}
+        for (symbol, timeframe), count in self.plan(symbols, timeframes).items():
+            groups.setdefault((timeframe, count), []).append(symbol)
+
+        data = {}
+        for (timeframe, count), group in groups.items():
+            for symbol, bars in data_provider.get_multiple_symbols(group, timeframe, count).items():
+                data[(symbol, timeframe)] = bars
+        return data
+
+    def views(self, symbol: str, timeframe: int, bars: Bars) -> Dict[str, Bars]:
+        """
+        Slice fetched bars for each strategy registered on a symbol/timeframe
+
+        Pass bars[:-1] to evaluate on closed bars only.
+
+        Returns:
+            Dictionary of strategy name -> view of its most recent `lookback` bars
+        """
+        return strategy_views(self.strategies(symbol, timeframe), bars)
+
+    def series(self, histories: Dict[Tuple[str, int], Bars]) -> List[Tuple[str, int, Bars, Dict[str, Any]]]:
+        """
+        Split fetched histories into one input per strategy for evaluate_series()
+
+        Each strategy sees only its own lookback, so its signal does not
+        depend on which other strategies share the symbol/timeframe.
+
+        Args:
+            histories: Dictionary of (symbol, timeframe) -> bars, as from fetch()
+
+        Returns:
+            List of (symbol, timeframe, view, {name: strategy})
+        """
+        inputs = []
+        for (symbol, timeframe), bars in histories.items():
+            strategies = self.strategies(symbol, timeframe)
+            for name, view in strategy_views(strategies, bars).items():
+                inputs.append((symbol, timeframe, view, {name: strategies[name]}))
+        return inputs
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the plan summary"""
+        plan = self.plan()
+        return {
+            'series': len(plan),
+            'max_lookback': max(plan.values(), default=0),
+            'total_bars': sum(plan.values())
+        }
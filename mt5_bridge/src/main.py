@@ -5,6 +5,8 @@ Connects to MetaTrader 5 and provides API for automated trading
 
 import os
 import sys
+import time
+import asyncio
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
@@ -25,20 +27,45 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Import modules
+from config import load_config, get_setting
 from mt5_connector import MT5Connector
+from market_simulator import MarketSimulator
+from fake_mt5 import FakeMT5
 from data_provider import DataProvider
 from execution_engine import ExecutionEngine
-from risk_manager import RiskManager
+from risk_manager import RiskManager, RejectReason
+from tick_stream import TickStream
+from bar_aggregator import BarAggregator
+from bar_archive import BarArchive
+from bars import Bars
+from indicator_graph import IndicatorEngine
+from lookback_planner import LookbackPlanner
+from scheduler import Scheduler
+from pipeline import Pipeline, Stage
+from evaluation_pool import EvaluationPool, evaluate_series
+from signal_netting import SignalNetter
+from account_snapshot import AccountSnapshotService
+from strategies.registry import create_strategies
 
 
 class MT5Bridge:
     """Main MT5 Bridge class"""
     
-    def __init__(self):
+    def __init__(self, config=None):
+        self.config = config if config is not None else load_config()
         self.mt5 = None
         self.data_provider = None
         self.execution_engine = None
         self.risk_manager = None
+        self.tick_stream = None
+        self.strategies = {}
+        self.lookback = LookbackPlanner()
+        self.indicator_engine = IndicatorEngine()
+        self.scheduler = None
+        self.pipeline = None
+        self.evaluation_pool = None
+        self.netter = None
+        self.account = None
         self.is_running = False
         
     def initialize(self):
@@ -47,15 +74,68 @@ class MT5Bridge:
             logger.info("🚀 Initializing MT5 Bridge...")
             
             # Initialize MT5 Connector
-            self.mt5 = MT5Connector()
+            self.mt5 = MT5Connector(
+                timeout=get_setting(self.config, 'performance.timeout', 30),
+                terminal=self._create_simulated_terminal()
+            )
             if not self.mt5.connect():
                 raise Exception("Failed to connect to MT5")
             logger.info("✅ MT5 connected")
             
+            # Initialize account/position snapshots
+            self.account = AccountSnapshotService(
+                self.mt5,
+                max_age=get_setting(self.config, 'account.max_age', 5000) / 1000
+            )
+            self.account.refresh()
+            
+            # Initialize Strategies (their lookback sizes the bar history)
+            self._init_strategies()
+            logger.info(f"✅ Strategies initialized: {', '.join(self.strategies) or 'none'}")
+            
             # Initialize Data Provider
-            self.data_provider = DataProvider(self.mt5)
+            archive = None
+            if get_setting(self.config, 'archive.enabled', False):
+                archive = BarArchive(get_setting(self.config, 'archive.directory', 'data/bars'))
+            
+            self.data_provider = DataProvider(
+                self.mt5,
+                history_size=max(get_setting(self.config, 'performance.history_size', 1000),
+                                 self.lookback.max_lookback),
+                cache_size=get_setting(self.config, 'performance.cache_size', 1024),
+                cache_ttls={'ohlc': get_setting(self.config, 'performance.cache_ttl', 5)},
+                archive=archive
+            )
             logger.info("✅ Data provider initialized")
             
+            # Initialize strategy worker processes
+            if get_setting(self.config, 'evaluation.workers', 0) > 0:
+                self.evaluation_pool = EvaluationPool(
+                    self.lookback,
+                    workers=get_setting(self.config, 'evaluation.workers'),
+                    shard_by=get_setting(self.config, 'evaluation.shard_by', 'symbol'),
+                    timeout=get_setting(self.config, 'evaluation.timeout', 10000) / 1000
+                )
+                self.evaluation_pool.start()
+                logger.info("✅ Evaluation pool started")
+            
+            # Initialize Tick Stream
+            if get_setting(self.config, 'ticks.enabled', False):
+                self.tick_stream = TickStream(
+                    self.mt5,
+                    get_setting(self.config, 'trading.symbols', []),
+                    buffer_size=get_setting(self.config, 'ticks.buffer_size', 10000),
+                    poll_interval=get_setting(self.config, 'ticks.poll_interval', 50) / 1000
+                )
+                self.data_provider.tick_stream = self.tick_stream
+                self.tick_stream.start()
+                logger.info("✅ Tick stream started")
+            
+            # Initialize local bar aggregation
+            if get_setting(self.config, 'aggregation.enabled', False):
+                self._init_aggregation()
+                logger.info("✅ Bar aggregation initialized")
+            
             # Initialize Execution Engine
             self.execution_engine = ExecutionEngine(self.mt5)
             logger.info("✅ Execution engine initialized")
@@ -71,13 +151,318 @@ class MT5Bridge:
             logger.error(f"❌ Initialization failed: {str(e)}")
             raise
     
-    def get_market_data(self, symbol, timeframe):
-        """Get market data for a symbol"""
+    def _create_simulated_terminal(self):
+        """Simulated terminal when MetaTrader5 is not installed (None otherwise)"""
+        try:
+            import MetaTrader5  # noqa: F401
+            return None
+        except ImportError:
+            pass
+        
+        simulator = MarketSimulator(
+            seed=get_setting(self.config, 'simulator.seed', 42),
+            clock=get_setting(self.config, 'simulator.clock', 'real'),
+            speed=get_setting(self.config, 'simulator.speed', 1.0),
+            trade_weekends=get_setting(self.config, 'simulator.trade_weekends', False)
+        )
+        return FakeMT5(
+            simulator,
+            balance=get_setting(self.config, 'simulator.terminal.balance', 10000.0),
+            leverage=get_setting(self.config, 'simulator.terminal.leverage', 100),
+            latency={
+                'default': get_setting(self.config, 'simulator.terminal.latency', 0) / 1000,
+                'order_send': get_setting(self.config, 'simulator.terminal.order_latency', 0) / 1000
+            },
+            jitter=get_setting(self.config, 'simulator.terminal.jitter', 0) / 1000,
+            reject_rate=get_setting(self.config, 'simulator.terminal.reject_rate', 0.0),
+            requote_rate=get_setting(self.config, 'simulator.terminal.requote_rate', 0.0),
+            seed=get_setting(self.config, 'simulator.seed', 42)
+        )
+    
+    def _init_strategies(self):
+        """Create the enabled strategies, register their lookback per symbol/timeframe and set up netting"""
+        self.strategies = create_strategies(self.config)
+        self.netter = SignalNetter(
+            policy=get_setting(self.config, 'netting.policy', 'confidence'),
+            strategy_priority=get_setting(self.config, 'netting.strategy_priority', []),
+            min_agreement=get_setting(self.config, 'netting.min_agreement', 0.5),
+            suppress_open=get_setting(self.config, 'netting.suppress_open', True)
+        )
+        symbols = get_setting(self.config, 'trading.symbols', [])
+        
+        for name, strategy in self.strategies.items():
+            timeframes = get_setting(self.config, f'strategies.{name}.timeframes',
+                                     get_setting(self.config, 'trading.timeframes', []))
+            self.lookback.register(name, strategy, symbols, timeframes)
+    
+    def _init_aggregation(self):
+        """Create one bar aggregator per symbol and feed it from the tick stream"""
+        timeframes = get_setting(self.config, 'aggregation.timeframes')
+        aggregators = {}
+        
+        for symbol in get_setting(self.config, 'trading.symbols', []):
+            aggregator = BarAggregator(symbol, timeframes, self.data_provider.history_size)
+            self.data_provider.attach_aggregator(aggregator)
+            aggregators[symbol] = aggregator
+            
+            if self.data_provider.archive is not None:
+                archive = self.data_provider.archive
+                aggregator.on_bar_close(
+                    lambda symbol, timeframe, bar: archive.append(symbol, timeframe, Bars.from_records([bar]))
+                )
+        
+        if get_setting(self.config, 'aggregation.source', 'ticks') == 'ticks':
+            if not self.tick_stream:
+                raise Exception("Tick aggregation requires the tick stream to be enabled")
+            self.tick_stream.subscribe(lambda symbol, ticks: aggregators[symbol].on_ticks(ticks))
+    
+    async def run(self):
+        """Run the scheduled jobs and the signal pipeline until stopped (stop(), SIGTERM or SIGINT)"""
+        self.pipeline = self._create_pipeline()
+        self.scheduler = self._create_scheduler()
+        self.scheduler.service('pipeline', self.pipeline.run)
+        await self.scheduler.run()
+    
+    def stop(self):
+        """Stop the scheduled jobs"""
+        if self.scheduler:
+            self.scheduler.stop()
+    
+    def _create_scheduler(self):
+        """Register the bar-close, tick and monitoring jobs"""
+        # Follow the simulated terminal's clock when it runs in (possibly accelerated) real time
+        simulator = getattr(self.mt5.mt5, 'simulator', None)
+        if simulator is None or simulator.clock != 'real':
+            simulator = None
+        scheduler = Scheduler(
+            clock=simulator.now if simulator else time.time,
+            speed=simulator.speed if simulator else 1.0,
+            bar_close_delay=get_setting(self.config, 'scheduler.bar_close_delay', 1000) / 1000,
+            server_offset=get_setting(self.config, 'scheduler.server_utc_offset', 0) * 3600,
+            workers=get_setting(self.config, 'scheduler.workers', 4)
+        )
+        
+        timeframes = sorted({timeframe for _, timeframe in self.lookback.plan()})
+        if timeframes:
+            scheduler.on_bar_close('bar_close', timeframes, self.on_bar_close)
+        
+        if self.tick_stream and get_setting(self.config, 'scheduler.evaluate_on_ticks', False):
+            scheduler.on_ticks('ticks', self.tick_stream, self.on_ticks)
+        
+        intervals = {
+            'account_snapshot': ('account.snapshot_interval', self.account.refresh),
+            'market_data': ('monitoring.market_data_interval', self.refresh_market_data),
+            'performance_update': ('monitoring.performance_update_interval', self.report_performance),
+            'risk_check': ('monitoring.risk_check_interval', self.check_risk),
+            'cleanup': ('monitoring.cleanup_interval', self.cleanup)
+        }
+        for name, (path, job) in intervals.items():
+            interval = get_setting(self.config, path)
+            if interval:
+                scheduler.every(name, interval / 1000, job)
+        
+        return scheduler
+    
+    def _create_pipeline(self):
+        """
+        Build the signal pipeline: data → signals → aggregation → risk → execution
+        
+        A bar event travels as one cycle up to the risk stage, which validates
+        the cycle's net signals in one batch. Each stage keeps only the latest
+        pending item per event or symbol, so a slow broker backs the queues up
+        instead of piling up stale signals, and signals older than
+        pipeline.signal_ttl are dropped before risk checks and order submission.
+        """
+        queue_size = get_setting(self.config, 'pipeline.queue_size', 100)
+        signal_ttl = get_setting(self.config, 'pipeline.signal_ttl', 30000) / 1000
+        event = lambda item: (tuple(item['timeframes']), item['close_time'] is None, tuple(item['symbols'] or ()))
+        symbol = lambda item: item['symbol']
+        
+        return Pipeline([
+            Stage('data', self._load_bars, queue_size, key=event),
+            Stage('signals', self._evaluate_bars, queue_size, key=event),
+            Stage('aggregation', self._aggregate_signals, queue_size, key=event),
+            Stage('risk', self._check_signals, queue_size, key=event, max_age=signal_ttl),
+            Stage('execution', self._execute_signal, queue_size, key=symbol,
+                  max_age=signal_ttl, workers=get_setting(self.config, 'pipeline.execution_workers', 1))
+        ])
+    
+    async def on_bar_close(self, timeframes, close_time):
+        """Feed the bars just closed on some timeframes into the pipeline as one cycle"""
+        await self.pipeline.put({'timeframes': timeframes, 'close_time': close_time, 'symbols': None})
+    
+    async def on_ticks(self, symbol, ticks):
+        """Feed the forming bars of a symbol into the pipeline after new ticks"""
+        timeframes = sorted({timeframe for _, timeframe in self.lookback.plan(symbols=[symbol])})
+        await self.pipeline.put({'timeframes': timeframes, 'close_time': None, 'symbols': [symbol]})
+    
+    def evaluate_strategies(self, timeframes, symbols=None, close_time=None):
+        """
+        Run the strategies registered on some timeframes (outside the pipeline)
+        
+        Args:
+            timeframes: Timeframes in minutes
+            symbols: Symbols to evaluate (default: all registered)
+            close_time: Server time of a bar close; evaluates the bars closed by then
+                        (default: include the forming bar)
+        
+        Returns:
+            List of signals, each tagged with its timeframe
+        """
+        event = {'timeframes': timeframes, 'close_time': close_time, 'symbols': symbols}
+        return [
+            signal
+            for item in self._load_bars(event)
+            for cycle in self._evaluate_bars(item)
+            for signals in cycle['signals'].values()
+            for signal in signals
+        ]
+    
+    def _load_bars(self, event):
+        """Data stage: fetch the bars of a market-data event for every symbol/timeframe it covers"""
+        timeframes, close_time = event['timeframes'], event['close_time']
+        if close_time is not None:
+            for symbol, timeframe in self.lookback.plan(event['symbols'], timeframes):
+                self.data_provider.invalidate_ohlc(symbol, timeframe)
+        
+        histories = self.lookback.fetch(self.data_provider, event['symbols'], timeframes)
+        if close_time is not None:
+            # Evaluate closed bars only after a bar close
+            for series, bars in histories.items():
+                if len(bars) > 0 and bars.time[-1] >= close_time:
+                    histories[series] = bars[:-1]
+        return [{**event, 'bars': histories}]
+    
+    def _evaluate_bars(self, item):
+        """Signal stage: run the strategies on every symbol/timeframe, grouping the signals by symbol"""
+        histories = item['bars']
+        
+        if self.evaluation_pool:
+            signals = self.evaluation_pool.evaluate(histories)
+        else:
+            signals = []
+            for _, timeframe, _, signal in evaluate_series(self.indicator_engine, self.lookback.series(histories)):
+                signal['timeframe'] = timeframe
+                signals.append(signal)
+        
+        by_symbol = {}
+        for signal in signals:
+            by_symbol.setdefault(signal['symbol'], []).append(signal)
+        cycle = {key: value for key, value in item.items() if key != 'bars'}
+        return [{**cycle, 'signals': by_symbol}]
+    
+    def _aggregate_signals(self, cycle):
+        """Aggregation stage: net each symbol's signals from one cycle into at most one"""
+        snapshot = self.account.current()
+        positions = snapshot.positions if snapshot else None
+        
+        netted = []
+        for symbol, signals in cycle['signals'].items():
+            signal = self.netter.net(symbol, signals, positions)
+            if signal:
+                logger.info(
+                    f"📈 {signal['action']} {symbol} from {len(signal['sources'])} signal(s) "
+                    f"(confidence {signal['confidence']:.0%}, agreement {signal['agreement']:.0%})"
+                )
+                netted.append(signal)
+        return [{**cycle, 'signals': netted}] if netted else []
+    
+    def _check_signals(self, cycle):
+        """Risk stage: validate a cycle's signals in one batch and pass on the accepted ones"""
+        snapshot = self.account.get()
+        if snapshot is None:
+            logger.warning(f"{len(cycle['signals'])} signal(s) rejected: no account information")
+            return []
+        
+        signals = cycle['signals']
+        accepted, reasons = self.risk_manager.validate_batch(signals, snapshot.account, snapshot.positions)
+        for signal, reason in zip(signals, reasons):
+            if reason:
+                logger.warning(f"Trade rejected ({RejectReason(reason).name}): {signal['action']} {signal['symbol']}")
+        return [signal for signal, ok in zip(signals, accepted) if ok]
+    
+    def _execute_signal(self, signal):
+        """Execution stage: submit the order, sized from the latest snapshot"""
+        snapshot = self.account.get()
+        # Orders filled since the risk check count against the limit too
+        if snapshot and snapshot.open_positions >= self.risk_manager.max_concurrent_positions:
+            logger.warning(f"Trade dropped: max concurrent positions reached before {signal['symbol']} was sent")
+            return []
+        
+        self._submit_trade(signal, snapshot)
+        return []
+    
+    def _validate_trade(self, trade_signal, snapshot):
+        """Validate a signal against an account snapshot"""
+        if snapshot is None:
+            logger.warning(f"Trade rejected: no account information for {trade_signal['symbol']}")
+            return False
+        
+        return self.risk_manager.validate_trade(trade_signal, snapshot.account, snapshot.positions)
+    
+    def _submit_trade(self, trade_signal, snapshot):
+        """Send an order and record it for the daily risk limits and the account snapshot"""
+        result = self.execution_engine.execute(trade_signal, snapshot)
+        if result:
+            self.risk_manager.record_trade(result)
+            self.account.record_fill(result)
+        return result
+    
+    def refresh_market_data(self):
+        """Keep bar histories current so bar-close fetches stay incremental"""
+        if self.data_provider.aggregators and get_setting(self.config, 'aggregation.source', 'ticks') == 'm1':
+            self.data_provider.refresh_aggregates()
+        self.lookback.fetch(self.data_provider)
+    
+    def check_risk(self):
+        """Check account risk limits"""
+        snapshot = self.account.get()
+        if not snapshot:
+            logger.warning("Risk check skipped: no account information")
+            return None
+        
+        metrics = self.risk_manager.get_risk_metrics(snapshot.account)
+        if metrics['daily_loss_percent'] >= metrics['daily_loss_limit']:
+            logger.warning(f"⚠️ Daily loss limit reached: {metrics['daily_loss_percent']:.2f}%")
+        if metrics['drawdown'] >= metrics['max_drawdown']:
+            logger.warning(f"⚠️ Max drawdown reached: {metrics['drawdown']:.2f}%")
+        return metrics
+    
+    def report_performance(self):
+        """Log trading and component statistics"""
+        stats = {
+            'trades': self.execution_engine.get_trade_statistics(),
+            'cache': self.data_provider.get_cache_stats(),
+            'scheduler': self.scheduler.get_stats() if self.scheduler else {},
+            'pipeline': self.pipeline.get_stats() if self.pipeline else {},
+            'account': self.account.get_stats(),
+            'rejections': self.risk_manager.get_reject_stats()
+        }
+        if self.evaluation_pool:
+            stats['evaluation'] = self.evaluation_pool.get_stats()
+        else:
+            stats['indicators'] = self.indicator_engine.get_stats()
+        if self.netter:
+            stats['netting'] = self.netter.get_stats()
+        if self.tick_stream:
+            stats['ticks'] = self.tick_stream.get_stats()
+        logger.debug(f"Performance: {stats}")
+        return stats
+    
+    def cleanup(self):
+        """Drop expired cache entries"""
+        purged = self.data_provider.cache.purge()
+        if purged:
+            logger.debug(f"Cleanup: {purged} expired cache entries dropped")
+    
+    def get_market_data(self, symbol, timeframe, count=None):
+        """Get market data for a symbol (default: the bars its strategies need)"""
         try:
             if not self.data_provider:
                 raise Exception("Data provider not initialized")
             
-            return self.data_provider.get_ohlc(symbol, timeframe)
+            count = count or self.lookback.requirement(symbol, timeframe) or 100
+            return self.data_provider.get_ohlc(symbol, timeframe, count)
             
         except Exception as e:
             logger.error(f"Error getting market data: {str(e)}")
@@ -90,12 +475,12 @@ class MT5Bridge:
                 raise Exception("Execution engine not initialized")
             
             # Validate with risk manager
-            if not self.risk_manager.validate_trade(trade_signal):
-                logger.warning(f"Trade rejected by risk manager: {trade_signal}")
+            snapshot = self.account.get()
+            if not self._validate_trade(trade_signal, snapshot):
                 return None
             
             # Execute trade
-            result = self.execution_engine.execute(trade_signal)
+            result = self._submit_trade(trade_signal, snapshot)
             logger.info(f"Trade executed: {result}")
             return result
             
@@ -109,7 +494,20 @@ class MT5Bridge:
             if not self.execution_engine:
                 raise Exception("Execution engine not initialized")
             
-            result = self.execution_engine.close(ticket)
+            trade = self.execution_engine.executed_trades.get(ticket)
+            if trade is None:
+                logger.warning(f"Trade ticket not found: {ticket}")
+                return None
+            
+            # A BUY closes at the bid, a SELL at the ask
+            tick = self.data_provider.get_tick_data(trade['symbol'])
+            if tick is None:
+                raise Exception(f"No price for {trade['symbol']}")
+            exit_price = tick['bid'] if trade['action'] == 'BUY' else tick['ask']
+            
+            result = self.execution_engine.close(ticket, exit_price, trade['symbol'])
+            if result:
+                self.account.record_close(ticket)
             logger.info(f"Trade closed: {result}")
             return result
             
@@ -134,6 +532,12 @@ class MT5Bridge:
         try:
             logger.info("⛔ Shutting down MT5 Bridge...")
             
+            if self.tick_stream:
+                self.tick_stream.stop()
+            
+            if self.evaluation_pool:
+                self.evaluation_pool.stop()
+            
             if self.mt5:
                 self.mt5.disconnect()
             
@@ -152,19 +556,9 @@ def main():
         # Initialize
         bridge.initialize()
         
-        # Keep running
+        # Run scheduled jobs until SIGTERM/SIGINT
         logger.info("MT5 Bridge is running. Press Ctrl+C to stop.")
-        
-        while bridge.is_running:
-            try:
-                # Process market data
-                # Generate signals
-                # Execute trades
-                pass
-            except KeyboardInterrupt:
-                break
-            except Exception as e:
-                logger.error(f"Error in main loop: {str(e)}")
+        asyncio.run(bridge.run())
     
     except Exception as e:
         logger.error(f"Fatal error: {str(e)}")
@@ -0,0 +1,419 @@
+"""
+Market Simulator - Deterministic synthetic bars and ticks for mock mode
+"""
+
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import numpy as np
+
+from bars import Bars, BAR_DTYPE, TICK_DTYPE
+
+logger = logging.getLogger(__name__)
+
+# Default market parameters per symbol (annualized volatility, spread in price units,
+# contract size in units of the base asset per lot)
+DEFAULT_PROFILES = {
+    'EURUSD': {'price': 1.0850, 'spread': 0.00012, 'volatility': 0.07, 'point': 0.00001, 'digits': 5, 'contract_size': 100000},
+    'GBPUSD': {'price': 1.2700, 'spread': 0.00015, 'volatility': 0.08, 'point': 0.00001, 'digits': 5, 'contract_size': 100000},
+    'USDJPY': {'price': 150.00, 'spread': 0.015, 'volatility': 0.09, 'point': 0.001, 'digits': 3, 'contract_size': 100000},
+    'AUDUSD': {'price': 0.6600, 'spread': 0.00014, 'volatility': 0.10, 'point': 0.00001, 'digits': 5, 'contract_size': 100000},
+    'NZDUSD': {'price': 0.6100, 'spread': 0.00018, 'volatility': 0.10, 'point': 0.00001, 'digits': 5, 'contract_size': 100000},
+    'USDCAD': {'price': 1.3600, 'spread': 0.00018, 'volatility': 0.06, 'point': 0.00001, 'digits': 5, 'contract_size': 100000},
+    'USDCHF': {'price': 0.8800, 'spread': 0.00016, 'volatility': 0.07, 'point': 0.00001, 'digits': 5, 'contract_size': 100000},
+    'GOLD': {'price': 2000.0, 'spread': 0.30, 'volatility': 0.15, 'point': 0.01, 'digits': 2, 'contract_size': 100},
+    'OIL': {'price': 78.00, 'spread': 0.03, 'volatility': 0.35, 'point': 0.01, 'digits': 2, 'contract_size': 1000}
+}
+
+DEFAULT_PROFILE = {'price': 1.0000, 'spread': 0.00020, 'volatility': 0.10, 'point': 0.00001, 'digits': 5, 'contract_size': 100000}
+
+# Relative volatility by UTC hour: quiet Asian session, London/New York overlap most active
+SESSION_VOLATILITY = np.array([
+    0.6, 0.6, 0.6, 0.6, 0.6, 0.6, 0.7, 0.9,
+    1.2, 1.3, 1.2, 1.1, 1.2, 1.5, 1.6, 1.5,
+    1.3, 1.1, 0.9, 0.8, 0.7, 0.6, 0.6, 0.6
+])
+
+TICKS_PER_MINUTE = 12
+TRADING_DAYS_PER_YEAR = 260
+SECONDS_PER_DAY = 86400
+TICK_CACHE_DAYS = 16
+
+# Day (since the epoch) on which each symbol trades at its profile price: 2024-01-01
+ANCHOR_DAY = 19723
+
+
+class MarketSimulator:
+    """
+    Seeded synthetic market for development and load testing
+
+    Prices follow a daily geometric random walk generated once per symbol
+    from a fixed origin. Each day's ticks are a Brownian bridge between
+    consecutive daily opens, with volatility shaped by session and
+    occasional jumps, generated in one vectorized pass and seeded by
+    (seed, symbol, day). Any day can therefore be rebuilt independently
+    and every call sees the same history.
+    """
+
+    def __init__(self, seed: int = 42, profiles: Optional[Dict[str, Dict[str, Any]]] = None,
+                 clock: str = 'real', speed: float = 1.0, start_time: Optional[float] = None,
+                 trade_weekends: bool = False, jump_probability: float = 0.0005,
+                 jump_size: float = 0.0015, cache_days: int = 1024):
+        """
+        Initialize market simulator
+
+        Args:
+            seed: Random seed
+            profiles: Per-symbol overrides of price, spread, volatility, point, digits, contract_size
+            clock: 'real' to follow wall-clock time, 'simulated' to advance manually
+            speed: Simulated seconds per real second (real clock only)
+            start_time: Simulated start time in seconds (default: now)
+            trade_weekends: Keep the market open from Friday 22:00 to Sunday 22:00 UTC
+            jump_probability: Probability of a price jump per tick
+            jump_size: Standard deviation of jumps as a fraction of price
+            cache_days: Number of generated symbol-days of M1 bars kept in memory
+        """
+        self.seed = seed
+        self.profiles = {**DEFAULT_PROFILES, **(profiles or {})}
+        self.clock = clock
+        self.speed = speed
+        self.trade_weekends = trade_weekends
+        self.jump_probability = jump_probability
+        self.jump_size = jump_size
+        self.cache_days = cache_days
+
+        self._real_start = time.time()
+        self._sim_start = start_time if start_time is not None else self._real_start
+        self._sim_now = self._sim_start
+        self._daily = {}
+        self._bar_days = OrderedDict()
+        self._tick_days = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Clock
+
+    def now(self) -> float:
+        """Current simulated time in seconds"""
+        if self.clock == 'simulated':
+            return self._sim_now
+        return self._sim_start + (time.time() - self._real_start) * self.speed
+
+    def advance(self, seconds: float):
+        """Move the simulated clock forward"""
+        self._sim_now += seconds
+
+    def is_open(self, timestamp: Optional[float] = None) -> bool:
+        """Whether the market is open at a time (default: now)"""
+        if self.trade_weekends:
+            return True
+        timestamp = self.now() if timestamp is None else timestamp
+        return not bool(_is_weekend_closed(np.array([int(timestamp)]))[0])
+
+    # Public data API
+
+    def profile(self, symbol: str) -> Dict[str, Any]:
+        """Market parameters for a symbol"""
+        return {**DEFAULT_PROFILE, **self.profiles.get(symbol, {})}
+
+    def symbol_info(self, symbol: str) -> Dict[str, Any]:
+        """Symbol information with the current bid/ask"""
+        profile = self.profile(symbol)
+        tick = self.tick(symbol)
+        return {
+            'symbol': symbol,
+            'bid': tick['bid'],
+            'ask': tick['ask'],
+            'point': profile['point'],
+            'digits': profile['digits'],
+            'spread': int(round((tick['ask'] - tick['bid']) / profile['point'])),
+            'volume': 1000000,
+            'time': tick['time']
+        }
+
+    def tick(self, symbol: str) -> Dict[str, Any]:
+        """Most recent tick at or before now"""
+        now_msc = int(self.now() * 1000)
+        day = now_msc // (SECONDS_PER_DAY * 1000)
+
+        # Walk back to the last traded tick (e.g. over a weekend)
+        for offset in range(8):
+            ticks = self._day_ticks(symbol, day - offset)
+            ticks = ticks[:np.searchsorted(ticks['time_msc'], now_msc, side='right')]
+            if len(ticks):
+                last = ticks[-1]
+                return {'time': int(last['time']), 'time_msc': int(last['time_msc']),
+                        'bid': float(last['bid']), 'ask': float(last['ask'])}
+
+        price = self.profile(symbol)['price']
+        return {'time': now_msc // 1000, 'time_msc': now_msc, 'bid': price,
+                'ask': price + self.profile(symbol)['spread']}
+
+    def ticks(self, symbol: str, from_msc: int, to_msc: Optional[int] = None) -> np.ndarray:
+        """
+        Ticks with time_msc in (from_msc, to_msc]
+
+        Args:
+            symbol: Trading symbol
+            from_msc: Exclusive start in milliseconds
+            to_msc: Inclusive end in milliseconds (default: now)
+
+        Returns:
+            TICK_DTYPE array
+        """
+        if to_msc is None:
+            to_msc = int(self.now() * 1000)
+
+        first_day = from_msc // (SECONDS_PER_DAY * 1000)
+        last_day = to_msc // (SECONDS_PER_DAY * 1000)
+        parts = []
+        for day in range(first_day, last_day + 1):
+            ticks = self._day_ticks(symbol, day)
+            times = ticks['time_msc']
+            parts.append(ticks[np.searchsorted(times, from_msc, side='right'):
+                               np.searchsorted(times, to_msc, side='right')])
+
+        return np.concatenate(parts) if parts else np.empty(0, dtype=TICK_DTYPE)
+
+    def rates(self, symbol: str, timeframe: int, count: int) -> Bars:
+        """
+        Most recent bars up to now, the last one still forming
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe in minutes
+            count: Number of bars
+
+        Returns:
+            Bars sorted by time
+        """
+        now = self.now()
+        # Calendar days spanned by `count` bars, with room for weekends
+        days = int(count * timeframe / 1440 * 7 / 5) + 3
+
+        while True:
+            bars = self.rates_range(symbol, timeframe, int(now) - days * SECONDS_PER_DAY, int(now))
+            if len(bars) >= count or days > 36500:
+                return bars.tail(count)
+            days *= 2
+
+    def rates_range(self, symbol: str, timeframe: int, date_from: int, date_to: int) -> Bars:
+        """
+        Bars with open time in [date_from, date_to]; a bar containing now is built from ticks so far
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Timeframe in minutes
+            date_from: Start time in seconds
+            date_to: End time in seconds
+
+        Returns:
+            Bars sorted by time
+        """
+        period = timeframe * 60
+        now = self.now()
+        date_to = min(date_to, int(now))
+        start = date_from - date_from % period
+        if date_to < start:
+            return Bars.empty()
+
+        # Collect M1 bars covering the requested periods
+        current_minute = int(now) - int(now) % 60
+        end = min(date_to - date_to % period + period, current_minute + 60)
+        m1 = np.concatenate([
+            self._day_bars(symbol, day)
+            for day in range(start // SECONDS_PER_DAY, (end - 1) // SECONDS_PER_DAY + 1)
+        ])
+        m1 = m1[(m1['time'] >= start) & (m1['time'] < end)]
+
+        # Replace the M1 bar still forming with one built from ticks so far
+        if len(m1) and m1['time'][-1] == current_minute:
+            forming = self._partial_minute(symbol, current_minute, int(now * 1000))
+            if forming is None:
+                m1 = m1[:-1]
+            else:
+                m1 = m1.copy()
+                m1[-1] = forming
+
+        bars = _aggregate(m1, period)
+        return Bars(bars[bars['time'] >= date_from - date_from % period])
+
+    # Generation
+
+    def _symbol_id(self, symbol: str) -> int:
+        """Stable numeric id for seeding"""
+        return zlib.crc32(symbol.encode())
+
+    def _day_open_log_price(self, symbol: str, day: int) -> float:
+        """Log price at the start of a day (days since the epoch)"""
+        with self._lock:
+            path = self._daily.get(symbol)
+            if path is None or day + 1 >= len(path):
+                path = self._generate_daily_path(symbol, max(day + 2, 20000 if path is None else len(path) * 2))
+                self._daily[symbol] = path
+        return float(path[day])
+
+    def _generate_daily_path(self, symbol: str, days: int) -> np.ndarray:
+        """Daily log prices from the epoch, zero drift in price terms"""
+        profile = self.profile(symbol)
+        rng = np.random.default_rng([self.seed, self._symbol_id(symbol)])
+        sigma = profile['volatility'] / np.sqrt(TRADING_DAYS_PER_YEAR)
+
+        returns = rng.normal(-0.5 * sigma ** 2, sigma, days)
+        weekday = (np.arange(days) + 3) % 7
+        if not self.trade_weekends:
+            returns[weekday >= 5] = 0.0
+
+        path = np.concatenate([[0.0], np.cumsum(returns)])
+        return np.log(profile['price']) + path - path[min(ANCHOR_DAY, len(path) - 1)]
+
+    def _day_bars(self, symbol: str, day: int) -> np.ndarray:
+        """M1 bars of one day"""
+        with self._lock:
+            m1 = _lru_get(self._bar_days, (symbol, day))
+        if m1 is None:
+            _, m1 = self._generate_cached(symbol, day, keep_ticks=False)
+        return m1
+
+    def _day_ticks(self, symbol: str, day: int) -> np.ndarray:
+        """Ticks of one day"""
+        with self._lock:
+            ticks = _lru_get(self._tick_days, (symbol, day))
+        if ticks is None:
+            ticks, _ = self._generate_cached(symbol, day, keep_ticks=True)
+        return ticks
+
+    def _generate_cached(self, symbol: str, day: int, keep_ticks: bool) -> tuple:
+        """Generate a day and cache it; ticks are large, so only a few days of them are kept"""
+        ticks, m1 = self._generate_day(symbol, day)
+        with self._lock:
+            _lru_put(self._bar_days, (symbol, day), m1, self.cache_days)
+            if keep_ticks:
+                _lru_put(self._tick_days, (symbol, day), ticks, TICK_CACHE_DAYS)
+        return ticks, m1
+
+    def _generate_day(self, symbol: str, day: int) -> tuple:
+        """Generate one day of ticks as a Brownian bridge between daily opens, and its M1 bars"""
+        profile = self.profile(symbol)
+        start_log = self._day_open_log_price(symbol, day)
+        end_log = self._day_open_log_price(symbol, day + 1)
+        rng = np.random.default_rng([self.seed, self._symbol_id(symbol), day])
+
+        minutes = np.arange(1440)
+        minute_times = day * SECONDS_PER_DAY + minutes * 60
+        is_open = np.ones(1440, dtype=bool) if self.trade_weekends else ~_is_weekend_closed(minute_times)
+
+        # Tick increments with session-shaped variance, none while closed
+        weight = np.repeat(SESSION_VOLATILITY[minutes // 60] * is_open, TICKS_PER_MINUTE)
+        sigma = profile['volatility'] / np.sqrt(TRADING_DAYS_PER_YEAR * 1440 * TICKS_PER_MINUTE)
+        variance = (sigma * weight) ** 2
+        increments = rng.standard_normal(len(weight)) * np.sqrt(variance)
+
+        jumps = rng.random(len(weight)) < self.jump_probability * (weight > 0)
+        increments[jumps] += rng.normal(0.0, self.jump_size, int(jumps.sum()))
+
+        # Bridge the walk so the day ends at the next day's open
+        walk = np.cumsum(increments)
+        total_variance = variance.sum()
+        if total_variance > 0:
+            walk -= np.cumsum(variance) / total_variance * (walk[-1] - (end_log - start_log))
+        bids = np.exp(start_log + walk)
+
+        # Spreads widen in quiet sessions
+        spreads = profile['spread'] * (1.5 - 0.5 * np.minimum(weight, 1.0))
+
+        slot = 60000 // TICKS_PER_MINUTE
+        offsets = np.tile(np.arange(TICKS_PER_MINUTE) * slot, 1440) + rng.integers(0, slot, len(weight))
+        time_msc = np.repeat(minute_times * 1000, TICKS_PER_MINUTE) + offsets
+
+        digits = profile['digits']
+        traded = weight > 0
+        ticks = np.zeros(int(traded.sum()), dtype=TICK_DTYPE)
+        ticks['time_msc'] = time_msc[traded]
+        ticks['time'] = ticks['time_msc'] // 1000
+        ticks['bid'] = np.round(bids[traded], digits)
+        ticks['ask'] = np.round(bids[traded] + spreads[traded], digits)
+        ticks['volume'] = 1
+        ticks['flags'] = 6  # TICK_FLAG_BID | TICK_FLAG_ASK
+
+        return ticks, _ticks_to_bars(ticks, 60, profile)
+
+    def _partial_minute(self, symbol: str, minute: int, now_msc: int) -> Optional[np.ndarray]:
+        """M1 bar built from the ticks of a minute up to now"""
+        ticks = self.ticks(symbol, minute * 1000 - 1, now_msc)
+        if len(ticks) == 0:
+            return None
+        return _ticks_to_bars(ticks, 60, self.profile(symbol))[0]
+
+
+def to_usd(symbol: str, amount, price):
+    """Convert an amount (or array) in the symbol's quote currency to USD"""
+    if symbol.startswith('USD') and len(symbol) == 6:
+        return amount / price
+    return amount
+
+
+def _lru_get(cache: OrderedDict, key) -> Optional[np.ndarray]:
+    """Get an entry from an LRU dict, marking it recently used"""
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _lru_put(cache: OrderedDict, key, value: np.ndarray, size: int):
+    """Add an entry to an LRU dict, evicting the oldest beyond `size`"""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+
+def _is_weekend_closed(times: np.ndarray) -> np.ndarray:
+    """Whether times fall between Friday 22:00 and Sunday 22:00 UTC"""
+    weekday = (times // SECONDS_PER_DAY + 3) % 7  # Monday = 0
+    hour = (times % SECONDS_PER_DAY) // 3600
+    return ((weekday == 4) & (hour >= 22)) | (weekday == 5) | ((weekday == 6) & (hour < 22))
+
+
+def _ticks_to_bars(ticks: np.ndarray, period: int, profile: Dict[str, Any]) -> np.ndarray:
+    """Aggregate ticks into bars of `period` seconds"""
+    if len(ticks) == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+
+    buckets = ticks['time'] - ticks['time'] % period
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    ends = np.append(starts[1:], len(ticks))
+    bids = ticks['bid']
+
+    bars = np.zeros(len(starts), dtype=BAR_DTYPE)
+    bars['time'] = buckets[starts]
+    bars['open'] = bids[starts]
+    bars['high'] = np.maximum.reduceat(bids, starts)
+    bars['low'] = np.minimum.reduceat(bids, starts)
+    bars['close'] = bids[ends - 1]
+    bars['tick_volume'] = ends - starts
+    bars['spread'] = np.round((ticks['ask'][ends - 1] - bids[ends - 1]) / profile['point'])
+    return bars
+
+
+def _aggregate(m1: np.ndarray, period: int) -> np.ndarray:
+    """Roll M1 bars up into bars of `period` seconds"""
+    if period == 60 or len(m1) == 0:
+        return m1
+
+    buckets = m1['time'] - m1['time'] % period
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    ends = np.append(starts[1:], len(m1))
+
+    bars = np.zeros(len(starts), dtype=BAR_DTYPE)
+    bars['time'] = buckets[starts]
+    bars['open'] = m1['open'][starts]
+    bars['high'] = np.maximum.reduceat(m1['high'], starts)
+    bars['low'] = np.minimum.reduceat(m1['low'], starts)
+    bars['close'] = m1['close'][ends - 1]
+    bars['tick_volume'] = np.add.reduceat(m1['tick_volume'], starts)
+    bars['spread'] = m1['spread'][ends - 1]
+    return bars
@@ -4,16 +4,43 @@ MT5 Connector - Handles connection to MetaTrader 5
 
 import logging
 import os
+from concurrent.futures import Future
 from typing import Optional, Dict, Any
 from datetime import datetime
+import numpy as np
+
+from bars import Bars, TICK_DTYPE
+from fake_mt5 import FakeMT5
+from mt5_executor import MT5Executor, Lane
 
 logger = logging.getLogger(__name__)
 
+# MetaTrader5 timeframe constant names by timeframe in minutes
+MT5_TIMEFRAMES = {
+    1: 'TIMEFRAME_M1',
+    5: 'TIMEFRAME_M5',
+    15: 'TIMEFRAME_M15',
+    30: 'TIMEFRAME_M30',
+    60: 'TIMEFRAME_H1',
+    240: 'TIMEFRAME_H4',
+    1440: 'TIMEFRAME_D1'
+}
+
 
 class MT5Connector:
     """Manages connection to MetaTrader 5"""
     
-    def __init__(self):
+    def __init__(self, timeout: float = 30.0, terminal: Any = None):
+        """
+        Initialize connector
+        
+        Args:
+            timeout: Deadline in seconds for each terminal call
+            terminal: MetaTrader5 module or a compatible fake (default: MetaTrader5
+                      if installed, otherwise a simulated FakeMT5 terminal)
+        """
+        self.timeout = timeout
+        self.executor = MT5Executor(timeout)
         self.connected = False
         self.account_info = None
         self.broker_name = os.getenv('MT5_BROKER', 'Default Broker')
@@ -21,37 +48,40 @@ class MT5Connector:
         self.password = os.getenv('MT5_PASSWORD', '')
         self.server = os.getenv('MT5_SERVER', '')
         
+        if terminal is not None:
+            self.mt5 = terminal
+            return
+        
         # Try to import MetaTrader5
         try:
             import MetaTrader5 as mt5
             self.mt5 = mt5
         except ImportError:
-            logger.warning("MetaTrader5 not installed. Using mock mode.")
-            self.mt5 = None
+            logger.warning("MetaTrader5 not installed. Using simulated terminal.")
+            self.mt5 = FakeMT5()
     
     def connect(self) -> bool:
         """Connect to MT5"""
         try:
-            if self.mt5 is None:
-                logger.info("🔌 Using mock MT5 connection (for development)")
-                self.connected = True
-                self.account_info = self._get_mock_account_info()
-                return True
+            if isinstance(self.mt5, FakeMT5):
+                logger.info("🔌 Using simulated MT5 terminal (for development)")
             
             # Initialize MT5
-            if not self.mt5.initialize():
-                logger.error(f"MT5 initialization failed: {self.mt5.last_error()}")
+            if not self.executor.call(self.mt5.initialize, lane=Lane.SYNC):
+                logger.error(f"MT5 initialization failed: {self.executor.call(self.mt5.last_error, lane=Lane.SYNC)}")
                 return False
             
             # Login
             if self.login and self.password and self.server:
-                authorized = self.mt5.login(
+                authorized = self.executor.call(
+                    self.mt5.login,
+                    lane=Lane.SYNC,
                     login=int(self.login),
                     password=self.password,
                     server=self.server
                 )
                 if not authorized:
-                    logger.error(f"MT5 login failed: {self.mt5.last_error()}")
+                    logger.error(f"MT5 login failed: {self.executor.call(self.mt5.last_error, lane=Lane.SYNC)}")
                     return False
             
             self.connected = True
@@ -66,10 +96,11 @@ class MT5Connector:
     def disconnect(self) -> bool:
         """Disconnect from MT5"""
         try:
-            if self.mt5 and self.connected:
-                self.mt5.shutdown()
+            if self.connected:
+                self.executor.call(self.mt5.shutdown, lane=Lane.SYNC)
                 self.connected = False
                 logger.info("✅ Disconnected from MT5")
+            self.executor.stop()
             return True
         except Exception as e:
             logger.error(f"Disconnection error: {str(e)}")
@@ -81,92 +112,174 @@ class MT5Connector:
             if not self.connected:
                 return None
             
-            if self.mt5 is None:
-                return self._get_mock_account_info()
-            
-            account_info = self.mt5.account_info()
-            if account_info is None:
-                logger.error("Failed to get account info")
-                return None
-            
-            return {
-                'login': account_info.login,
-                'name': account_info.name,
-                'server': account_info.server,
-                'currency': account_info.currency,
-                'balance': account_info.balance,
-                'credit': account_info.credit,
-                'equity': account_info.equity,
-                'margin': account_info.margin,
-                'free_margin': account_info.free_margin,
-                'margin_level': account_info.margin_level,
-                'leverage': account_info.leverage,
-                'profit': account_info.profit,
-                'timestamp': datetime.now().isoformat()
-            }
+            return self.request_account_info().result(self.timeout)
             
         except Exception as e:
             logger.error(f"Error getting account info: {str(e)}")
             return None
     
+    def request_account_info(self) -> Future:
+        """Request account information without blocking (coalesced)"""
+        return self.executor.submit(self._fetch_account_info, key=('account_info',), lane=Lane.SYNC)
+    
+    def _fetch_account_info(self) -> Optional[Dict[str, Any]]:
+        """Read account information (runs on the MT5 thread)"""
+        account_info = self.mt5.account_info()
+        if account_info is None:
+            logger.error("Failed to get account info")
+            return None
+        
+        return {
+            'login': account_info.login,
+            'name': account_info.name,
+            'server': account_info.server,
+            'currency': account_info.currency,
+            'balance': account_info.balance,
+            'credit': account_info.credit,
+            'equity': account_info.equity,
+            'margin': account_info.margin,
+            'free_margin': account_info.margin_free,
+            'margin_level': account_info.margin_level,
+            'leverage': account_info.leverage,
+            'profit': account_info.profit,
+            'timestamp': datetime.now().isoformat()
+        }
+    
     def get_symbol_info(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Get symbol information"""
         try:
             if not self.connected:
                 return None
             
-            if self.mt5 is None:
-                return self._get_mock_symbol_info(symbol)
-            
-            symbol_info = self.mt5.symbol_info(symbol)
-            if symbol_info is None:
-                logger.warning(f"Symbol not found: {symbol}")
-                return None
-            
-            return {
-                'symbol': symbol_info.name,
-                'bid': symbol_info.bid,
-                'ask': symbol_info.ask,
-                'point': symbol_info.point,
-                'digits': symbol_info.digits,
-                'spread': symbol_info.spread,
-                'volume': symbol_info.volume,
-                'time': symbol_info.time
-            }
+            return self.request_symbol_info(symbol).result(self.timeout)
             
         except Exception as e:
             logger.error(f"Error getting symbol info: {str(e)}")
             return None
     
-    def get_rates(self, symbol: str, timeframe: int, count: int = 100) -> Optional[list]:
+    def request_symbol_info(self, symbol: str) -> Future:
+        """Request symbol information without blocking (coalesced)"""
+        return self.executor.submit(
+            self._fetch_symbol_info, symbol,
+            key=('symbol_info', symbol), lane=Lane.DATA
+        )
+    
+    def _fetch_symbol_info(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Read symbol information (runs on the MT5 thread)"""
+        symbol_info = self.mt5.symbol_info(symbol)
+        if symbol_info is None:
+            logger.warning(f"Symbol not found: {symbol}")
+            return None
+        
+        return {
+            'symbol': symbol_info.name,
+            'bid': symbol_info.bid,
+            'ask': symbol_info.ask,
+            'point': symbol_info.point,
+            'digits': symbol_info.digits,
+            'spread': symbol_info.spread,
+            'volume': symbol_info.volume,
+            'time': symbol_info.time
+        }
+    
+    def get_rates(self, symbol: str, timeframe: int, count: int = 100) -> Optional[Bars]:
         """Get OHLC rates"""
         try:
             if not self.connected:
                 return None
             
-            if self.mt5 is None:
-                return self._get_mock_rates(symbol, count)
+            return self.request_rates(symbol, timeframe, count).result(self.timeout)
             
-            rates = self.mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
-            if rates is None:
-                logger.warning(f"Failed to get rates for {symbol}")
+        except Exception as e:
+            logger.error(f"Error getting rates: {str(e)}")
+            return None
+    
+    def request_rates(self, symbol: str, timeframe: int, count: int = 100) -> Future:
+        """Request OHLC rates without blocking (coalesced)"""
+        return self.executor.submit(
+            self._fetch_rates, symbol, timeframe, count,
+            key=('rates', symbol, timeframe, count), lane=Lane.DATA
+        )
+    
+    def _fetch_rates(self, symbol: str, timeframe: int, count: int) -> Optional[Bars]:
+        """Read OHLC rates (runs on the MT5 thread)"""
+        rates = self.mt5.copy_rates_from_pos(symbol, self._timeframe(timeframe), 0, count)
+        if rates is None:
+            logger.warning(f"Failed to get rates for {symbol}")
+            return None
+        
+        return Bars(rates)
+    
+    def get_rates_range(self, symbol: str, timeframe: int, date_from: int, date_to: int) -> Optional[Bars]:
+        """Get OHLC rates with open time in [date_from, date_to] (seconds)"""
+        try:
+            if not self.connected:
                 return None
             
-            return [
-                {
-                    'time': int(rate[0]),
-                    'open': float(rate[1]),
-                    'high': float(rate[2]),
-                    'low': float(rate[3]),
-                    'close': float(rate[4]),
-                    'volume': int(rate[5])
-                }
-                for rate in rates
-            ]
+            return self.request_rates_range(symbol, timeframe, date_from, date_to).result(self.timeout)
             
         except Exception as e:
-            logger.error(f"Error getting rates: {str(e)}")
+            logger.error(f"Error getting rates range: {str(e)}")
+            return None
+    
+    def request_rates_range(self, symbol: str, timeframe: int, date_from: int, date_to: int) -> Future:
+        """Request OHLC rates for a time range without blocking (coalesced)"""
+        return self.executor.submit(
+            self._fetch_rates_range, symbol, timeframe, date_from, date_to,
+            key=('rates_range', symbol, timeframe, date_from, date_to), lane=Lane.DATA
+        )
+    
+    def _fetch_rates_range(self, symbol: str, timeframe: int, date_from: int, date_to: int) -> Optional[Bars]:
+        """Read OHLC rates for a time range (runs on the MT5 thread)"""
+        rates = self.mt5.copy_rates_range(symbol, self._timeframe(timeframe), date_from, date_to)
+        if rates is None:
+            logger.warning(f"Failed to get rates range for {symbol}: {self.mt5.last_error()}")
+            return None
+        
+        return Bars(rates)
+    
+    def _timeframe(self, minutes: int) -> int:
+        """Map a timeframe in minutes to the MetaTrader5 constant"""
+        name = MT5_TIMEFRAMES.get(minutes)
+        return getattr(self.mt5, name) if name else minutes
+    
+    def request_ticks(self, symbol: str, since_msc: Optional[int] = None, count: int = 1000) -> Future:
+        """
+        Request ticks newer than a timestamp without blocking (coalesced)
+        
+        Args:
+            symbol: Trading symbol
+            since_msc: Time of the last tick already seen, in milliseconds
+                       (None for just the current tick)
+            count: Maximum number of ticks
+            
+        Returns:
+            Future resolving to a TICK_DTYPE array or None
+        """
+        return self.executor.submit(
+            self._fetch_ticks, symbol, since_msc, count,
+            key=('ticks', symbol, since_msc, count), lane=Lane.DATA
+        )
+    
+    def _fetch_ticks(self, symbol: str, since_msc: Optional[int], count: int) -> Optional[np.ndarray]:
+        """Read ticks (runs on the MT5 thread)"""
+        if since_msc is None:
+            tick = self.mt5.symbol_info_tick(symbol)
+            if tick is None:
+                logger.warning(f"Failed to get tick for {symbol}")
+                return None
+            
+            ticks = np.zeros(1, dtype=TICK_DTYPE)
+            ticks[0] = (tick.time, tick.bid, tick.ask, tick.last, tick.volume,
+                        tick.time_msc, tick.flags, tick.volume_real)
+            return ticks
+        
+        ticks = self.mt5.copy_ticks_from(symbol, since_msc // 1000, count, self.mt5.COPY_TICKS_ALL)
+        if ticks is None:
+            logger.warning(f"Failed to get ticks for {symbol}")
             return None
+        
+        return ticks[ticks['time_msc'] > since_msc]
     
     def send_order(self, symbol: str, order_type: str, volume: float, 
                    price: float, sl: float, tp: float, comment: str = "") -> Optional[int]:
@@ -176,10 +289,6 @@ class MT5Connector:
                 logger.error("Not connected to MT5")
                 return None
             
-            if self.mt5 is None:
-                # Mock order
-                return 12345
-            
             # Prepare order
             order_type_enum = self.mt5.ORDER_TYPE_BUY if order_type == 'BUY' else self.mt5.ORDER_TYPE_SELL
             
@@ -196,7 +305,10 @@ class MT5Connector:
                 "type_filling": self.mt5.ORDER_FILLING_IOC
             }
             
-            result = self.mt5.order_send(request)
+            result = self.executor.call(self.mt5.order_send, request, lane=Lane.ORDER)
+            if result is None:
+                logger.error(f"Order failed: {self.executor.call(self.mt5.last_error, lane=Lane.SYNC)}")
+                return None
             if result.retcode != self.mt5.TRADE_RETCODE_DONE:
                 logger.error(f"Order failed: {result.comment}")
                 return None
@@ -214,112 +326,70 @@ class MT5Connector:
             if not self.connected:
                 return False
             
-            if self.mt5 is None:
-                # Mock close
-                return True
-            
-            request = {
-                "action": self.mt5.TRADE_ACTION_DEAL,
-                "symbol": symbol,
-                "volume": volume,
-                "type": self.mt5.ORDER_TYPE_SELL,
-                "position": ticket,
-                "price": price,
-                "type_time": self.mt5.ORDER_TIME_GTC,
-                "type_filling": self.mt5.ORDER_FILLING_IOC
-            }
-            
-            result = self.mt5.order_send(request)
-            return result.retcode == self.mt5.TRADE_RETCODE_DONE
+            # Exits preempt all queued orders and data polling
+            result = self.executor.call(self._close_position, ticket, symbol, volume, price, lane=Lane.EMERGENCY)
+            if result is None or result.retcode != self.mt5.TRADE_RETCODE_DONE:
+                logger.error(f"Close failed: {result.comment if result else 'no result'}")
+                return False
+            return True
             
         except Exception as e:
             logger.error(f"Error closing order: {str(e)}")
             return False
     
+    def _close_position(self, ticket: int, symbol: str, volume: float, price: float):
+        """Send the opposite deal for a position (runs on the MT5 thread)"""
+        positions = self.mt5.positions_get(ticket=ticket)
+        if not positions:
+            logger.warning(f"Position not found: {ticket}")
+            return None
+        
+        is_buy = positions[0].type == self.mt5.POSITION_TYPE_BUY
+        request = {
+            "action": self.mt5.TRADE_ACTION_DEAL,
+            "symbol": symbol,
+            "volume": volume,
+            "type": self.mt5.ORDER_TYPE_SELL if is_buy else self.mt5.ORDER_TYPE_BUY,
+            "position": ticket,
+            "price": price,
+            "type_time": self.mt5.ORDER_TIME_GTC,
+            "type_filling": self.mt5.ORDER_FILLING_IOC
+        }
+        return self.mt5.order_send(request)
+    
     def get_positions(self) -> Optional[list]:
         """Get open positions"""
         try:
             if not self.connected:
                 return None
             
-            if self.mt5 is None:
-                return []
-            
-            positions = self.mt5.positions_get()
-            if positions is None:
-                return []
-            
-            return [
-                {
-                    'ticket': pos.ticket,
-                    'symbol': pos.symbol,
-                    'type': 'BUY' if pos.type == 0 else 'SELL',
-                    'volume': pos.volume,
-                    'open_price': pos.price_open,
-                    'current_price': pos.price_current,
-                    'profit': pos.profit,
-                    'sl': pos.sl,
-                    'tp': pos.tp
-                }
-                for pos in positions
-            ]
+            return self.request_positions().result(self.timeout)
             
         except Exception as e:
             logger.error(f"Error getting positions: {str(e)}")
             return None
     
-    # Mock methods for development
-    def _get_mock_account_info(self) -> Dict[str, Any]:
-        """Get mock account info for development"""
-        return {
-            'login': 12345678,
-            'name': 'Demo Account',
-            'server': 'Demo Server',
-            'currency': 'USD',
-            'balance': 10000.0,
-            'credit': 0.0,
-            'equity': 10000.0,
-            'margin': 0.0,
-            'free_margin': 10000.0,
-            'margin_level': 0.0,
-            'leverage': 100,
-            'profit': 0.0,
-            'timestamp': datetime.now().isoformat()
-        }
-    
-    def _get_mock_symbol_info(self, symbol: str) -> Dict[str, Any]:
-        """Get mock symbol info for development"""
-        return {
-            'symbol': symbol,
-            'bid': 1.0850,
-            'ask': 1.0852,
-            'point': 0.0001,
-            'digits': 4,
-            'spread': 2,
-            'volume': 1000000,
-            'time': int(datetime.now().timestamp())
-        }
+    def request_positions(self) -> Future:
+        """Request open positions without blocking (coalesced)"""
+        return self.executor.submit(self._fetch_positions, key=('positions_get',), lane=Lane.SYNC)
     
-    def _get_mock_rates(self, symbol: str, count: int) -> list:
-        """Get mock rates for development"""
-        import random
-        from datetime import timedelta
-        
-        rates = []
-        current_price = 1.0850
-        current_time = datetime.now()
+    def _fetch_positions(self) -> list:
+        """Read open positions (runs on the MT5 thread)"""
+        positions = self.mt5.positions_get()
+        if positions is None:
+            return []
         
-        for i in range(count):
-            change = random.uniform(-0.001, 0.001)
-            current_price += change
-            
-            rates.append({
-                'time': int((current_time - timedelta(minutes=i)).timestamp()),
-                'open': current_price - change,
-                'high': current_price + abs(change) * 0.5,
-                'low': current_price - abs(change) * 0.5,
-                'close': current_price,
-                'volume': random.randint(1000, 10000)
-            })
-        
-        return list(reversed(rates))
+        return [
+            {
+                'ticket': pos.ticket,
+                'symbol': pos.symbol,
+                'type': 'BUY' if pos.type == 0 else 'SELL',
+                'volume': pos.volume,
+                'open_price': pos.price_open,
+                'current_price': pos.price_current,
+                'profit': pos.profit,
+                'sl': pos.sl,
+                'tp': pos.tp
+            }
+            for pos in positions
+        ]
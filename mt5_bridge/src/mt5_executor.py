@@ -0,0 +1,232 @@
+"""
+MT5 Executor - Single owner thread for all MetaTrader 5 terminal calls
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Lane(IntEnum):
+    """Call priority lanes, most urgent first"""
+    EMERGENCY = 0  # Closing / flattening positions
+    ORDER = 1      # New order submission
+    SYNC = 2       # Position and account synchronization
+    DATA = 3       # Market data polling
+
+
+class MT5Executor:
+    """
+    Serializes terminal calls on one thread
+
+    The MetaTrader5 package is blocking and not thread-safe, so every call
+    is queued and run by a single worker thread. Calls submitted with a
+    key are coalesced: while a call with the same key is queued or
+    running, further submissions share its future instead of issuing
+    another terminal call.
+
+    Calls are queued per lane and higher lanes are always drained first.
+    A queued call below ORDER that has waited longer than
+    `starvation_timeout` is served ahead of ORDER and SYNC calls (never
+    ahead of EMERGENCY) so data polling cannot starve.
+    """
+
+    def __init__(self, timeout: float = 30.0, starvation_timeout: float = 1.0):
+        """
+        Initialize executor
+
+        Args:
+            timeout: Per-call deadline in seconds, counted from submission
+            starvation_timeout: Queue wait in seconds after which a lower lane call is promoted
+        """
+        self.timeout = timeout
+        self.starvation_timeout = starvation_timeout
+        self._lanes = {lane: deque() for lane in Lane}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._thread = None
+        self._running = False
+        self._wait_times = {lane: deque(maxlen=1000) for lane in Lane}
+        self._wait_max = {lane: 0.0 for lane in Lane}
+        self._served = {lane: 0 for lane in Lane}
+
+        self.calls = 0
+        self.coalesced = 0
+        self.expired = 0
+
+    def start(self):
+        """Start the worker thread"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='mt5-io', daemon=True)
+            self._thread.start()
+
+    def stop(self, wait: bool = True):
+        """
+        Stop the worker thread
+
+        Args:
+            wait: Wait for queued calls to finish
+        """
+        with self._ready:
+            if not self._running:
+                return
+            self._running = False
+            self._ready.notify()
+        if wait and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def submit(self, fn: Callable, *args, key: Optional[Hashable] = None,
+               lane: Lane = Lane.DATA, timeout: Optional[float] = None, **kwargs) -> Future:
+        """
+        Queue a terminal call
+
+        Args:
+            fn: Callable to run on the worker thread
+            key: Coalescing key; identical in-flight keys share one call
+            lane: Priority lane
+            timeout: Deadline in seconds (default: executor timeout)
+
+        Returns:
+            Future resolving to the call result
+        """
+        if not self._running:
+            self.start()
+
+        now = time.monotonic()
+        deadline = now + (self.timeout if timeout is None else timeout)
+
+        with self._ready:
+            if key is not None and key in self._inflight:
+                self.coalesced += 1
+                return self._inflight[key]
+
+            future = Future()
+            if key is not None:
+                self._inflight[key] = future
+
+            self._lanes[lane].append((future, fn, args, kwargs, key, deadline, now))
+            self._ready.notify()
+
+        return future
+
+    def call(self, fn: Callable, *args, key: Optional[Hashable] = None,
+             lane: Lane = Lane.DATA, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run a terminal call and wait for its result
+
+        Raises:
+            concurrent.futures.TimeoutError: If the deadline passes first
+        """
+        if threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)
+
+        timeout = self.timeout if timeout is None else timeout
+        return self.submit(fn, *args, key=key, lane=lane, timeout=timeout, **kwargs).result(timeout)
+
+    def submit_async(self, fn: Callable, *args, key: Optional[Hashable] = None,
+                     lane: Lane = Lane.DATA, timeout: Optional[float] = None,
+                     **kwargs) -> asyncio.Future:
+        """Queue a terminal call and get an awaitable for the running event loop"""
+        return asyncio.wrap_future(self.submit(fn, *args, key=key, lane=lane, timeout=timeout, **kwargs))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get executor statistics, including queue wait times per lane in milliseconds"""
+        lanes = {}
+        with self._lock:
+            for lane in Lane:
+                waits = sorted(self._wait_times[lane])
+                lanes[lane.name.lower()] = {
+                    'queued': len(self._lanes[lane]),
+                    'served': self._served[lane],
+                    'wait_p50_ms': waits[len(waits) // 2] * 1000 if waits else 0,
+                    'wait_p99_ms': waits[int(len(waits) * 0.99)] * 1000 if waits else 0,
+                    'wait_max_ms': self._wait_max[lane] * 1000
+                }
+
+        return {
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'expired': self.expired,
+            'queued': sum(lane['queued'] for lane in lanes.values()),
+            'inflight': len(self._inflight),
+            'lanes': lanes
+        }
+
+    def _next(self) -> Optional[tuple]:
+        """Wait for and pop the next call to run (None when stopped)"""
+        with self._ready:
+            while True:
+                if self._lanes[Lane.EMERGENCY]:
+                    return self._pop(Lane.EMERGENCY)
+
+                # Promote lower lane calls that waited too long
+                now = time.monotonic()
+                for lane in (Lane.DATA, Lane.SYNC):
+                    queued = self._lanes[lane]
+                    if queued and now - queued[0][6] > self.starvation_timeout:
+                        return self._pop(lane)
+
+                for lane in (Lane.ORDER, Lane.SYNC, Lane.DATA):
+                    if self._lanes[lane]:
+                        return self._pop(lane)
+
+                if not self._running:
+                    return None
+                self._ready.wait()
+
+    def _pop(self, lane: Lane) -> tuple:
+        """Pop the oldest call of a lane and record its queue wait"""
+        item = self._lanes[lane].popleft()
+        wait = time.monotonic() - item[6]
+        self._wait_times[lane].append(wait)
+        self._wait_max[lane] = max(self._wait_max[lane], wait)
+        self._served[lane] += 1
+        return item
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            item = self._next()
+            if item is None:
+                break
+
+            future, fn, args, kwargs, key, deadline, _ = item
+            if not future.set_running_or_notify_cancel():
+                self._release(key)
+                continue
+
+            if time.monotonic() > deadline:
+                # The caller has already given up; never run stale calls
+                self.expired += 1
+                self._release(key)
+                future.set_exception(TimeoutError(f"MT5 call expired in queue: {getattr(fn, '__name__', fn)}"))
+                continue
+
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                self._release(key)
+                future.set_exception(e)
+            else:
+                self._release(key)
+                future.set_result(result)
+            finally:
+                self.calls += 1
+
+    def _release(self, key: Optional[Hashable]):
+        """Allow new calls for a key once its call has finished"""
+        if key is None:
+            return
+        with self._lock:
+            self._inflight.pop(key, None)
@@ -0,0 +1,524 @@
+"""
+Optimizer - Parallel parameter sweeps and walk-forward analysis of strategies
+
+Usage:
+    python src/optimizer.py --strategy trend_following --space ma_short=10:40:5 ma_long=50,100,200
+        [--mode grid|random|walk-forward] [--samples 1000] [--symbols EURUSD] [--timeframe 15]
+        [--from 2015-01-01] [--to 2025-01-01] [--metric sharpe] [--workers 8] [--output results.jsonl]
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import time
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+from bars import Bars, BAR_DTYPE
+from fill_simulator import FillSimulator, SimulationResult
+from market_simulator import TRADING_DAYS_PER_YEAR
+
+logger = logging.getLogger(__name__)
+
+# Metrics where lower is better
+MINIMIZED_METRICS = {'max_drawdown_percent'}
+
+# Per-process state of pool workers, set by _init_worker
+_worker = {}
+
+
+def compute_metrics(result: SimulationResult, timeframe: int) -> Dict[str, float]:
+    """
+    Score a simulation
+
+    Args:
+        result: Simulation result
+        timeframe: Bar timeframe in minutes, to annualize per-bar returns
+
+    Returns:
+        Dictionary of metric name -> value
+    """
+    stats = result.get_statistics()
+    equity = result.equity
+    returns = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.zeros(1)
+    periods = TRADING_DAYS_PER_YEAR * 1440 / timeframe
+
+    volatility = float(returns.std())
+    downside = float(np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2)))
+    mean = float(returns.mean())
+    return_percent = (stats['final_equity'] - result.initial_balance) / result.initial_balance * 100
+    drawdown = stats['max_drawdown_percent']
+
+    return {
+        'total_profit': stats['total_profit'],
+        'return_percent': return_percent,
+        'sharpe': mean / volatility * math.sqrt(periods) if volatility > 0 else 0.0,
+        'sortino': mean / downside * math.sqrt(periods) if downside > 0 else 0.0,
+        'max_drawdown_percent': drawdown,
+        'calmar': return_percent / drawdown if drawdown > 0 else 0.0,
+        'profit_factor': stats['profit_factor'],
+        'win_rate': stats['win_rate'],
+        'total_trades': stats['total_trades'],
+        'expectancy': stats['total_profit'] / stats['total_trades'] if stats['total_trades'] else 0.0
+    }
+
+
+class SharedHistory:
+    """
+    Bar histories placed once in shared memory for pool workers
+
+    Workers attach to the blocks by name and slice Bars views out of them,
+    so no task ever pickles or copies bars.
+    """
+
+    def __init__(self, histories: Dict[str, Bars]):
+        """
+        Copy histories into shared memory
+
+        Args:
+            histories: Dictionary of symbol -> bars
+        """
+        self.blocks = {}
+        self.layout = {}
+        for symbol, bars in histories.items():
+            size = max(len(bars) * BAR_DTYPE.itemsize, 1)
+            block = shared_memory.SharedMemory(create=True, size=size)
+            np.ndarray(len(bars), dtype=BAR_DTYPE, buffer=block.buf)[:] = bars.data
+            self.blocks[symbol] = block
+            self.layout[symbol] = (block.name, len(bars))
+
+    def close(self):
+        """Release and remove the shared blocks"""
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+    def __enter__(self) -> 'SharedHistory':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def attach(layout: Dict[str, Tuple[str, int]]) -> Tuple[Dict[str, Bars], List[shared_memory.SharedMemory]]:
+        """
+        Open the histories of a layout in another process
+
+        Returns:
+            Tuple of (symbol -> bars viewing shared memory, blocks to keep open)
+        """
+        histories, blocks = {}, []
+        for symbol, (name, length) in layout.items():
+            block = shared_memory.SharedMemory(name=name)
+            blocks.append(block)
+            histories[symbol] = Bars(np.ndarray(length, dtype=BAR_DTYPE, buffer=block.buf))
+        return histories, blocks
+
+
+def _init_worker(layout: Dict[str, Tuple[str, int]], simulator: Dict[str, Any], timeframe: int):
+    """Pool initializer: attach shared histories and build the fill simulator"""
+    histories, blocks = SharedHistory.attach(layout)
+    _worker.update(histories=histories, blocks=blocks, simulator=FillSimulator(**simulator), timeframe=timeframe)
+
+
+def _run_task(task: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, float]]]:
+    """Evaluate one parameter set on one history segment (in a worker)"""
+    from strategies.registry import STRATEGIES
+
+    try:
+        bars = _worker['histories'][task['symbol']][task['start']:task['end']]
+        strategy = STRATEGIES[task['strategy']](task['params'])
+        action, confidence, take_profit, stop_loss = strategy.generate_signals(bars.close)
+        # Bars before trade_from only warm up indicators
+        action[:task['trade_from'] - task['start']] = 0
+
+        result = _worker['simulator'].simulate_arrays(
+            task['symbol'], bars, action, stop_loss, take_profit, confidence, strategy=task['strategy']
+        )
+        return task['key'], compute_metrics(result, _worker['timeframe'])
+
+    except Exception as e:
+        logger.error(f"Error evaluating {task['strategy']} {task['params']} on {task['symbol']}: {str(e)}")
+        return task['key'], None
+
+
+def grid(space: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """All combinations of a parameter space (name -> list of values, or inclusive (low, high) integer range)"""
+    names = list(space)
+    axes = []
+    for name in names:
+        values = space[name]
+        if isinstance(values, tuple):
+            low, high = values
+            if not (isinstance(low, int) and isinstance(high, int)):
+                raise ValueError(f"Grid needs values or an integer range for {name}")
+            values = list(range(low, high + 1))
+        axes.append(values)
+    return [dict(zip(names, values)) for values in itertools.product(*axes)]
+
+
+def sample(space: Dict[str, Any], count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Random combinations of a parameter space
+
+    Args:
+        space: Name -> list of values, or (low, high) range; integer bounds give integers
+        count: Number of distinct combinations wanted (fewer if the space is smaller)
+        seed: Random seed
+
+    Returns:
+        List of parameter dicts
+    """
+    rng = random.Random(seed)
+    combinations, seen = [], set()
+    for _ in range(count * 20):
+        if len(combinations) >= count:
+            break
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                params[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) \
+                    else rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(values)
+        key = json.dumps(params, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            combinations.append(params)
+    return combinations
+
+
+class Optimizer:
+    """
+    Searches strategy parameters across all cores
+
+    Every (parameter set, symbol, history segment) is a task: the workers of
+    a process pool attach to the histories in shared memory, replay the
+    strategy with generate_signals(), simulate fills and return metrics.
+    Results are appended to a JSONL file as they arrive and tasks already in
+    it are not run again, so an interrupted job resumes where it stopped.
+    """
+
+    def __init__(self, strategy: str, histories: Dict[str, Bars], timeframe: int,
+                 base_params: Optional[Dict[str, Any]] = None,
+                 simulator: Optional[Dict[str, Any]] = None, metric: str = 'sharpe',
+                 workers: Optional[int] = None, output: Optional[str] = None, chunk_size: int = 16):
+        """
+        Initialize optimizer
+
+        Args:
+            strategy: Strategy name (key of strategies.registry.STRATEGIES)
+            histories: Dictionary of symbol -> closed bars, oldest first
+            timeframe: Timeframe of the bars in minutes
+            base_params: Strategy parameters not being searched
+            simulator: FillSimulator keyword arguments
+            metric: Metric to rank parameter sets by (see compute_metrics)
+            workers: Number of worker processes (default: all cores)
+            output: JSONL file of results (default: results are not persisted)
+            chunk_size: Tasks sent to a worker at a time
+        """
+        self.strategy = strategy
+        self.histories = histories
+        self.timeframe = timeframe
+        self.base_params = base_params or {}
+        self.simulator = simulator or {}
+        self.metric = metric
+        self.workers = workers or os.cpu_count() or 1
+        self.output = output
+        self.chunk_size = chunk_size
+        self.results = self._load_results()
+
+    def grid(self, space: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+        """
+        Evaluate every combination of a parameter space on the full histories
+
+        Returns:
+            Parameter sets with their metrics, best first
+        """
+        return self._sweep(grid(space))
+
+    def random(self, space: Dict[str, Any], count: int, seed: int = 42) -> List[Dict[str, Any]]:
+        """
+        Evaluate random combinations of a parameter space on the full histories
+
+        Returns:
+            Parameter sets with their metrics, best first
+        """
+        return self._sweep(sample(space, count, seed))
+
+    def walk_forward(self, space: Dict[str, Any], train_bars: int, test_bars: int,
+                     count: Optional[int] = None, warmup: int = 200, seed: int = 42) -> List[Dict[str, Any]]:
+        """
+        Walk-forward analysis: optimize on a window, test on the bars after it, roll forward
+
+        Args:
+            space: Parameter space (searched as a grid, or randomly if count is given)
+            train_bars: Bars per in-sample window
+            test_bars: Bars per out-of-sample window (and step between folds)
+            count: Random combinations per fold instead of the full grid
+            warmup: Bars before each test window used only to warm up indicators
+            seed: Random seed
+
+        Returns:
+            One dict per fold with the chosen parameters and in/out-of-sample metrics
+        """
+        combinations = grid(space) if count is None else sample(space, count, seed)
+
+        # Fold boundaries are bar times of the shortest history, found by time in the others
+        reference = min(self.histories.values(), key=len).time
+        folds = [(int(reference[start]), int(reference[start + train_bars]), int(reference[start + train_bars + test_bars - 1]))
+                 for start in range(0, len(reference) - train_bars - test_bars + 1, test_bars)]
+        if not folds:
+            logger.warning(f"History of {len(reference)} bars is too short for walk-forward folds")
+            return []
+
+        train_tasks, test_tasks = {}, {}
+        for fold, (train_from, test_from, _) in enumerate(folds):
+            train_tasks[fold] = [
+                self._task(params, symbol, start, split, start)
+                for symbol in self.histories
+                for start, split, _ in [self._segment(symbol, train_from, test_from, test_from)]
+                if split - start > 1
+                for params in combinations
+            ]
+        self._run([task for tasks in train_tasks.values() for task in tasks])
+
+        chosen = {}
+        for fold, (_, test_from, test_to) in enumerate(folds):
+            ranked = self._rank(train_tasks[fold])
+            if not ranked:
+                continue
+            chosen[fold] = ranked[0]
+            test_tasks[fold] = []
+            for symbol in self.histories:
+                _, split, end = self._segment(symbol, test_from, test_from, test_to)
+                if end > split:
+                    test_tasks[fold].append(self._task(ranked[0]['params'], symbol, max(0, split - warmup), end, split))
+        self._run([task for tasks in test_tasks.values() for task in tasks])
+
+        report = []
+        for fold, best in chosen.items():
+            train_from, test_from, test_to = folds[fold]
+            tested = self._rank(test_tasks[fold])
+            report.append({
+                'fold': fold,
+                'train': [train_from, test_from],
+                'test': [test_from, test_to],
+                'params': best['params'],
+                'in_sample': best['metrics'],
+                'out_of_sample': tested[0]['metrics'] if tested else None
+            })
+            logger.info(
+                f"Fold {fold}: {best['params']} {self.metric} in-sample {best['metrics'][self.metric]:.3f}, "
+                f"out-of-sample {tested[0]['metrics'][self.metric] if tested else float('nan'):.3f}"
+            )
+        return report
+
+    def _segment(self, symbol: str, date_from: int, split: int, date_to: int) -> Tuple[int, int, int]:
+        """Indexes of a symbol's bars: first at date_from, first at split, and one past date_to"""
+        times = self.histories[symbol].time
+        return (int(np.searchsorted(times, date_from, side='left')),
+                int(np.searchsorted(times, split, side='left')),
+                int(np.searchsorted(times, date_to, side='right')))
+
+    def _sweep(self, combinations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Evaluate parameter sets on the full histories and rank them"""
+        tasks = [self._task(params, symbol, 0, len(bars), 0)
+                 for params in combinations for symbol, bars in self.histories.items()]
+        self._run(tasks)
+        return self._rank(tasks)
+
+    def _task(self, params: Dict[str, Any], symbol: str, start: int, end: int, trade_from: int) -> Dict[str, Any]:
+        """Describe one evaluation; the key identifies it across runs by bar times, not indexes"""
+        params = {**self.base_params, **params}
+        bars = self.histories[symbol]
+        identity = [self.strategy, symbol, self.timeframe, params, self.simulator,
+                    int(bars.time[start]), int(bars.time[end - 1]), int(bars.time[trade_from])]
+        key = hashlib.sha1(json.dumps(identity, sort_keys=True, default=str).encode()).hexdigest()[:20]
+        return {'key': key, 'strategy': self.strategy, 'symbol': symbol, 'params': params,
+                'start': start, 'end': end, 'trade_from': trade_from}
+
+    def _run(self, tasks: List[Dict[str, Any]]):
+        """Run the tasks without results yet on the process pool"""
+        pending = list({task['key']: task for task in tasks if task['key'] not in self.results}.values())
+        if len(pending) < len(tasks):
+            logger.info(f"Resuming: {len(tasks) - len(pending)} of {len(tasks)} tasks already done")
+        if not pending:
+            return
+
+        started = time.monotonic()
+        by_key = {task['key']: task for task in pending}
+        with SharedHistory(self.histories) as shared:
+            with multiprocessing.Pool(self.workers, _init_worker,
+                                      (shared.layout, self.simulator, self.timeframe)) as pool:
+                for done, (key, metrics) in enumerate(
+                        pool.imap_unordered(_run_task, pending, chunksize=self.chunk_size), 1):
+                    if metrics is not None:
+                        self._record(by_key[key], metrics)
+                    if done % 1000 == 0:
+                        logger.info(f"{done}/{len(pending)} tasks in {time.monotonic() - started:.1f}s")
+
+        logger.info(f"{len(pending)} tasks on {self.workers} workers in {time.monotonic() - started:.1f}s")
+
+    def _rank(self, tasks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Average each parameter set's metrics over symbols and sort by the metric, best first"""
+        grouped = {}
+        for task in tasks:
+            metrics = self.results.get(task['key'])
+            if metrics is None:
+                continue
+            params_key = json.dumps(task['params'], sort_keys=True, default=str)
+            grouped.setdefault(params_key, (task['params'], []))[1].append(metrics)
+
+        ranked = [
+            {'params': params, 'symbols': len(runs),
+             'metrics': {name: float(np.mean([run[name] for run in runs])) for name in runs[0]}}
+            for params, runs in grouped.values()
+        ]
+        sign = 1 if self.metric in MINIMIZED_METRICS else -1
+        return sorted(ranked, key=lambda row: sign * row['metrics'][self.metric])
+
+    def _record(self, task: Dict[str, Any], metrics: Dict[str, float]):
+        """Keep a result and append it to the output file"""
+        self.results[task['key']] = metrics
+        if not self.output:
+            return
+        row = {'key': task['key'], 'strategy': task['strategy'], 'symbol': task['symbol'],
+               'params': task['params'], 'from': int(self.histories[task['symbol']].time[task['trade_from']]),
+               'to': int(self.histories[task['symbol']].time[task['end'] - 1]), 'metrics': metrics}
+        with open(self.output, 'a') as f:
+            f.write(json.dumps(row, default=str) + '\n')
+
+    def _load_results(self) -> Dict[str, Dict[str, float]]:
+        """Load results persisted by previous runs"""
+        results = {}
+        if not self.output:
+            return results
+        os.makedirs(os.path.dirname(os.path.abspath(self.output)), exist_ok=True)
+        try:
+            with open(self.output, 'r') as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                        results[row['key']] = row['metrics']
+                    except (ValueError, KeyError):
+                        continue  # Line cut short by an interrupted run
+        except FileNotFoundError:
+            pass
+        return results
+
+
+def parse_space(items: List[str]) -> Dict[str, Any]:
+    """
+    Parse a parameter space from name=spec items
+
+    Specs are comma-separated values (a,b,c), an inclusive range with a step
+    (low:high:step), or an inclusive range to sample from randomly (low:high).
+    """
+    space = {}
+    for item in items:
+        name, spec = item.split('=', 1)
+        if ':' in spec:
+            parts = [_number(part) for part in spec.split(':')]
+            if len(parts) == 2:
+                space[name] = tuple(parts)
+            else:
+                low, high, step = parts
+                if all(isinstance(part, int) for part in parts):
+                    space[name] = list(range(low, high + 1, step))
+                else:
+                    space[name] = [float(value) for value in np.round(np.arange(low, high + step / 2, step), 10)]
+        else:
+            space[name] = [_number(part) for part in spec.split(',')]
+    return space
+
+
+def _number(value: str) -> Any:
+    """Parse an int or a float"""
+    try:
+        return int(value)
+    except ValueError:
+        number = float(value)
+        return int(number) if number.is_integer() and '.' not in value else number
+
+
+def _parse_date(value: str) -> int:
+    """Parse YYYY-MM-DD as a UTC timestamp"""
+    return int(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp())
+
+
+def main():
+    """Command line entry point"""
+    from config import load_config, get_setting
+    from bar_archive import BarArchive
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    config = load_config()
+    parser = argparse.ArgumentParser(description='Search strategy parameters over archived bars')
+    parser.add_argument('--strategy', required=True, help='Strategy name, e.g. trend_following')
+    parser.add_argument('--space', nargs='+', required=True,
+                        help='Parameters to search: name=a,b,c or name=low:high:step (grid), name=low:high (random)')
+    parser.add_argument('--mode', choices=['grid', 'random', 'walk-forward'], default='grid')
+    parser.add_argument('--samples', type=int, help='Random combinations (random mode, or per walk-forward fold)')
+    parser.add_argument('--train-bars', type=int, default=20000, help='Walk-forward in-sample bars')
+    parser.add_argument('--test-bars', type=int, default=5000, help='Walk-forward out-of-sample bars')
+    parser.add_argument('--symbols', nargs='+', default=get_setting(config, 'trading.symbols', []))
+    parser.add_argument('--timeframe', type=int, default=15, help='Timeframe in minutes')
+    parser.add_argument('--from', dest='date_from', help='Start date (YYYY-MM-DD, default: start of archive)')
+    parser.add_argument('--to', dest='date_to', help='End date (YYYY-MM-DD, default: end of archive)')
+    parser.add_argument('--metric', default=get_setting(config, 'optimizer.metric', 'sharpe'))
+    parser.add_argument('--workers', type=int, default=get_setting(config, 'optimizer.workers'))
+    parser.add_argument('--output', help='Results file (default: one per strategy/timeframe in optimizer.directory)')
+    parser.add_argument('--top', type=int, default=10, help='Results to print')
+    args = parser.parse_args()
+
+    archive = BarArchive(get_setting(config, 'archive.directory', 'data/bars'))
+    date_from = _parse_date(args.date_from) if args.date_from else 0
+    date_to = _parse_date(args.date_to) if args.date_to else np.iinfo(np.int64).max
+    histories = {}
+    for symbol in args.symbols:
+        bars = archive.read_range(symbol, args.timeframe, date_from, date_to)
+        if len(bars):
+            histories[symbol] = bars
+        else:
+            logger.warning(f"No archived bars for {symbol} M{args.timeframe}")
+    if not histories:
+        raise SystemExit("No history to optimize on")
+
+    output = args.output or os.path.join(
+        get_setting(config, 'optimizer.directory', 'data/optimizer'), f"{args.strategy}_M{args.timeframe}.jsonl"
+    )
+    optimizer = Optimizer(
+        args.strategy, histories, args.timeframe,
+        base_params=get_setting(config, f'strategies.{args.strategy}.parameters', {}),
+        simulator=get_setting(config, 'backtest', {}) or {},
+        metric=args.metric, workers=args.workers, output=output
+    )
+
+    space = parse_space(args.space)
+    if args.mode == 'walk-forward':
+        for fold in optimizer.walk_forward(space, args.train_bars, args.test_bars, count=args.samples):
+            print(json.dumps(fold))
+        return
+
+    if args.mode == 'random':
+        ranked = optimizer.random(space, args.samples or 100)
+    else:
+        ranked = optimizer.grid(space)
+    for row in ranked[:args.top]:
+        print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""
+Pipeline - Stages connected by bounded queues with backpressure and stale-item policies
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+
+class _Envelope:
+    """Queued item with the time its originating event entered the pipeline"""
+
+    __slots__ = ('item', 'created')
+
+    def __init__(self, item: Any, created: float):
+        self.item = item
+        self.created = created
+
+
+class StageQueue:
+    """
+    Bounded FIFO queue feeding one stage
+
+    Items with a key replace the queued item with the same key in place, so
+    a newer signal for a symbol supersedes one still waiting. When the queue
+    is full, `overflow` decides: 'block' makes the producer wait
+    (backpressure), 'drop_oldest' evicts the head, 'drop_newest' discards
+    the new item. Items older than `max_age` are dropped when dequeued.
+    """
+
+    def __init__(self, maxsize: int = 100, overflow: str = 'block',
+                 key: Optional[Callable[[Any], Hashable]] = None, max_age: Optional[float] = None):
+        """
+        Initialize queue
+
+        Args:
+            maxsize: Maximum number of queued items
+            overflow: 'block', 'drop_oldest' or 'drop_newest'
+            key: Function giving the merge key of an item (default: no merging)
+            max_age: Seconds after entering the pipeline an item is considered stale
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.key = key
+        self.max_age = max_age
+
+        self._items = OrderedDict()
+        self._sequence = itertools.count()
+        self._changed = None
+
+        self.stats = {
+            'enqueued': 0,
+            'merged': 0,
+            'dropped': 0,
+            'expired': 0,
+            'blocked_time': 0.0,
+            'high_water': 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def put(self, envelope: _Envelope):
+        """Queue an item, waiting for room under the 'block' policy"""
+        key = self.key(envelope.item) if self.key else next(self._sequence)
+        async with self._condition():
+            if key in self._items:
+                self._items[key] = envelope
+                self.stats['merged'] += 1
+                return
+
+            if len(self._items) >= self.maxsize:
+                if self.overflow == 'drop_newest':
+                    self.stats['dropped'] += 1
+                    return
+                if self.overflow == 'drop_oldest':
+                    self._items.popitem(last=False)
+                    self.stats['dropped'] += 1
+                else:
+                    started = time.monotonic()
+                    await self._changed.wait_for(lambda: len(self._items) < self.maxsize)
+                    self.stats['blocked_time'] += time.monotonic() - started
+
+            self._items[key] = envelope
+            self.stats['enqueued'] += 1
+            self.stats['high_water'] = max(self.stats['high_water'], len(self._items))
+            self._changed.notify_all()
+
+    async def get(self) -> _Envelope:
+        """Wait for the oldest item that is not stale"""
+        async with self._condition():
+            while True:
+                await self._changed.wait_for(lambda: self._items)
+                _, envelope = self._items.popitem(last=False)
+                self._changed.notify_all()
+
+                if self.max_age is not None and time.monotonic() - envelope.created > self.max_age:
+                    self.stats['expired'] += 1
+                    continue
+                return envelope
+
+    def _condition(self) -> asyncio.Condition:
+        """Condition shared by producers and consumers (created on the running loop)"""
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+
+class Stage:
+    """
+    One pipeline step: a handler fed by its own bounded queue
+
+    The handler is a plain (possibly blocking) function run on the
+    pipeline's thread pool. It receives one item and returns the items to
+    pass on to the next stage (None or an empty list to pass nothing).
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Optional[Iterable[Any]]], maxsize: int = 100,
+                 overflow: str = 'block', key: Optional[Callable[[Any], Hashable]] = None,
+                 max_age: Optional[float] = None, workers: int = 1):
+        """
+        Initialize stage
+
+        Args:
+            name: Stage name (for logs and statistics)
+            handler: Function item -> items for the next stage
+            maxsize: Input queue size
+            overflow: Input queue policy when full ('block', 'drop_oldest' or 'drop_newest')
+            key: Merge key of input items (default: no merging)
+            max_age: Seconds after which input items are dropped as stale
+            workers: Items processed concurrently
+        """
+        self.name = name
+        self.handler = handler
+        self.queue = StageQueue(maxsize, overflow, key, max_age)
+        self.workers = workers
+
+        self.processed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.max_time = 0.0
+
+    def get_stats(self, elapsed: float) -> Dict[str, Any]:
+        """Get stage statistics"""
+        return {
+            'processed': self.processed,
+            'emitted': self.emitted,
+            'errors': self.errors,
+            'throughput': self.processed / elapsed if elapsed > 0 else 0.0,
+            'average_time': self.busy_time / self.processed if self.processed else 0.0,
+            'max_time': self.max_time,
+            'queue_depth': len(self.queue),
+            **self.queue.stats
+        }
+
+
+class Pipeline:
+    """
+    Runs stages in order, each stage's output queued for the next
+
+    A full 'block' queue stalls the stage feeding it, so a slow consumer
+    (e.g. the broker) pushes back all the way to the first stage instead of
+    letting items pile up. Merge keys and max ages bound what can wait:
+    only the latest item per key is kept, and items that took too long to
+    get through are dropped rather than acted on late.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        """
+        Initialize pipeline
+
+        Args:
+            stages: Stages in processing order
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+
+        self.stages = stages
+        self._loop = None
+        self._started = None
+
+    async def put(self, item: Any):
+        """Feed an item to the first stage (waits under backpressure)"""
+        await self.stages[0].queue.put(_Envelope(item, time.monotonic()))
+
+    def submit(self, item: Any):
+        """
+        Feed an item from another thread
+
+        Returns:
+            concurrent.futures.Future completing once the item is queued
+        """
+        if self._loop is None:
+            raise RuntimeError("Pipeline is not running")
+        return asyncio.run_coroutine_threadsafe(self.put(item), self._loop)
+
+    async def run(self):
+        """Process items until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._started = time.monotonic()
+        executor = ThreadPoolExecutor(sum(stage.workers for stage in self.stages), thread_name_prefix='pipeline')
+
+        tasks = [
+            asyncio.create_task(self._work(stage, self._next(index), executor))
+            for index, stage in enumerate(self.stages)
+            for _ in range(stage.workers)
+        ]
+        logger.info(f"Pipeline running: {' → '.join(stage.name for stage in self.stages)}")
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._loop = None
+            logger.info("Pipeline stopped")
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-stage statistics"""
+        elapsed = time.monotonic() - self._started if self._started is not None else 0.0
+        return {stage.name: stage.get_stats(elapsed) for stage in self.stages}
+
+    def _next(self, index: int) -> Optional[Stage]:
+        """Stage after the one at index (None for the last)"""
+        return self.stages[index + 1] if index + 1 < len(self.stages) else None
+
+    async def _work(self, stage: Stage, downstream: Optional[Stage], executor: ThreadPoolExecutor):
+        """Take items from a stage's queue, run its handler and queue the results downstream"""
+        while True:
+            envelope = await stage.queue.get()
+
+            started = time.monotonic()
+            try:
+                outputs = await self._loop.run_in_executor(executor, stage.handler, envelope.item)
+            except Exception as e:
+                stage.errors += 1
+                logger.error(f"Error in pipeline stage {stage.name}: {str(e)}")
+                outputs = None
+            finally:
+                elapsed = time.monotonic() - started
+                stage.processed += 1
+                stage.busy_time += elapsed
+                stage.max_time = max(stage.max_time, elapsed)
+
+            for output in outputs or ():
+                stage.emitted += 1
+                if downstream is not None:
+                    await downstream.queue.put(_Envelope(output, envelope.created))
@@ -3,11 +3,32 @@ Risk Manager - Validates and manages trading risks
 """
 
 import logging
-from typing import Dict, Any, Optional
+import numbers
+from enum import IntEnum
+from typing import Dict, Any, Optional, Sequence, Mapping, Tuple
 from datetime import datetime, timedelta
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+REQUIRED_FIELDS = ('strategy', 'symbol', 'action', 'confidence', 'entry_price', 'take_profit', 'stop_loss')
+
+PRICE_FIELDS = ('entry_price', 'take_profit', 'stop_loss')
+
+
+class RejectReason(IntEnum):
+    """Why a signal failed pre-trade validation (checked in this order)"""
+    ACCEPTED = 0
+    INVALID_SIGNAL = 1  # Malformed signal, or no account balance to check it against
+    DAILY_LOSS_LIMIT = 2
+    MAX_DRAWDOWN = 3
+    POSITION_SIZE = 4
+    RISK_REWARD = 5
+    SYMBOL_POSITIONS = 6
+    DAILY_TRADE_LIMIT = 7
+    CONCURRENT_POSITIONS = 8
+
 
 class RiskManager:
     """Manages trading risks and validates trades"""
@@ -19,149 +40,163 @@ class RiskManager:
         self.risk_reward_ratio = float(os.getenv('RISK_REWARD_RATIO', 1.5))
         self.max_trades_per_day = int(os.getenv('MAX_TRADES_PER_DAY', 20))
         self.max_concurrent_positions = int(os.getenv('MAX_CONCURRENT_POSITIONS', 5))
+        self.max_positions_per_symbol = int(os.getenv('MAX_POSITIONS_PER_SYMBOL', 0))  # 0: no limit
+        
+        # Rejections per reason since start
+        self.rejections = np.zeros(len(RejectReason), dtype=np.int64)
         
         # Track daily metrics
         self.daily_trades = []
         self.daily_loss = 0.0
         self.last_reset = datetime.now()
     
-    def validate_trade(self, signal: Dict[str, Any], account_info: Dict[str, Any]) -> bool:
+    def validate_trade(self, signal: Dict[str, Any], account_info: Mapping[str, Any],
+                       positions: Optional[Sequence[Mapping[str, Any]]] = None) -> bool:
         """
         Validate if a trade should be executed
         
         Args:
             signal: Trading signal
-            account_info: Account information
+            account_info: Account information (e.g. AccountSnapshot.account)
+            positions: Open positions (e.g. AccountSnapshot.positions); the
+                       position limits are only checked when given
             
         Returns:
             True if trade is valid, False otherwise
         """
         try:
-            # Reset daily metrics if needed
-            self._reset_daily_metrics()
-            
-            # Validate signal
-            if not self._validate_signal(signal):
-                logger.warning(f"Invalid signal: {signal}")
-                return False
-            
-            # Check daily loss limit
-            if not self._check_daily_loss_limit(account_info):
-                logger.warning("Daily loss limit exceeded")
-                return False
-            
-            # Check max drawdown
-            if not self._check_max_drawdown(account_info):
-                logger.warning("Max drawdown exceeded")
-                return False
-            
-            # Check position size
-            if not self._check_position_size(signal, account_info):
-                logger.warning("Position size invalid")
-                return False
-            
-            # Check risk/reward ratio
-            if not self._check_risk_reward_ratio(signal):
-                logger.warning("Risk/reward ratio invalid")
-                return False
-            
-            # Check daily trade limit
-            if not self._check_daily_trade_limit():
-                logger.warning("Daily trade limit exceeded")
-                return False
-            
-            # Check concurrent positions
-            if not self._check_concurrent_positions(account_info):
-                logger.warning("Max concurrent positions exceeded")
-                return False
-            
-            logger.info(f"✅ Trade validated: {signal['action']} {signal['symbol']}")
-            return True
+            accepted, reasons = self.validate_batch([signal], account_info, positions)
+            if accepted[0]:
+                logger.info(f"✅ Trade validated: {signal['action']} {signal['symbol']}")
+            else:
+                logger.warning(f"Trade rejected ({RejectReason(reasons[0]).name}): {signal}")
+            return bool(accepted[0])
             
         except Exception as e:
             logger.error(f"Error validating trade: {str(e)}")
             return False
     
+    def validate_batch(self, signals: Sequence[Dict[str, Any]], account_info: Mapping[str, Any],
+                       positions: Optional[Sequence[Mapping[str, Any]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Validate a burst of signals at once
+        
+        Every rule is evaluated over all signals as array operations. Signals
+        are accepted in order: one accepted earlier in the batch counts
+        against the trade and position limits of the ones after it, so the
+        mask and reasons match validating the signals one by one and
+        recording each accepted trade.
+        
+        Args:
+            signals: Candidate signals
+            account_info: Account information (e.g. AccountSnapshot.account)
+            positions: Open positions (e.g. AccountSnapshot.positions); the
+                       position limits are only checked when given
+            
+        Returns:
+            Tuple of (accept mask, RejectReason code per signal)
+        """
+        self._reset_daily_metrics()
+        count = len(signals)
+        reasons = np.zeros(count, dtype=np.int8)
+        if count == 0:
+            return np.zeros(0, dtype=bool), reasons
+        
+        valid = np.array([self._validate_signal(signal) for signal in signals], dtype=bool)
+        entry, take_profit, stop_loss = (
+            np.array([signal[field] if ok else np.nan for signal, ok in zip(signals, valid)], dtype=float)
+            for field in PRICE_FIELDS
+        )
+        symbols = np.array([signal['symbol'] if ok else '' for signal, ok in zip(signals, valid)], dtype=object)
+        
+        balance = account_info.get('balance', 0.0)
+        funded = balance > 0
+        loss_percent = abs(self.daily_loss) / balance * 100 if funded and self.daily_loss < 0 else 0.0
+        drawdown = (balance - account_info.get('equity', balance)) / balance * 100 if funded else 0.0
+        
+        risk = np.abs(entry - stop_loss)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.abs(take_profit - entry) / risk
+        
+        # Stateless rules, first failure wins
+        rules = [
+            (RejectReason.INVALID_SIGNAL, ~valid | (not funded)),
+            (RejectReason.DAILY_LOSS_LIMIT, np.full(count, loss_percent >= self.daily_loss_limit)),
+            (RejectReason.MAX_DRAWDOWN, np.full(count, drawdown >= self.max_drawdown)),
+            (RejectReason.POSITION_SIZE, ~(risk / 0.0001 > 0)),  # Assuming 4 decimals
+            (RejectReason.RISK_REWARD, ~(ratio >= self.risk_reward_ratio))
+        ]
+        for reason, failed in rules:
+            reasons[(reasons == 0) & failed] = reason
+        
+        # Limits, consumed in batch order by the signals accepted before each one
+        candidates = reasons == 0
+        check_symbols = positions is not None and self.max_positions_per_symbol > 0
+        held = {}
+        for position in positions if check_symbols else ():
+            held[position['symbol']] = held.get(position['symbol'], 0) + 1
+        
+        # Until the trade or position limit is reached only the symbol limit
+        # decides; once it is reached nothing more is accepted
+        room = self.max_trades_per_day - len(self.daily_trades)
+        if positions is not None:
+            room = min(room, self.max_concurrent_positions - len(positions))
+        fits = candidates
+        if check_symbols:
+            fits = candidates & (self._symbol_counts(symbols, candidates, held) < self.max_positions_per_symbol)
+        accepted = fits & (np.cumsum(fits) <= room)
+        
+        # Other candidates get the first limit they fail, given the signals accepted before them
+        rejected = candidates & ~accepted
+        if check_symbols:
+            full = self._symbol_counts(symbols, accepted, held) >= self.max_positions_per_symbol
+            reasons[rejected & full] = RejectReason.SYMBOL_POSITIONS
+            rejected &= ~full
+        traded = len(self.daily_trades) + np.cumsum(accepted) >= self.max_trades_per_day
+        reasons[rejected & traded] = RejectReason.DAILY_TRADE_LIMIT
+        reasons[rejected & ~traded] = RejectReason.CONCURRENT_POSITIONS
+        
+        self.rejections += np.bincount(reasons, minlength=len(RejectReason))
+        return reasons == 0, reasons
+    
+    def _symbol_counts(self, symbols: np.ndarray, taken: np.ndarray, held: Dict[str, int]) -> np.ndarray:
+        """Positions on each signal's symbol: held plus taken signals earlier in the batch"""
+        order = np.argsort(symbols, kind='stable')
+        sorted_symbols = symbols[order]
+        taken = taken[order].astype(np.int64)
+        
+        # Running count of earlier taken signals per symbol group
+        starts = np.r_[True, sorted_symbols[1:] != sorted_symbols[:-1]]
+        running = np.cumsum(taken) - taken
+        running -= np.maximum.accumulate(np.where(starts, running, 0))
+        
+        existing = np.array([held.get(symbol, 0) for symbol in sorted_symbols], dtype=np.int64)
+        counts = np.empty(len(symbols), dtype=np.int64)
+        counts[order] = existing + running
+        return counts
+    
+    def get_reject_stats(self) -> Dict[str, int]:
+        """Get rejection counts per reason (plus accepted)"""
+        return {reason.name.lower(): int(self.rejections[reason]) for reason in RejectReason}
+    
     def _validate_signal(self, signal: Dict[str, Any]) -> bool:
         """Validate signal structure"""
-        required_fields = ['strategy', 'symbol', 'action', 'confidence', 'entry_price', 'take_profit', 'stop_loss']
-        
-        for field in required_fields:
+        for field in REQUIRED_FIELDS:
             if field not in signal:
                 return False
         
         if signal['action'] not in ['BUY', 'SELL']:
             return False
         
-        if not 0 <= signal['confidence'] <= 1:
+        if not isinstance(signal['confidence'], numbers.Real) or not 0 <= signal['confidence'] <= 1:
             return False
         
-        return True
-    
-    def _check_daily_loss_limit(self, account_info: Dict[str, Any]) -> bool:
-        """Check if daily loss limit is exceeded"""
-        if self.daily_loss < 0:
-            loss_percent = abs(self.daily_loss) / account_info['balance'] * 100
-            if loss_percent >= self.daily_loss_limit:
-                return False
-        
-        return True
-    
-    def _check_max_drawdown(self, account_info: Dict[str, Any]) -> bool:
-        """Check if max drawdown is exceeded"""
-        if 'equity' in account_info and 'balance' in account_info:
-            drawdown = (account_info['balance'] - account_info['equity']) / account_info['balance'] * 100
-            if drawdown >= self.max_drawdown:
+        for field in PRICE_FIELDS:
+            if not isinstance(signal[field], numbers.Real):
                 return False
         
         return True
     
-    def _check_position_size(self, signal: Dict[str, Any], account_info: Dict[str, Any]) -> bool:
-        """Check if position size is valid"""
-        # Calculate position size based on risk
-        risk_amount = account_info['balance'] * (self.max_position_size / 100)
-        
-        # Calculate pips at risk
-        entry = signal['entry_price']
-        stop_loss = signal['stop_loss']
-        pips_at_risk = abs(entry - stop_loss) / 0.0001  # Assuming 4 decimals
-        
-        if pips_at_risk == 0:
-            return False
-        
-        # Position size should not exceed risk limit
-        return True
-    
-    def _check_risk_reward_ratio(self, signal: Dict[str, Any]) -> bool:
-        """Check if risk/reward ratio is acceptable"""
-        entry = signal['entry_price']
-        tp = signal['take_profit']
-        sl = signal['stop_loss']
-        
-        risk = abs(entry - sl)
-        reward = abs(tp - entry)
-        
-        if risk == 0:
-            return False
-        
-        ratio = reward / risk
-        
-        if ratio < self.risk_reward_ratio:
-            logger.warning(f"Risk/reward ratio too low: {ratio:.2f}")
-            return False
-        
-        return True
-    
-    def _check_daily_trade_limit(self) -> bool:
-        """Check if daily trade limit is exceeded"""
-        return len(self.daily_trades) < self.max_trades_per_day
-    
-    def _check_concurrent_positions(self, account_info: Dict[str, Any]) -> bool:
-        """Check if max concurrent positions is exceeded"""
-        # In real implementation, count open positions from account_info
-        # For now, assume it's valid
-        return True
-    
     def _reset_daily_metrics(self):
         """Reset daily metrics if new day"""
         now = datetime.now()
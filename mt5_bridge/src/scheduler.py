@@ -0,0 +1,233 @@
+"""
+Scheduler - asyncio event loop running jobs on bar closes, new ticks and intervals
+"""
+
+import asyncio
+import functools
+import logging
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """
+    Sleeps until something is due, then runs the jobs for it
+
+    Three kinds of events wake the loop: the close of a bar on any
+    registered timeframe (computed from the clock, so nothing polls), a
+    batch of new ticks from the tick stream, and fixed intervals. Plain
+    functions run on a small thread pool so a job blocked on the MT5
+    thread never stalls the loop; coroutine functions run on the loop.
+    A job is never run twice at once: interval runs that come due while
+    the previous run is still going are skipped.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time, speed: float = 1.0,
+                 bar_close_delay: float = 1.0, server_offset: float = 0.0, workers: int = 4):
+        """
+        Initialize scheduler
+
+        Args:
+            clock: Current time in seconds (e.g. a simulator's clock)
+            speed: Clock seconds per real second
+            bar_close_delay: Real seconds to wait after a bar closes before running its jobs
+            server_offset: Seconds the trade server's clock is ahead of `clock` (bars close on server time)
+            workers: Threads running plain-function jobs
+        """
+        self.clock = clock
+        self.speed = speed
+        self.bar_close_delay = bar_close_delay
+        self.server_offset = server_offset
+        self.workers = workers
+
+        self._intervals = []
+        self._bar_jobs = []
+        self._tick_jobs = []
+        self._services = []
+        self._stats = {}
+        self._loop = None
+        self._stop = None
+        self._executor = None
+
+    def every(self, name: str, interval: float, job: Callable[[], Any]):
+        """
+        Run a job at a fixed interval
+
+        Args:
+            name: Job name (for logs and statistics)
+            interval: Seconds between runs
+            job: Function called with no arguments
+        """
+        self._intervals.append((name, interval, job))
+        self._stats[name] = _new_stats()
+
+    def on_bar_close(self, name: str, timeframes: Iterable[int], job: Callable[[List[int], int], Any]):
+        """
+        Run a job when bars close
+
+        Args:
+            name: Job name
+            timeframes: Timeframes in minutes
+            job: Function called with (timeframes closing, close time in server seconds)
+        """
+        self._bar_jobs.append((name, sorted(set(timeframes)), job))
+        self._stats[name] = _new_stats()
+
+    def on_ticks(self, name: str, tick_stream, job: Callable[[str, Any], Any],
+                 symbols: Optional[List[str]] = None, maxsize: int = 1000):
+        """
+        Run a job for every batch of new ticks
+
+        When the job falls behind, the oldest pending batches are dropped.
+
+        Args:
+            name: Job name
+            tick_stream: TickStream instance
+            job: Function called with (symbol, ticks)
+            symbols: Symbols to receive (default: all)
+            maxsize: Maximum number of pending tick batches
+        """
+        self._tick_jobs.append((name, tick_stream, job, symbols, maxsize))
+        self._stats[name] = _new_stats()
+
+    def service(self, name: str, run: Callable[[], Any]):
+        """
+        Run a long-lived coroutine alongside the jobs (cancelled on stop)
+
+        Args:
+            name: Service name
+            run: Coroutine function called with no arguments
+        """
+        self._services.append((name, run))
+
+    def next_bar_close(self, timeframes: Iterable[int]) -> float:
+        """Server time of the next bar close on any of the timeframes"""
+        now = self.clock() + self.server_offset
+        return min((now // (timeframe * 60) + 1) * timeframe * 60 for timeframe in timeframes)
+
+    async def run(self, handle_signals: bool = True):
+        """
+        Run until stop() is called (or SIGTERM/SIGINT is received)
+
+        Args:
+            handle_signals: Stop cleanly on SIGTERM and SIGINT
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='scheduler')
+        if handle_signals:
+            self._handle_signals()
+
+        tasks = [asyncio.create_task(self._run_interval(*entry)) for entry in self._intervals]
+        tasks += [asyncio.create_task(self._run_bar_closes(*entry)) for entry in self._bar_jobs]
+        tasks += [asyncio.create_task(self._run_ticks(*entry)) for entry in self._tick_jobs]
+        tasks += [asyncio.create_task(run(), name=name) for name, run in self._services]
+        logger.info(f"Scheduler running {len(tasks)} jobs")
+
+        try:
+            await self._stop.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            logger.info("Scheduler stopped")
+
+    def stop(self):
+        """Stop the scheduler (safe to call from any thread or a signal handler)"""
+        if self._loop is None or self._stop is None:
+            return
+        self._loop.call_soon_threadsafe(self._stop.set)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-job statistics"""
+        return {
+            name: {**stats, 'average_time': stats['total_time'] / stats['runs'] if stats['runs'] else 0.0}
+            for name, stats in self._stats.items()
+        }
+
+    async def _run_interval(self, name: str, interval: float, job: Callable[[], Any]):
+        """Run a job every interval, skipping runs missed while it was busy"""
+        next_run = time.monotonic() + interval
+        while True:
+            if await self._sleep(next_run - time.monotonic()):
+                return
+            await self._call(name, job)
+
+            next_run += interval
+            now = time.monotonic()
+            if next_run <= now:
+                missed = int((now - next_run) // interval) + 1
+                self._stats[name]['skipped'] += missed
+                next_run += missed * interval
+
+    async def _run_bar_closes(self, name: str, timeframes: List[int], job: Callable[[List[int], int], Any]):
+        """Sleep until the next bar close, then run the job once for all timeframes closing then"""
+        while True:
+            close_time = self.next_bar_close(timeframes)
+            wait = (close_time - self.server_offset - self.clock()) / self.speed + self.bar_close_delay
+            if await self._sleep(wait):
+                return
+
+            closing = [timeframe for timeframe in timeframes if close_time % (timeframe * 60) == 0]
+            await self._call(name, job, closing, int(close_time))
+
+    async def _run_ticks(self, name: str, tick_stream, job: Callable[[str, Any], Any],
+                         symbols: Optional[List[str]], maxsize: int):
+        """Run the job for each batch of new ticks"""
+        async for symbol, ticks in tick_stream.stream(symbols, maxsize):
+            await self._call(name, job, symbol, ticks)
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Wait for a number of seconds; True if the scheduler was stopped meanwhile"""
+        try:
+            await asyncio.wait_for(self._stop.wait(), max(0.0, seconds))
+            return True
+        except asyncio.TimeoutError:
+            return self._stop.is_set()
+
+    async def _call(self, name: str, job: Callable, *args):
+        """Run a job, recording its duration and logging failures"""
+        stats = self._stats[name]
+        started = time.monotonic()
+        try:
+            if asyncio.iscoroutinefunction(job):
+                await job(*args)
+            else:
+                await self._loop.run_in_executor(self._executor, functools.partial(job, *args))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats['errors'] += 1
+            logger.error(f"Error in scheduled job {name}: {str(e)}")
+        finally:
+            elapsed = time.monotonic() - started
+            stats['runs'] += 1
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+            stats['last_run'] = time.time()
+
+    def _handle_signals(self):
+        """Stop on SIGTERM/SIGINT"""
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                self._loop.add_signal_handler(sig, self._on_signal, sig)
+            except NotImplementedError:
+                # Windows event loops have no add_signal_handler
+                signal.signal(sig, lambda signum, frame: self._loop.call_soon_threadsafe(self._on_signal, signum))
+            except (RuntimeError, ValueError):
+                logger.debug(f"Cannot handle {signal.Signals(sig).name} outside the main thread")
+
+    def _on_signal(self, signum: int):
+        """Signal handler"""
+        logger.info(f"Received {signal.Signals(signum).name}, stopping")
+        self._stop.set()
+
+
+def _new_stats() -> Dict[str, Any]:
+    """Empty job statistics"""
+    return {'runs': 0, 'errors': 0, 'skipped': 0, 'total_time': 0.0, 'max_time': 0.0, 'last_run': None}
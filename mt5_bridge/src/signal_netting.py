@@ -0,0 +1,125 @@
+"""
+Signal Netting - Reduces one evaluation cycle's signals per symbol to a single net intent
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('confidence', 'priority', 'timeframe')
+
+DIRECTIONS = {'BUY': 1, 'SELL': -1}
+
+
+class SignalNetter:
+    """
+    Nets the signals several strategies and timeframes emit for a symbol
+
+    The policy first picks the signals that decide the outcome:
+    'confidence' lets every signal vote, 'priority' only the signals of
+    the highest-ranked strategy present, 'timeframe' only those of the
+    highest timeframe present. The chosen signals then vote with their
+    confidence: BUY counts positive, SELL negative. When the net share of
+    the vote (agreement) is below `min_agreement` the symbol is skipped
+    this cycle; otherwise the most confident signal on the winning side
+    is passed on. A result in the direction of an already open position
+    is suppressed.
+    """
+
+    def __init__(self, policy: str = 'confidence', strategy_priority: Optional[List[str]] = None,
+                 min_agreement: float = 0.5, suppress_open: bool = True):
+        """
+        Initialize netter
+
+        Args:
+            policy: 'confidence', 'priority' or 'timeframe'
+            strategy_priority: Strategy names, most important first (for 'priority')
+            min_agreement: Smallest |net vote| / total vote that still trades (0-1)
+            suppress_open: Skip a net signal when a position in its direction is open
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown netting policy: {policy}")
+
+        self.policy = policy
+        self.strategy_priority = [name.lower() for name in strategy_priority or []]
+        self.min_agreement = min_agreement
+        self.suppress_open = suppress_open
+
+        self.stats = {
+            'cycles': 0,
+            'signals': 0,
+            'netted': 0,
+            'conflicts': 0,
+            'suppressed': 0
+        }
+
+    def net(self, symbol: str, signals: List[Dict[str, Any]],
+            positions: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Net the signals of one cycle for a symbol
+
+        Args:
+            symbol: Trading symbol
+            signals: Signals from every strategy and timeframe evaluated this cycle
+            positions: Open positions (dicts with symbol and type), for suppression
+
+        Returns:
+            Net signal (a copy of the deciding signal with 'agreement' and
+            'sources' added) or None
+        """
+        self.stats['cycles'] += 1
+        self.stats['signals'] += len(signals)
+        if not signals:
+            return None
+
+        voters = self._select(signals)
+        total = sum(signal['confidence'] for signal in voters)
+        vote = sum(DIRECTIONS[signal['action']] * signal['confidence'] for signal in voters)
+        agreement = abs(vote) / total if total > 0 else 0.0
+
+        if vote == 0 or agreement < self.min_agreement:
+            self.stats['conflicts'] += 1
+            logger.info(f"Conflicting signals for {symbol} netted out (agreement {agreement:.0%})")
+            return None
+
+        action = 'BUY' if vote > 0 else 'SELL'
+        winners = [signal for signal in voters if signal['action'] == action]
+        best = max(winners, key=lambda signal: signal['confidence'])
+
+        if self.suppress_open and any(
+            position['symbol'] == symbol and position['type'] == action for position in positions or ()
+        ):
+            self.stats['suppressed'] += 1
+            logger.debug(f"{action} {symbol} suppressed: position already open")
+            return None
+
+        self.stats['netted'] += 1
+        return {
+            **best,
+            'agreement': agreement,
+            'sources': [(signal['strategy'], signal.get('timeframe')) for signal in winners]
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get netting statistics"""
+        return dict(self.stats)
+
+    def _select(self, signals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Signals allowed to vote under the policy"""
+        if self.policy == 'priority':
+            best = min(self._rank(signal) for signal in signals)
+            return [signal for signal in signals if self._rank(signal) == best]
+
+        if self.policy == 'timeframe':
+            highest = max(signal.get('timeframe') or 0 for signal in signals)
+            return [signal for signal in signals if (signal.get('timeframe') or 0) == highest]
+
+        return signals
+
+    def _rank(self, signal: Dict[str, Any]) -> int:
+        """Position of a signal's strategy in the priority list (unlisted strategies last)"""
+        name = str(signal['strategy']).lower()
+        if name in self.strategy_priority:
+            return self.strategy_priority.index(name)
+        return len(self.strategy_priority)
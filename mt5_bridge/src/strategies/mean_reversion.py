@@ -4,9 +4,12 @@ Reverts to mean using Bollinger Bands
 """
 
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import numpy as np
 
+from bars import Bars, as_bars
+from indicator_graph import IndicatorSpec, IndicatorStream, compute_indicators, pairwise, required_history
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,114 +34,239 @@ class MeanReversionStrategy:
         self.min_confidence = self.params.get('min_confidence', 0.65)
         self.take_profit_pips = self.params.get('take_profit_pips', 30)
         self.stop_loss_pips = self.params.get('stop_loss_pips', 40)
+        
+        # Indicators this strategy needs
+        self.indicators = {
+            'bands': IndicatorSpec.of('bollinger', period=self.bb_period, std_dev=self.bb_std_dev)
+        }
+        
+        # Per-symbol indicator state for on_bar/on_tick
+        self._streams = {}
     
-    def analyze(self, rates: list, symbol: str) -> Optional[Dict[str, Any]]:
+    @property
+    def lookback(self) -> int:
+        """Bars to fetch for analyze(): its history requirement, or more for indicators to converge"""
+        return max(self.bb_period + 10, required_history(self.indicators))
+    
+    def analyze(self, rates: Bars, symbol: str,
+                indicators: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
         Analyze market data and generate signal
         
         Args:
-            rates: OHLC data (list of dicts with open, high, low, close)
+            rates: OHLC bars (Bars, or list of dicts with open, high, low, close)
             symbol: Trading symbol
-            
+            indicators: Precomputed values of self.indicators by name
+                        (e.g. from IndicatorEngine.resolve); computed here if omitted
+        
         Returns:
             Signal dict or None if no signal
         """
         try:
+            rates = as_bars(rates)
+            
             if len(rates) < self.bb_period + 10:
                 logger.warning(f"Not enough data for {symbol}")
                 return None
             
-            # Extract close prices
-            closes = np.array([rate['close'] for rate in rates])
-            
-            # Calculate Bollinger Bands
-            bb_data = self._calculate_bollinger_bands(closes, self.bb_period, self.bb_std_dev)
-            
-            if bb_data is None:
-                return None
-            
-            middle, upper, lower = bb_data
-            
-            # Get current values
-            current_price = closes[-1]
-            current_middle = middle[-1]
-            current_upper = upper[-1]
-            current_lower = lower[-1]
-            
-            # Calculate deviation from middle
-            deviation = (current_price - current_middle) / (current_upper - current_lower)
-            
-            signal = None
-            confidence = 0.0
-            
-            # Price touches lower band - potential buy
-            if current_price <= current_lower:
-                signal = 'BUY'
-                # Confidence increases as price gets closer to lower band
-                confidence = min(0.9, 0.65 + abs(deviation) * 0.5)
-            
-            # Price touches upper band - potential sell
-            elif current_price >= current_upper:
-                signal = 'SELL'
-                confidence = min(0.9, 0.65 + abs(deviation) * 0.5)
-            
-            # Price is outside bands - strong reversal signal
-            elif current_price < current_lower:
-                signal = 'BUY'
-                confidence = min(0.95, 0.75 + abs(deviation) * 0.3)
-            
-            elif current_price > current_upper:
-                signal = 'SELL'
-                confidence = min(0.95, 0.75 + abs(deviation) * 0.3)
-            
-            if signal and confidence >= self.min_confidence:
-                return {
-                    'strategy': 'MEAN_REVERSION',
-                    'symbol': symbol,
-                    'action': signal,
-                    'confidence': confidence,
-                    'entry_price': current_price,
-                    'take_profit': current_middle,  # Target is middle band
-                    'stop_loss': current_price + (self.stop_loss_pips * 0.0001 if signal == 'BUY' else -self.stop_loss_pips * 0.0001),
-                    'indicators': {
-                        'upper_band': current_upper,
-                        'middle_band': current_middle,
-                        'lower_band': current_lower,
-                        'deviation': deviation
-                    }
-                }
-            
-            return None
+            # Bollinger Bands
+            if indicators is None:
+                indicators = compute_indicators(rates, self.indicators)
             
+            actions, confidences, values = self._decide_array(rates.close, indicators)
+            return self._build_signal(symbol, actions, confidences, values)
+        
         except Exception as e:
             logger.error(f"Error in mean reversion analysis: {str(e)}")
             return None
     
-    @staticmethod
-    def _calculate_bollinger_bands(data: np.ndarray, period: int, std_dev: float):
-        """Calculate Bollinger Bands"""
+    def analyze_batch(self, closes: np.ndarray, symbols: List[str],
+                      indicators: Optional[Dict[str, Any]] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyze many symbols in one vectorized pass
+        
+        Args:
+            closes: Close prices, one row per symbol (symbols x bars)
+            symbols: Trading symbols, one per row
+            indicators: Precomputed values of self.indicators on closes; computed here if omitted
+        
+        Returns:
+            Signal dict or None for each symbol
+        """
         try:
-            if len(data) < period:
-                return None
-            
-            # Calculate SMA (middle band)
-            middle = np.convolve(data, np.ones(period) / period, mode='valid')
+            closes = np.asarray(closes, dtype=np.float64)
             
-            # Calculate standard deviation
-            std = np.array([np.std(data[i:i+period]) for i in range(len(data) - period + 1)])
+            if closes.shape[1] < self.bb_period + 10:
+                logger.warning(f"Not enough data for {len(symbols)} symbols")
+                return [None] * len(symbols)
             
-            # Calculate bands
-            upper = middle + (std * std_dev)
-            lower = middle - (std * std_dev)
+            if indicators is None:
+                indicators = compute_indicators(closes, self.indicators)
             
-            # Pad with None values
-            padding = len(data) - len(middle)
-            middle = np.concatenate([np.full(padding, np.nan), middle])
-            upper = np.concatenate([np.full(padding, np.nan), upper])
-            lower = np.concatenate([np.full(padding, np.nan), lower])
+            actions, confidences, values = self._decide_array(closes, indicators)
+            return [
+                self._build_signal(symbol, actions[i], confidences[i], {k: v[i] for k, v in values.items()})
+                for i, symbol in enumerate(symbols)
+            ]
+        
+        except Exception as e:
+            logger.error(f"Error in mean reversion batch analysis: {str(e)}")
+            return [None] * len(symbols)
+    
+    def generate_signals(self, closes: np.ndarray,
+                         indicators: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Evaluate every bar of a history in one vectorized pass
+        
+        Bar i gets the decision analyze() makes on the bars up to and
+        including i; bars before the history requirement get no signal.
+        
+        Args:
+            closes: Close prices (1-D, or 2-D with one symbol per row)
+            indicators: Precomputed values of self.indicators on closes; computed here if omitted
+        
+        Returns:
+            Tuple of per-bar arrays (action: 1 buy / -1 sell / 0 none, confidence,
+            take profit, stop loss), levels being NaN where there is no action
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        if indicators is None:
+            indicators = compute_indicators(closes, self.indicators)
+        
+        actions, confidences, values = self._decide_array(
+            pairwise(closes), {name: pairwise(value) for name, value in indicators.items()}
+        )
+        
+        ready = np.arange(1, closes.shape[-1] + 1) >= self.bb_period + 10
+        actions = np.where(ready, actions, 0).astype(np.int8)
+        confidences = np.where(ready, confidences, 0.0)
+        take_profits, stop_losses = self._levels(actions, values)
+        return actions, confidences, take_profits, stop_losses
+    
+    def warm_up(self, symbol: str, rates: Bars):
+        """
+        Load closed-bar history before streaming with on_bar/on_tick
+        
+        Args:
+            symbol: Trading symbol
+            rates: Closed OHLC bars, oldest first
+        """
+        self._stream(symbol).prime(as_bars(rates).close)
+    
+    def on_bar(self, symbol: str, bar: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Process a closed bar and generate signal
+        
+        Equivalent to analyze() on every bar seen so far, in constant time.
+        
+        Args:
+            symbol: Trading symbol
+            bar: Closed bar (dict with close)
+        
+        Returns:
+            Signal dict or None if no signal
+        """
+        return self._on_price(symbol, float(bar['close']), commit=True)
+    
+    def on_tick(self, symbol: str, tick: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Evaluate a new quote on the forming bar without changing state
+        
+        Equivalent to analyze() on the closed bars plus a forming bar closing at the bid.
+        
+        Args:
+            symbol: Trading symbol
+            tick: Tick (dict with bid)
+        
+        Returns:
+            Signal dict or None if no signal
+        """
+        return self._on_price(symbol, float(tick['bid']), commit=False)
+    
+    def _stream(self, symbol: str) -> IndicatorStream:
+        """Get or create the indicator state of a symbol"""
+        stream = self._streams.get(symbol)
+        if stream is None:
+            stream = self._streams[symbol] = IndicatorStream(self.indicators)
+        return stream
+    
+    def _on_price(self, symbol: str, price: float, commit: bool) -> Optional[Dict[str, Any]]:
+        """Decide on the latest price of a symbol, adding it as a closed bar if commit"""
+        try:
+            stream = self._stream(symbol)
+            closes, indicators = stream.update(price) if commit else stream.peek(price)
             
-            return middle, upper, lower
+            # Same history requirement as analyze(), counting the forming bar
+            if stream.count + (0 if commit else 1) < self.bb_period + 10:
+                return None
             
+            actions, confidences, values = self._decide_array(closes, indicators)
+            return self._build_signal(symbol, actions, confidences, values)
+        
         except Exception as e:
-            logger.error(f"Error calculating Bollinger Bands: {str(e)}")
+            logger.error(f"Error in mean reversion streaming analysis: {str(e)}")
+            return None
+    
+    def _decide_array(self, closes: np.ndarray, indicators: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Decide on the latest bar of one series (1-D) or many (2-D)
+        
+        Returns:
+            Tuple of (action: 1 buy / -1 sell / 0 none, confidence, indicator values)
+        """
+        middle, upper, lower = indicators['bands']
+        
+        # Current values
+        current_price = closes[..., -1]
+        current_middle = middle[..., -1]
+        current_upper = upper[..., -1]
+        current_lower = lower[..., -1]
+        
+        # Deviation from middle
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = (current_price - current_middle) / (current_upper - current_lower)
+        
+        # Price touching or beyond a band - potential reversal
+        actions = np.where(current_price <= current_lower, 1, np.where(current_price >= current_upper, -1, 0))
+        # Confidence increases with the distance from the middle band
+        confidences = np.where(actions != 0, np.minimum(0.9, 0.65 + np.abs(deviation) * 0.5), 0.0)
+        actions = np.where(confidences >= self.min_confidence, actions, 0)
+        
+        return actions, confidences, {
+            'upper_band': current_upper,
+            'middle_band': current_middle,
+            'lower_band': current_lower,
+            'deviation': deviation,
+            'current_price': current_price
+        }
+    
+    def _levels(self, actions: np.ndarray, values: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Take profit (the middle band) and stop loss of decisions (NaN where there is no action)"""
+        current_price = values['current_price']
+        stop_loss = current_price - np.where(actions > 0, self.stop_loss_pips * 0.0001, -self.stop_loss_pips * 0.0001)
+        return np.where(actions != 0, values['middle_band'], np.nan), np.where(actions != 0, stop_loss, np.nan)
+    
+    def _build_signal(self, symbol: str, action: int, confidence: float,
+                      values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Build the signal dict for one symbol's decision"""
+        if not action:
             return None
+        
+        signal = 'BUY' if action > 0 else 'SELL'
+        current_price = float(values['current_price'])
+        take_profit, stop_loss = self._levels(action, values)
+        return {
+            'strategy': 'MEAN_REVERSION',
+            'symbol': symbol,
+            'action': signal,
+            'confidence': float(confidence),
+            'entry_price': current_price,
+            'take_profit': float(take_profit),  # Target is middle band
+            'stop_loss': float(stop_loss),
+            'indicators': {
+                'upper_band': float(values['upper_band']),
+                'middle_band': float(values['middle_band']),
+                'lower_band': float(values['lower_band']),
+                'deviation': float(values['deviation'])
+            }
+        }
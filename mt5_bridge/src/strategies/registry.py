@@ -0,0 +1,47 @@
+"""
+Strategy Registry - Strategy classes by configuration name
+
+The bridge evaluates strategies with analyze_batch() on bar closes and
+ticks. Their streaming entry points (warm_up, on_bar, on_tick) give the
+same signals in constant time per event but are for library use only:
+nothing in the bridge calls them.
+"""
+
+import logging
+from typing import Any, Dict
+
+from config import get_setting
+from strategies.trend_following import TrendFollowingStrategy
+from strategies.mean_reversion import MeanReversionStrategy
+from strategies.scalping import ScalpingStrategy
+
+logger = logging.getLogger(__name__)
+
+# Keys of the strategies section in config.yaml
+STRATEGIES = {
+    'trend_following': TrendFollowingStrategy,
+    'mean_reversion': MeanReversionStrategy,
+    'scalping': ScalpingStrategy
+}
+
+
+def create_strategies(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Create the strategies enabled in the configuration
+
+    Args:
+        config: Configuration dict
+
+    Returns:
+        Dictionary of name -> strategy instance
+    """
+    strategies = {}
+    for name, settings in (get_setting(config, 'strategies', {}) or {}).items():
+        settings = settings or {}
+        if not settings.get('enabled', True):
+            continue
+        if name not in STRATEGIES:
+            logger.warning(f"Unknown strategy in configuration: {name}")
+            continue
+        strategies[name] = STRATEGIES[name](settings.get('parameters') or {})
+    return strategies
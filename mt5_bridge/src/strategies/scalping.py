@@ -4,9 +4,12 @@ Short-term positions using RSI
 """
 
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import numpy as np
 
+from bars import Bars, as_bars
+from indicator_graph import IndicatorSpec, IndicatorStream, compute_indicators, pairwise, required_history
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,128 +36,240 @@ class ScalpingStrategy:
         self.min_confidence = self.params.get('min_confidence', 0.7)
         self.take_profit_pips = self.params.get('take_profit_pips', 5)
         self.stop_loss_pips = self.params.get('stop_loss_pips', 10)
+        
+        # Indicators this strategy needs
+        self.indicators = {
+            'rsi': IndicatorSpec.of('rsi', period=self.rsi_period)
+        }
+        
+        # Per-symbol indicator state for on_bar/on_tick
+        self._streams = {}
     
-    def analyze(self, rates: list, symbol: str) -> Optional[Dict[str, Any]]:
+    @property
+    def lookback(self) -> int:
+        """Bars to fetch for analyze(): its history requirement, or more for indicators to converge"""
+        return max(self.rsi_period + 10, required_history(self.indicators))
+    
+    def analyze(self, rates: Bars, symbol: str,
+                indicators: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
         Analyze market data and generate signal
         
         Args:
-            rates: OHLC data (list of dicts with open, high, low, close)
+            rates: OHLC bars (Bars, or list of dicts with open, high, low, close)
             symbol: Trading symbol
-            
+            indicators: Precomputed values of self.indicators by name
+                        (e.g. from IndicatorEngine.resolve); computed here if omitted
+        
         Returns:
             Signal dict or None if no signal
         """
         try:
+            rates = as_bars(rates)
+            
             if len(rates) < self.rsi_period + 10:
                 logger.warning(f"Not enough data for {symbol}")
                 return None
             
-            # Extract close prices
-            closes = np.array([rate['close'] for rate in rates])
-            
-            # Calculate RSI
-            rsi = self._calculate_rsi(closes, self.rsi_period)
-            
-            if rsi is None or len(rsi) == 0:
-                return None
-            
-            # Get current values
-            current_price = closes[-1]
-            current_rsi = rsi[-1]
-            
-            # Get previous RSI for trend detection
-            prev_rsi = rsi[-2] if len(rsi) > 1 else current_rsi
-            
-            signal = None
-            confidence = 0.0
-            
-            # Oversold - potential buy
-            if current_rsi < self.rsi_oversold:
-                signal = 'BUY'
-                # Confidence increases as RSI gets lower
-                confidence = min(0.95, 0.7 + (self.rsi_oversold - current_rsi) / 100)
-            
-            # Overbought - potential sell
-            elif current_rsi > self.rsi_overbought:
-                signal = 'SELL'
-                confidence = min(0.95, 0.7 + (current_rsi - self.rsi_overbought) / 100)
-            
-            # RSI crosses oversold level upward - buy signal
-            elif prev_rsi <= self.rsi_oversold and current_rsi > self.rsi_oversold:
-                signal = 'BUY'
-                confidence = 0.85
-            
-            # RSI crosses overbought level downward - sell signal
-            elif prev_rsi >= self.rsi_overbought and current_rsi < self.rsi_overbought:
-                signal = 'SELL'
-                confidence = 0.85
-            
-            if signal and confidence >= self.min_confidence:
-                return {
-                    'strategy': 'SCALPING',
-                    'symbol': symbol,
-                    'action': signal,
-                    'confidence': confidence,
-                    'entry_price': current_price,
-                    'take_profit': current_price + (self.take_profit_pips * 0.0001 if signal == 'BUY' else -self.take_profit_pips * 0.0001),
-                    'stop_loss': current_price - (self.stop_loss_pips * 0.0001 if signal == 'BUY' else -self.stop_loss_pips * 0.0001),
-                    'indicators': {
-                        'rsi': current_rsi,
-                        'rsi_overbought': self.rsi_overbought,
-                        'rsi_oversold': self.rsi_oversold
-                    }
-                }
-            
-            return None
+            # RSI
+            if indicators is None:
+                indicators = compute_indicators(rates, self.indicators)
             
+            actions, confidences, values = self._decide_array(rates.close, indicators)
+            return self._build_signal(symbol, actions, confidences, values)
+        
         except Exception as e:
             logger.error(f"Error in scalping analysis: {str(e)}")
             return None
     
-    @staticmethod
-    def _calculate_rsi(data: np.ndarray, period: int) -> Optional[np.ndarray]:
-        """Calculate Relative Strength Index (RSI)"""
+    def analyze_batch(self, closes: np.ndarray, symbols: List[str],
+                      indicators: Optional[Dict[str, Any]] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyze many symbols in one vectorized pass
+        
+        Args:
+            closes: Close prices, one row per symbol (symbols x bars)
+            symbols: Trading symbols, one per row
+            indicators: Precomputed values of self.indicators on closes; computed here if omitted
+        
+        Returns:
+            Signal dict or None for each symbol
+        """
         try:
-            if len(data) < period + 1:
-                return None
-            
-            # Calculate price changes
-            deltas = np.diff(data)
+            closes = np.asarray(closes, dtype=np.float64)
             
-            # Separate gains and losses
-            gains = np.where(deltas > 0, deltas, 0)
-            losses = np.where(deltas < 0, -deltas, 0)
+            if closes.shape[1] < self.rsi_period + 10:
+                logger.warning(f"Not enough data for {len(symbols)} symbols")
+                return [None] * len(symbols)
             
-            # Calculate average gains and losses
-            avg_gains = np.zeros_like(data)
-            avg_losses = np.zeros_like(data)
+            if indicators is None:
+                indicators = compute_indicators(closes, self.indicators)
             
-            # First average
-            avg_gains[period] = np.mean(gains[:period])
-            avg_losses[period] = np.mean(losses[:period])
-            
-            # Subsequent averages (smoothed)
-            for i in range(period + 1, len(data)):
-                avg_gains[i] = (avg_gains[i - 1] * (period - 1) + gains[i - 1]) / period
-                avg_losses[i] = (avg_losses[i - 1] * (period - 1) + losses[i - 1]) / period
-            
-            # Calculate RS and RSI
-            rs = np.zeros_like(data)
-            rsi = np.zeros_like(data)
-            
-            for i in range(period, len(data)):
-                if avg_losses[i] != 0:
-                    rs[i] = avg_gains[i] / avg_losses[i]
-                    rsi[i] = 100 - (100 / (1 + rs[i]))
-                else:
-                    rsi[i] = 100 if avg_gains[i] > 0 else 0
-            
-            # Pad with NaN
-            rsi[:period] = np.nan
+            actions, confidences, values = self._decide_array(closes, indicators)
+            return [
+                self._build_signal(symbol, actions[i], confidences[i], {k: v[i] for k, v in values.items()})
+                for i, symbol in enumerate(symbols)
+            ]
+        
+        except Exception as e:
+            logger.error(f"Error in scalping batch analysis: {str(e)}")
+            return [None] * len(symbols)
+    
+    def generate_signals(self, closes: np.ndarray,
+                         indicators: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Evaluate every bar of a history in one vectorized pass
+        
+        Bar i gets the decision analyze() makes on the bars up to and
+        including i; bars before the history requirement get no signal.
+        
+        Args:
+            closes: Close prices (1-D, or 2-D with one symbol per row)
+            indicators: Precomputed values of self.indicators on closes; computed here if omitted
+        
+        Returns:
+            Tuple of per-bar arrays (action: 1 buy / -1 sell / 0 none, confidence,
+            take profit, stop loss), levels being NaN where there is no action
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        if indicators is None:
+            indicators = compute_indicators(closes, self.indicators)
+        
+        actions, confidences, values = self._decide_array(
+            pairwise(closes), {name: pairwise(value) for name, value in indicators.items()}
+        )
+        
+        ready = np.arange(1, closes.shape[-1] + 1) >= self.rsi_period + 10
+        actions = np.where(ready, actions, 0).astype(np.int8)
+        confidences = np.where(ready, confidences, 0.0)
+        take_profits, stop_losses = self._levels(actions, values)
+        return actions, confidences, take_profits, stop_losses
+    
+    def warm_up(self, symbol: str, rates: Bars):
+        """
+        Load closed-bar history before streaming with on_bar/on_tick
+        
+        Args:
+            symbol: Trading symbol
+            rates: Closed OHLC bars, oldest first
+        """
+        self._stream(symbol).prime(as_bars(rates).close)
+    
+    def on_bar(self, symbol: str, bar: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Process a closed bar and generate signal
+        
+        Equivalent to analyze() on every bar seen so far, in constant time.
+        
+        Args:
+            symbol: Trading symbol
+            bar: Closed bar (dict with close)
+        
+        Returns:
+            Signal dict or None if no signal
+        """
+        return self._on_price(symbol, float(bar['close']), commit=True)
+    
+    def on_tick(self, symbol: str, tick: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Evaluate a new quote on the forming bar without changing state
+        
+        Equivalent to analyze() on the closed bars plus a forming bar closing at the bid.
+        
+        Args:
+            symbol: Trading symbol
+            tick: Tick (dict with bid)
+        
+        Returns:
+            Signal dict or None if no signal
+        """
+        return self._on_price(symbol, float(tick['bid']), commit=False)
+    
+    def _stream(self, symbol: str) -> IndicatorStream:
+        """Get or create the indicator state of a symbol"""
+        stream = self._streams.get(symbol)
+        if stream is None:
+            stream = self._streams[symbol] = IndicatorStream(self.indicators)
+        return stream
+    
+    def _on_price(self, symbol: str, price: float, commit: bool) -> Optional[Dict[str, Any]]:
+        """Decide on the latest price of a symbol, adding it as a closed bar if commit"""
+        try:
+            stream = self._stream(symbol)
+            closes, indicators = stream.update(price) if commit else stream.peek(price)
             
-            return rsi
+            # Same history requirement as analyze(), counting the forming bar
+            if stream.count + (0 if commit else 1) < self.rsi_period + 10:
+                return None
             
+            actions, confidences, values = self._decide_array(closes, indicators)
+            return self._build_signal(symbol, actions, confidences, values)
+        
         except Exception as e:
-            logger.error(f"Error calculating RSI: {str(e)}")
+            logger.error(f"Error in scalping streaming analysis: {str(e)}")
+            return None
+    
+    def _decide_array(self, closes: np.ndarray, indicators: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Decide on the latest bar of one series (1-D) or many (2-D)
+        
+        Returns:
+            Tuple of (action: 1 buy / -1 sell / 0 none, confidence, indicator values)
+        """
+        rsi = indicators['rsi']
+        
+        # Current and previous values
+        current_price = closes[..., -1]
+        current_rsi = rsi[..., -1]
+        prev_rsi = rsi[..., -2]
+        
+        # Oversold / overbought, then RSI leaving those zones
+        oversold = current_rsi < self.rsi_oversold
+        overbought = current_rsi > self.rsi_overbought
+        leaving_oversold = (prev_rsi <= self.rsi_oversold) & (current_rsi > self.rsi_oversold)
+        leaving_overbought = (prev_rsi >= self.rsi_overbought) & (current_rsi < self.rsi_overbought)
+
+        actions = np.where(oversold, 1, np.where(overbought, -1, np.where(
+            leaving_oversold, 1, np.where(leaving_overbought, -1, 0))))
+        # Confidence grows with the depth into the zone; crossing out of it is fixed
+        confidences = np.where(
+            oversold,
+            np.minimum(0.95, 0.7 + (self.rsi_oversold - current_rsi) / 100),
+            np.where(overbought, np.minimum(0.95, 0.7 + (current_rsi - self.rsi_overbought) / 100), 0.85)
+        )
+        confidences = np.where(actions != 0, confidences, 0.0)
+        actions = np.where(confidences >= self.min_confidence, actions, 0)
+        
+        return actions, confidences, {'rsi': current_rsi, 'current_price': current_price}
+    
+    def _levels(self, actions: np.ndarray, values: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Take profit and stop loss of decisions (NaN where there is no action)"""
+        current_price = values['current_price']
+        buy = actions > 0
+        take_profit = current_price + np.where(buy, self.take_profit_pips * 0.0001, -self.take_profit_pips * 0.0001)
+        stop_loss = current_price - np.where(buy, self.stop_loss_pips * 0.0001, -self.stop_loss_pips * 0.0001)
+        return np.where(actions != 0, take_profit, np.nan), np.where(actions != 0, stop_loss, np.nan)
+    
+    def _build_signal(self, symbol: str, action: int, confidence: float,
+                      values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Build the signal dict for one symbol's decision"""
+        if not action:
             return None
+        
+        signal = 'BUY' if action > 0 else 'SELL'
+        current_price = float(values['current_price'])
+        take_profit, stop_loss = self._levels(action, values)
+        return {
+            'strategy': 'SCALPING',
+            'symbol': symbol,
+            'action': signal,
+            'confidence': float(confidence),
+            'entry_price': current_price,
+            'take_profit': float(take_profit),
+            'stop_loss': float(stop_loss),
+            'indicators': {
+                'rsi': float(values['rsi']),
+                'rsi_overbought': self.rsi_overbought,
+                'rsi_oversold': self.rsi_oversold
+            }
+        }
@@ -4,9 +4,12 @@ Follows market trends using moving averages
 """
 
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import numpy as np
 
+from bars import Bars, as_bars
+from indicator_graph import IndicatorSpec, IndicatorStream, compute_indicators, pairwise, required_history
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,128 +34,244 @@ class TrendFollowingStrategy:
         self.min_confidence = self.params.get('min_confidence', 0.6)
         self.take_profit_pips = self.params.get('take_profit_pips', 50)
         self.stop_loss_pips = self.params.get('stop_loss_pips', 30)
+        
+        # Indicators this strategy needs
+        self.indicators = {
+            'ma_short': IndicatorSpec.of('sma', period=self.ma_short),
+            'ma_long': IndicatorSpec.of('sma', period=self.ma_long)
+        }
+        
+        # Per-symbol indicator state for on_bar/on_tick
+        self._streams = {}
     
-    def analyze(self, rates: list, symbol: str) -> Optional[Dict[str, Any]]:
+    @property
+    def lookback(self) -> int:
+        """Bars to fetch for analyze(): its history requirement, or more for indicators to converge"""
+        return max(self.ma_long + 10, required_history(self.indicators))
+    
+    def analyze(self, rates: Bars, symbol: str,
+                indicators: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
         Analyze market data and generate signal
         
         Args:
-            rates: OHLC data (list of dicts with open, high, low, close)
+            rates: OHLC bars (Bars, or list of dicts with open, high, low, close)
             symbol: Trading symbol
-            
+            indicators: Precomputed values of self.indicators by name
+                        (e.g. from IndicatorEngine.resolve); computed here if omitted
+        
         Returns:
             Signal dict or None if no signal
         """
         try:
+            rates = as_bars(rates)
+            
             if len(rates) < self.ma_long + 10:
                 logger.warning(f"Not enough data for {symbol}")
                 return None
             
-            # Extract close prices
-            closes = np.array([rate['close'] for rate in rates])
-            
-            # Calculate moving averages
-            ma_short = self._calculate_sma(closes, self.ma_short)
-            ma_long = self._calculate_sma(closes, self.ma_long)
-            
-            if ma_short is None or ma_long is None:
-                return None
-            
-            # Get current values
-            current_price = closes[-1]
-            ma_short_current = ma_short[-1]
-            ma_long_current = ma_long[-1]
-            
-            # Get previous values for trend detection
-            ma_short_prev = ma_short[-2] if len(ma_short) > 1 else ma_short[-1]
-            ma_long_prev = ma_long[-2] if len(ma_long) > 1 else ma_long[-1]
-            
-            # Detect trend
-            signal = None
-            confidence = 0.0
-            
-            # Bullish signal: MA short crosses above MA long
-            if ma_short_prev <= ma_long_prev and ma_short_current > ma_long_current:
-                signal = 'BUY'
-                # Confidence based on distance between MAs
-                distance = (ma_short_current - ma_long_current) / ma_long_current
-                confidence = min(0.9, 0.6 + distance * 10)
-            
-            # Bearish signal: MA short crosses below MA long
-            elif ma_short_prev >= ma_long_prev and ma_short_current < ma_long_current:
-                signal = 'SELL'
-                distance = (ma_long_current - ma_short_current) / ma_long_current
-                confidence = min(0.9, 0.6 + distance * 10)
-            
-            # Trend continuation signals
-            elif ma_short_current > ma_long_current and current_price > ma_short_current:
-                signal = 'BUY'
-                distance = (current_price - ma_short_current) / ma_short_current
-                confidence = min(0.8, 0.5 + distance * 5)
-            
-            elif ma_short_current < ma_long_current and current_price < ma_short_current:
-                signal = 'SELL'
-                distance = (ma_short_current - current_price) / ma_short_current
-                confidence = min(0.8, 0.5 + distance * 5)
-            
-            if signal and confidence >= self.min_confidence:
-                return {
-                    'strategy': 'TREND_FOLLOWING',
-                    'symbol': symbol,
-                    'action': signal,
-                    'confidence': confidence,
-                    'entry_price': current_price,
-                    'take_profit': current_price + (self.take_profit_pips * 0.0001 if signal == 'BUY' else -self.take_profit_pips * 0.0001),
-                    'stop_loss': current_price - (self.stop_loss_pips * 0.0001 if signal == 'BUY' else -self.stop_loss_pips * 0.0001),
-                    'indicators': {
-                        'ma_short': ma_short_current,
-                        'ma_long': ma_long_current,
-                        'current_price': current_price
-                    }
-                }
-            
-            return None
+            # Moving averages
+            if indicators is None:
+                indicators = compute_indicators(rates, self.indicators)
             
+            actions, confidences, values = self._decide_array(rates.close, indicators)
+            return self._build_signal(symbol, actions, confidences, values)
+        
         except Exception as e:
             logger.error(f"Error in trend following analysis: {str(e)}")
             return None
     
-    @staticmethod
-    def _calculate_sma(data: np.ndarray, period: int) -> Optional[np.ndarray]:
-        """Calculate Simple Moving Average"""
+    def analyze_batch(self, closes: np.ndarray, symbols: List[str],
+                      indicators: Optional[Dict[str, Any]] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyze many symbols in one vectorized pass
+        
+        Args:
+            closes: Close prices, one row per symbol (symbols x bars)
+            symbols: Trading symbols, one per row
+            indicators: Precomputed values of self.indicators on closes; computed here if omitted
+        
+        Returns:
+            Signal dict or None for each symbol
+        """
         try:
-            if len(data) < period:
-                return None
+            closes = np.asarray(closes, dtype=np.float64)
             
-            sma = np.convolve(data, np.ones(period) / period, mode='valid')
-            # Pad with None values to match original length
-            padding = len(data) - len(sma)
-            return np.concatenate([np.full(padding, np.nan), sma])
+            if closes.shape[1] < self.ma_long + 10:
+                logger.warning(f"Not enough data for {len(symbols)} symbols")
+                return [None] * len(symbols)
+            
+            if indicators is None:
+                indicators = compute_indicators(closes, self.indicators)
+            
+            actions, confidences, values = self._decide_array(closes, indicators)
+            return [
+                self._build_signal(symbol, actions[i], confidences[i], {k: v[i] for k, v in values.items()})
+                for i, symbol in enumerate(symbols)
+            ]
+        
         except Exception as e:
-            logger.error(f"Error calculating SMA: {str(e)}")
-            return None
+            logger.error(f"Error in trend following batch analysis: {str(e)}")
+            return [None] * len(symbols)
+    
+    def generate_signals(self, closes: np.ndarray,
+                         indicators: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Evaluate every bar of a history in one vectorized pass
+        
+        Bar i gets the decision analyze() makes on the bars up to and
+        including i; bars before the history requirement get no signal.
+        
+        Args:
+            closes: Close prices (1-D, or 2-D with one symbol per row)
+            indicators: Precomputed values of self.indicators on closes; computed here if omitted
+        
+        Returns:
+            Tuple of per-bar arrays (action: 1 buy / -1 sell / 0 none, confidence,
+            take profit, stop loss), levels being NaN where there is no action
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        if indicators is None:
+            indicators = compute_indicators(closes, self.indicators)
+        
+        actions, confidences, values = self._decide_array(
+            pairwise(closes), {name: pairwise(value) for name, value in indicators.items()}
+        )
+        
+        ready = np.arange(1, closes.shape[-1] + 1) >= self.ma_long + 10
+        actions = np.where(ready, actions, 0).astype(np.int8)
+        confidences = np.where(ready, confidences, 0.0)
+        take_profits, stop_losses = self._levels(actions, values)
+        return actions, confidences, take_profits, stop_losses
+    
+    def warm_up(self, symbol: str, rates: Bars):
+        """
+        Load closed-bar history before streaming with on_bar/on_tick
+        
+        Args:
+            symbol: Trading symbol
+            rates: Closed OHLC bars, oldest first
+        """
+        self._stream(symbol).prime(as_bars(rates).close)
+    
+    def on_bar(self, symbol: str, bar: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Process a closed bar and generate signal
+        
+        Equivalent to analyze() on every bar seen so far, in constant time.
+        
+        Args:
+            symbol: Trading symbol
+            bar: Closed bar (dict with close)
+        
+        Returns:
+            Signal dict or None if no signal
+        """
+        return self._on_price(symbol, float(bar['close']), commit=True)
+    
+    def on_tick(self, symbol: str, tick: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Evaluate a new quote on the forming bar without changing state
+        
+        Equivalent to analyze() on the closed bars plus a forming bar closing at the bid.
+        
+        Args:
+            symbol: Trading symbol
+            tick: Tick (dict with bid)
+        
+        Returns:
+            Signal dict or None if no signal
+        """
+        return self._on_price(symbol, float(tick['bid']), commit=False)
+    
+    def _stream(self, symbol: str) -> IndicatorStream:
+        """Get or create the indicator state of a symbol"""
+        stream = self._streams.get(symbol)
+        if stream is None:
+            stream = self._streams[symbol] = IndicatorStream(self.indicators)
+        return stream
     
-    @staticmethod
-    def _calculate_ema(data: np.ndarray, period: int) -> Optional[np.ndarray]:
-        """Calculate Exponential Moving Average"""
+    def _on_price(self, symbol: str, price: float, commit: bool) -> Optional[Dict[str, Any]]:
+        """Decide on the latest price of a symbol, adding it as a closed bar if commit"""
         try:
-            if len(data) < period:
-                return None
-            
-            ema = np.zeros_like(data)
-            multiplier = 2 / (period + 1)
-            
-            # First EMA is SMA
-            ema[period - 1] = np.mean(data[:period])
+            stream = self._stream(symbol)
+            closes, indicators = stream.update(price) if commit else stream.peek(price)
             
-            # Calculate EMA
-            for i in range(period, len(data)):
-                ema[i] = (data[i] * multiplier) + (ema[i - 1] * (1 - multiplier))
-            
-            # Pad with NaN
-            ema[:period - 1] = np.nan
+            # Same history requirement as analyze(), counting the forming bar
+            if stream.count + (0 if commit else 1) < self.ma_long + 10:
+                return None
             
-            return ema
+            actions, confidences, values = self._decide_array(closes, indicators)
+            return self._build_signal(symbol, actions, confidences, values)
+        
         except Exception as e:
-            logger.error(f"Error calculating EMA: {str(e)}")
+            logger.error(f"Error in trend following streaming analysis: {str(e)}")
+            return None
+    
+    def _decide_array(self, closes: np.ndarray, indicators: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Decide on the latest bar of one series (1-D) or many (2-D)
+        
+        Returns:
+            Tuple of (action: 1 buy / -1 sell / 0 none, confidence, indicator values)
+        """
+        ma_short = indicators['ma_short']
+        ma_long = indicators['ma_long']
+        
+        # Current and previous values
+        current_price = closes[..., -1]
+        ma_short_current = ma_short[..., -1]
+        ma_long_current = ma_long[..., -1]
+        ma_short_prev = ma_short[..., -2]
+        ma_long_prev = ma_long[..., -2]
+        
+        # Crossovers first, then trend continuation
+        cross_up = (ma_short_prev <= ma_long_prev) & (ma_short_current > ma_long_current)
+        cross_down = (ma_short_prev >= ma_long_prev) & (ma_short_current < ma_long_current)
+        trend_up = (ma_short_current > ma_long_current) & (current_price > ma_short_current)
+        trend_down = (ma_short_current < ma_long_current) & (current_price < ma_short_current)
+
+        actions = np.where(cross_up | trend_up, 1, np.where(cross_down | trend_down, -1, 0))
+        # Confidence from the distance between MAs on a crossover, from price to MA otherwise
+        crossed = cross_up | cross_down
+        confidences = np.where(
+            crossed,
+            np.minimum(0.9, 0.6 + np.abs(ma_short_current - ma_long_current) / ma_long_current * 10),
+            np.minimum(0.8, 0.5 + np.abs(current_price - ma_short_current) / ma_short_current * 5)
+        )
+        confidences = np.where(actions != 0, confidences, 0.0)
+        actions = np.where(confidences >= self.min_confidence, actions, 0)
+        
+        return actions, confidences, {
+            'ma_short': ma_short_current,
+            'ma_long': ma_long_current,
+            'current_price': current_price
+        }
+    
+    def _levels(self, actions: np.ndarray, values: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Take profit and stop loss of decisions (NaN where there is no action)"""
+        current_price = values['current_price']
+        buy = actions > 0
+        take_profit = current_price + np.where(buy, self.take_profit_pips * 0.0001, -self.take_profit_pips * 0.0001)
+        stop_loss = current_price - np.where(buy, self.stop_loss_pips * 0.0001, -self.stop_loss_pips * 0.0001)
+        return np.where(actions != 0, take_profit, np.nan), np.where(actions != 0, stop_loss, np.nan)
+    
+    def _build_signal(self, symbol: str, action: int, confidence: float,
+                      values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Build the signal dict for one symbol's decision"""
+        if not action:
             return None
+        
+        signal = 'BUY' if action > 0 else 'SELL'
+        current_price = float(values['current_price'])
+        take_profit, stop_loss = self._levels(action, values)
+        return {
+            'strategy': 'TREND_FOLLOWING',
+            'symbol': symbol,
+            'action': signal,
+            'confidence': float(confidence),
+            'entry_price': current_price,
+            'take_profit': float(take_profit),
+            'stop_loss': float(stop_loss),
+            'indicators': {name: float(value) for name, value in values.items()}
+        }
@@ -0,0 +1,277 @@
+"""
+Tick Stream - Incremental tick ingestion with per-symbol ring buffers and subscribers
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import numpy as np
+
+from bars import TICK_DTYPE
+
+logger = logging.getLogger(__name__)
+
+
+class TickBuffer:
+    """
+    Fixed-capacity tick history for one symbol
+
+    Uses twice the capacity in storage so the latest ticks are always
+    contiguous and can be returned as views without copying. Compaction
+    moves the kept ticks to a new array instead of overwriting stored
+    ticks, so a view handed out earlier keeps its ticks after later polls.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        """
+        Initialize tick buffer
+
+        Args:
+            capacity: Number of ticks to keep
+        """
+        self.capacity = capacity
+        self._data = np.zeros(capacity * 2, dtype=TICK_DTYPE)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def last_time_msc(self) -> Optional[int]:
+        """Time of the most recent tick in milliseconds"""
+        if self._end == self._start:
+            return None
+        return int(self._data['time_msc'][self._end - 1])
+
+    def append(self, ticks: np.ndarray):
+        """Append ticks sorted by time"""
+        count = len(ticks)
+        if count == 0:
+            return
+
+        if count >= self.capacity:
+            self._data = np.zeros(self.capacity * 2, dtype=TICK_DTYPE)
+            self._data[:self.capacity] = ticks[-self.capacity:]
+            self._start = 0
+            self._end = self.capacity
+            return
+
+        if self._end + count > len(self._data):
+            keep = min(len(self), self.capacity - count)
+            data_before, self._data = self._data, np.zeros(self.capacity * 2, dtype=TICK_DTYPE)
+            self._data[:keep] = data_before[self._end - keep:self._end]
+            self._start = 0
+            self._end = keep
+
+        self._data[self._end:self._end + count] = ticks
+        self._end += count
+        self._start = max(self._start, self._end - self.capacity)
+
+    def latest(self, count: Optional[int] = None) -> np.ndarray:
+        """
+        Get a view of the most recent ticks
+
+        Args:
+            count: Number of ticks (default: all stored ticks)
+        """
+        start = self._start
+        if count is not None:
+            start = max(self._start, self._end - count)
+        return self._data[start:self._end]
+
+
+class TickStream:
+    """
+    Polls new ticks for a set of symbols and pushes them to subscribers
+
+    Each cycle requests only ticks newer than the last one seen per
+    symbol. All symbols are requested before any result is awaited so the
+    requests are queued back to back on the MT5 thread.
+    """
+
+    def __init__(self, mt5_connector, symbols: List[str], buffer_size: int = 10000,
+                 poll_interval: float = 0.05):
+        """
+        Initialize tick stream
+
+        Args:
+            mt5_connector: MT5 connector instance
+            symbols: Symbols to stream
+            buffer_size: Ticks kept per symbol
+            poll_interval: Seconds between polls
+        """
+        self.mt5 = mt5_connector
+        self.symbols = list(symbols)
+        self.poll_interval = poll_interval
+        self.buffers = {symbol: TickBuffer(buffer_size) for symbol in self.symbols}
+        self._subscribers = {}
+        self._next_token = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.polls = 0
+        self.ticks_received = 0
+
+    def start(self):
+        """Start the polling thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='tick-stream', daemon=True)
+        self._thread.start()
+        logger.info(f"Tick stream started for {len(self.symbols)} symbols")
+
+    def stop(self):
+        """Stop the polling thread"""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        logger.info("Tick stream stopped")
+
+    def subscribe(self, callback: Callable[[str, np.ndarray], None],
+                  symbols: Optional[List[str]] = None) -> int:
+        """
+        Register a callback for new ticks
+
+        Callbacks run on the stream thread and receive (symbol, ticks) where
+        ticks is a TICK_DTYPE array of the ticks received in one poll.
+
+        Args:
+            callback: Function called with new ticks
+            symbols: Symbols to receive (default: all)
+
+        Returns:
+            Subscription token for unsubscribe
+        """
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._subscribers[token] = (callback, set(symbols) if symbols else None)
+        return token
+
+    def unsubscribe(self, token: int):
+        """Remove a subscription"""
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    async def stream(self, symbols: Optional[List[str]] = None,
+                     maxsize: int = 1000) -> AsyncIterator[tuple]:
+        """
+        Iterate over new ticks from an asyncio event loop
+
+        When the consumer falls behind and the queue is full, the oldest
+        pending batch is dropped.
+
+        Args:
+            symbols: Symbols to receive (default: all)
+            maxsize: Maximum number of pending tick batches
+
+        Yields:
+            (symbol, ticks) tuples
+        """
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue(maxsize)
+
+        def enqueue(item):
+            if pending.full():
+                pending.get_nowait()
+            pending.put_nowait(item)
+
+        token = self.subscribe(
+            lambda symbol, ticks: loop.call_soon_threadsafe(enqueue, (symbol, ticks.copy())),
+            symbols
+        )
+        try:
+            while True:
+                yield await pending.get()
+        finally:
+            self.unsubscribe(token)
+
+    def latest(self, symbol: str, count: Optional[int] = None) -> Optional[np.ndarray]:
+        """Get a view of the most recent ticks for a symbol"""
+        buffer = self.buffers.get(symbol)
+        if buffer is None:
+            return None
+        return buffer.latest(count)
+
+    def last_tick(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get the most recent tick for a symbol"""
+        buffer = self.buffers.get(symbol)
+        if buffer is None or len(buffer) == 0:
+            return None
+
+        tick = buffer.latest(1)[0]
+        return {
+            'symbol': symbol,
+            'bid': float(tick['bid']),
+            'ask': float(tick['ask']),
+            'time': int(tick['time']),
+            'time_msc': int(tick['time_msc'])
+        }
+
+    def poll(self) -> int:
+        """
+        Fetch and dispatch new ticks for all symbols once
+
+        Returns:
+            Number of new ticks received
+        """
+        requests = [
+            (symbol, self.mt5.request_ticks(symbol, self.buffers[symbol].last_time_msc))
+            for symbol in self.symbols
+        ]
+
+        received = 0
+        for symbol, future in requests:
+            try:
+                ticks = future.result(self.mt5.timeout)
+            except Exception as e:
+                logger.error(f"Error getting ticks for {symbol}: {str(e)}")
+                continue
+
+            if ticks is None or len(ticks) == 0:
+                continue
+
+            self.buffers[symbol].append(ticks)
+            received += len(ticks)
+            self._dispatch(symbol, ticks)
+
+        self.polls += 1
+        self.ticks_received += received
+        return received
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get stream statistics"""
+        return {
+            'symbols': len(self.symbols),
+            'polls': self.polls,
+            'ticks_received': self.ticks_received,
+            'subscribers': len(self._subscribers)
+        }
+
+    def _dispatch(self, symbol: str, ticks: np.ndarray):
+        """Notify subscribers of new ticks"""
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+
+        for callback, symbols in subscribers:
+            if symbols is not None and symbol not in symbols:
+                continue
+            try:
+                callback(symbol, ticks)
+            except Exception as e:
+                logger.error(f"Error in tick subscriber: {str(e)}")
+
+    def _run(self):
+        """Polling loop"""
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error in tick stream: {str(e)}")
+            self._stop.wait(max(0.0, self.poll_interval - (time.monotonic() - started)))
@@ -0,0 +1,8 @@
+"""
+Test configuration - Makes the bridge modules importable as they are from src
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
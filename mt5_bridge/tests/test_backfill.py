@@ -0,0 +1,93 @@
+"""
+Backfill tests - request count, empty range memory and resuming against a fake terminal
+"""
+
+import json
+
+import numpy as np
+
+import backfill
+from backfill import Backfiller
+from bar_archive import BarArchive
+from bars import Bars, BAR_DTYPE
+
+MONDAY = 1704067200  # 2024-01-01 00:00 UTC
+MINUTE = 60
+
+
+class FakeConnector:
+    """Serves get_rates_range() from a fixed M1 history and counts the requests"""
+
+    def __init__(self, times: np.ndarray):
+        self.history = _bars(times)
+        self.requests = 0
+
+    def get_rates_range(self, symbol: str, timeframe: int, date_from: int, date_to: int) -> Bars:
+        self.requests += 1
+        times = self.history.time
+        return Bars(self.history.data[(times >= date_from) & (times <= date_to)])
+
+
+def _bars(times: np.ndarray) -> Bars:
+    """Flat M1 bars at the given open times"""
+    data = np.zeros(len(times), dtype=BAR_DTYPE)
+    data['time'] = times
+    data['open'] = data['high'] = data['low'] = data['close'] = 1.1
+    return Bars(data)
+
+
+def _minutes(start: int, end: int) -> np.ndarray:
+    """Open times of minutes start..end-1 after MONDAY"""
+    return MONDAY + np.arange(start, end) * MINUTE
+
+
+class TestBackfill:
+    def test_quiet_minutes_share_one_request(self, tmp_path):
+        """Scattered no-tick minutes and a real gap are fetched together, then never again"""
+        rng = np.random.default_rng(3)
+        minutes = _minutes(0, 2880)
+        quiet = rng.random(len(minutes)) < 0.05
+        terminal = minutes[~quiet]
+        missing = (terminal >= MONDAY + 1000 * MINUTE) & (terminal < MONDAY + 1500 * MINUTE)
+
+        archive = BarArchive(str(tmp_path))
+        archive.merge('EURUSD', 1, _bars(terminal[~missing]))
+        mt5 = FakeConnector(terminal)
+        backfiller = Backfiller(mt5, archive)
+
+        assert backfiller.backfill('EURUSD', 1, int(minutes[0]), int(minutes[-1])) == missing.sum()
+        assert mt5.requests == 1
+        assert np.array_equal(archive.read('EURUSD', 1).time, terminal)
+
+        assert Backfiller(mt5, archive).backfill('EURUSD', 1, int(minutes[0]), int(minutes[-1])) == 0
+        assert mt5.requests == 1
+
+    def test_empty_gap_over_several_chunks_is_remembered(self, tmp_path):
+        """A gap split into chunks that all come back empty is not requested on the next run"""
+        terminal = np.r_[_minutes(0, 1000), _minutes(3000, 3100)]
+        archive = BarArchive(str(tmp_path))
+        archive.merge('EURUSD', 1, _bars(terminal))
+        mt5 = FakeConnector(terminal)
+
+        Backfiller(mt5, archive, chunk_size=100).backfill('EURUSD', 1, int(terminal[0]), int(terminal[-1]))
+        assert mt5.requests == 20
+
+        with open(tmp_path / 'backfill_state.json') as f:
+            assert json.load(f) == {'EURUSD_M1': [[int(MONDAY + 1000 * MINUTE), int(MONDAY + 2999 * MINUTE)]]}
+
+        Backfiller(mt5, archive, chunk_size=100).backfill('EURUSD', 1, int(terminal[0]), int(terminal[-1]))
+        assert mt5.requests == 20
+
+    def test_state_written_once_per_flush(self, tmp_path, monkeypatch):
+        """Empty chunks are saved with the next merge, not one state write each"""
+        terminal = np.r_[_minutes(0, 100), _minutes(2000, 2100)]
+        archive = BarArchive(str(tmp_path))
+        archive.merge('EURUSD', 1, _bars(terminal))
+        writes = []
+        monkeypatch.setattr(backfill.json, 'dump', lambda state, f: writes.append(state))
+
+        Backfiller(FakeConnector(terminal), archive, chunk_size=10).backfill(
+            'EURUSD', 1, int(terminal[0]), int(terminal[-1])
+        )
+
+        assert len(writes) == 1
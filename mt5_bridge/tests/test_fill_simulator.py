@@ -0,0 +1,184 @@
+"""
+Fill simulator tests - exits, spread, position selection, equity and swap on hand-built bars
+"""
+
+import numpy as np
+import pytest
+
+from bars import Bars, BAR_DTYPE
+from fill_simulator import FillSimulator, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_END, _rollovers
+
+MONDAY = 1704067200  # 2024-01-01 00:00 UTC
+HOUR = 3600
+DAY = 86400
+SPREAD = 0.0001  # 10 points on EURUSD
+
+
+def _bars(rows) -> Bars:
+    """Hourly EURUSD bid bars from (open, high, low, close) rows"""
+    data = np.zeros(len(rows), dtype=BAR_DTYPE)
+    data['time'] = MONDAY + np.arange(len(rows)) * HOUR
+    data['open'], data['high'], data['low'], data['close'] = np.array(rows, dtype=np.float64).T
+    return Bars(data)
+
+
+def _simulate(rows, signals, spread: float = 0, **kwargs):
+    """
+    Simulate signals given as {bar: (action, stop_loss, take_profit)}
+
+    Returns:
+        Simulation result
+    """
+    bars = _bars(rows)
+    action = np.zeros(len(bars), dtype=np.int8)
+    stop_loss = np.full(len(bars), np.nan)
+    take_profit = np.full(len(bars), np.nan)
+    for bar, (direction, stop, target) in signals.items():
+        action[bar], stop_loss[bar], take_profit[bar] = direction, stop, target
+    simulator = FillSimulator(volume=0.1, spread=spread, **kwargs)
+    return simulator.simulate_arrays('EURUSD', bars, action, stop_loss, take_profit)
+
+
+FLAT = (1.1000, 1.1000, 1.1000, 1.1000)
+
+
+class TestExits:
+    @pytest.mark.parametrize('ambiguous, bar_open, reason, price', [
+        ('stop', 1.1002, EXIT_STOP_LOSS, 1.0990),
+        ('target', 1.0995, EXIT_TAKE_PROFIT, 1.1010),
+        ('open', 1.1002, EXIT_TAKE_PROFIT, 1.1010),
+        ('open', 1.0995, EXIT_STOP_LOSS, 1.0990),
+    ])
+    def test_ambiguous_bar(self, ambiguous, bar_open, reason, price):
+        """A bar touching both levels exits as the ambiguous rule says"""
+        rows = [FLAT, FLAT, (bar_open, 1.1015, 1.0985, 1.1000), FLAT]
+        result = _simulate(rows, {0: (1, 1.0990, 1.1010)}, ambiguous=ambiguous)
+
+        trade = result.trades[0]
+        assert trade['exit_index'] == 2
+        assert trade['reason'] == reason
+        assert trade['exit_price'] == pytest.approx(price)
+
+    def test_gap_through_stop_fills_at_open(self):
+        """A bar opening beyond the stop fills at its open, not at the stop"""
+        rows = [FLAT, FLAT, (1.0980, 1.0985, 1.0975, 1.0982), FLAT]
+        trade = _simulate(rows, {0: (1, 1.0990, 1.1010)}).trades[0]
+
+        assert trade['reason'] == EXIT_STOP_LOSS
+        assert trade['exit_price'] == pytest.approx(1.0980)
+
+    def test_gap_through_target_fills_at_open(self):
+        """A bar opening beyond the target fills at its (better) open"""
+        rows = [FLAT, FLAT, (1.1020, 1.1025, 1.1015, 1.1022), FLAT]
+        trade = _simulate(rows, {0: (1, 1.0990, 1.1010)}).trades[0]
+
+        assert trade['reason'] == EXIT_TAKE_PROFIT
+        assert trade['exit_price'] == pytest.approx(1.1020)
+
+    def test_open_at_end(self):
+        """A trade with neither level hit closes at the last bar's close"""
+        rows = [FLAT, FLAT, (1.1000, 1.1005, 1.0995, 1.1003)]
+        trade = _simulate(rows, {0: (1, 1.0990, 1.1010)}).trades[0]
+
+        assert trade['reason'] == EXIT_END
+        assert trade['exit_index'] == 2
+        assert trade['exit_price'] == pytest.approx(1.1003)
+
+
+class TestSpread:
+    def test_long_enters_at_ask(self):
+        """Buys fill at the next open plus the spread"""
+        rows = [FLAT, FLAT, FLAT]
+        trade = _simulate(rows, {0: (1, 1.0990, 1.1010)}, spread=10).trades[0]
+
+        assert trade['entry_price'] == pytest.approx(1.1000 + SPREAD)
+
+    def test_short_stop_checked_on_ask(self):
+        """A short's stop is hit when the ask reaches it, though the bid high stays below"""
+        rows = [FLAT, FLAT, (1.1000, 1.10095, 1.0998, 1.1000), FLAT]
+        trade = _simulate(rows, {0: (-1, 1.1010, 1.0980)}, spread=10).trades[0]
+
+        assert trade['entry_price'] == pytest.approx(1.1000)
+        assert trade['exit_index'] == 2
+        assert trade['reason'] == EXIT_STOP_LOSS
+        assert trade['exit_price'] == pytest.approx(1.1010)
+
+    def test_short_target_needs_ask(self):
+        """A short's target is not hit while only the bid low touches it"""
+        rows = [FLAT, FLAT, (1.1000, 1.1002, 1.0990, 1.0995), (1.0995, 1.0996, 1.0988, 1.0992)]
+        trade = _simulate(rows, {0: (-1, 1.1020, 1.0990)}, spread=10).trades[0]
+
+        assert trade['exit_index'] == 3
+        assert trade['reason'] == EXIT_TAKE_PROFIT
+        assert trade['exit_price'] == pytest.approx(1.0990)
+
+
+class TestPositions:
+    ROWS = [FLAT, FLAT, FLAT, (1.1000, 1.1015, 1.1000, 1.1010), FLAT, FLAT, FLAT]
+    SIGNALS = {0: (1, 1.0990, 1.1010), 1: (1, 1.0990, 1.1010), 3: (1, 1.0990, 1.1010)}
+
+    def test_one_position_at_a_time(self):
+        """Signals while a position is open are skipped; the next one after its exit is taken"""
+        trades = _simulate(self.ROWS, self.SIGNALS).trades
+
+        assert list(trades['entry_index']) == [1, 4]
+        assert list(trades['exit_index']) == [3, 6]
+
+    def test_overlap_takes_every_signal(self):
+        """With overlap every signal is its own trade"""
+        trades = _simulate(self.ROWS, self.SIGNALS, overlap=True).trades
+
+        assert list(trades['entry_index']) == [1, 2, 4]
+
+
+class TestEquity:
+    def test_long_equity(self):
+        """Equity is flat before entry, marked at the bid while open and fixed after the exit"""
+        rows = [FLAT, (1.1000, 1.1005, 1.0998, 1.1004), (1.1004, 1.1012, 1.1003, 1.1006), FLAT]
+        result = _simulate(rows, {0: (1, 1.0990, 1.1010)}, spread=10)
+
+        # 0.1 lots: 10000 units, entry at the ask 1.1001, target 1.1010
+        assert result.trades[0]['profit'] == pytest.approx(9.0)
+        assert result.equity == pytest.approx([10000.0, 10003.0, 10009.0, 10009.0])
+
+    def test_short_equity(self):
+        """Shorts are marked at the ask, so the spread shows as an open loss"""
+        rows = [FLAT, (1.1000, 1.1002, 1.0995, 1.0996), (1.0996, 1.0997, 1.0985, 1.0990), FLAT]
+        result = _simulate(rows, {0: (-1, 1.1020, 1.0990)}, spread=10)
+
+        # Entry at the bid 1.1000; bar 1 closes at an ask of 1.0997, target 1.0990 on bar 2
+        assert result.trades[0]['exit_index'] == 2
+        assert result.equity == pytest.approx([10000.0, 10003.0, 10010.0, 10010.0])
+
+
+class TestSwap:
+    @pytest.mark.parametrize('entry_day, days, nights', [
+        (0, 0, 0),  # same day
+        (0, 1, 1),  # Monday -> Tuesday
+        (2, 1, 3),  # Wednesday -> Thursday (triple swap)
+        (4, 3, 1),  # Friday -> Monday
+        (5, 1, 0),  # Saturday -> Sunday
+        (0, 7, 7),  # Monday -> next Monday
+        (0, 14, 14),  # two weeks
+        (3, 6, 4),  # Thursday -> Wednesday
+    ])
+    def test_rollovers(self, entry_day, days, nights):
+        """Swap is charged for weekday rollovers only, Wednesday's counting three"""
+        entry = np.array([MONDAY + entry_day * DAY + 10 * HOUR])
+        exit_time = entry + days * DAY
+
+        assert _rollovers(entry, exit_time)[0] == nights
+
+    def test_swap_on_trade(self):
+        """A long held over Wednesday night is charged three nights of swap_long"""
+        data = np.zeros(4, dtype=BAR_DTYPE)
+        data['time'] = MONDAY + 2 * DAY + np.array([20, 21, 22, 34]) * HOUR
+        data['open'] = data['high'] = data['low'] = data['close'] = 1.1000
+        action = np.array([1, 0, 0, 0], dtype=np.int8)
+        nan = np.full(4, np.nan)
+
+        result = FillSimulator(volume=0.1, spread=0, swap_long=-5.0).simulate_arrays(
+            'EURUSD', Bars(data), action, nan, nan
+        )
+
+        assert result.trades[0]['swap'] == pytest.approx(0.1 * -5.0 * 3)
@@ -0,0 +1,172 @@
+"""
+Indicator tests - Streaming indicators match the batch functions bit for bit; engine memo reuse and invalidation
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from bars import Bars, BAR_DTYPE
+from indicator_graph import IndicatorEngine, IndicatorSpec
+from indicators import sma, bollinger_bands, ema, wilder, rsi, SMA, BollingerBands, EMA, Wilder, RSI
+
+PERIODS = [1, 2, 14, 20]
+LENGTHS = [1, 13, 14, 15, 20, 21, 300]
+
+
+def _prices(count: int, seed: int = 3) -> np.ndarray:
+    """Random walk around 1.085 with a flat stretch (zero gains and losses)"""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 0.0005, count)
+    steps[count // 3:count // 3 + 25] = 0.0
+    return 1.0850 + np.cumsum(steps)
+
+
+# Indicator name -> (batch function, streaming class factory), both taking the period
+INDICATORS = {
+    'sma': (sma, SMA),
+    'ema': (ema, EMA),
+    'wilder': (wilder, Wilder),
+    'rsi': (rsi, RSI),
+    'bollinger': (lambda data, period: bollinger_bands(data, period, 2.0),
+                  lambda period: BollingerBands(period, 2.0))
+}
+
+
+def _stream(stream, data: np.ndarray):
+    """Feed values one by one and collect the results like the batch output"""
+    results = [stream.update(float(value)) for value in data]
+    if isinstance(results[0], tuple):
+        return tuple(np.array(parts) for parts in zip(*results))
+    return np.array(results)
+
+
+def _assert_identical(batch, streamed):
+    """Bit-identical arrays (or tuples of arrays), NaN where the other is NaN"""
+    if isinstance(batch, tuple):
+        assert len(batch) == len(streamed)
+        for batch_part, streamed_part in zip(batch, streamed):
+            _assert_identical(batch_part, streamed_part)
+        return
+    assert np.array_equal(batch, streamed, equal_nan=True)
+
+
+@pytest.mark.parametrize('name', list(INDICATORS))
+@pytest.mark.parametrize('period', PERIODS)
+class TestStreamingMatchesBatch:
+    def test_update(self, name, period):
+        """Values fed one by one give the batch result, including the NaN warm-up"""
+        batch_function, create = INDICATORS[name]
+        for length in LENGTHS:
+            data = _prices(length)
+            batch = batch_function(data, period)
+
+            streamed = _stream(create(period), data)
+
+            _assert_identical(batch, streamed)
+
+    def test_peek(self, name, period):
+        """peek() returns what update() will return for the same value"""
+        _, create = INDICATORS[name]
+        stream = create(period)
+        for value in _prices(120):
+            peeked = stream.peek(float(value))
+            _assert_identical(np.array(peeked), np.array(stream.update(float(value))))
+
+    def test_prime_then_update(self, name, period):
+        """Priming with history in one batch pass, then streaming, matches the batch result"""
+        batch_function, create = INDICATORS[name]
+        data = _prices(300)
+        batch = batch_function(data, period)
+
+        for split in (0, 1, period - 1, period, period + 1, 150):
+            stream = create(period)
+            primed = stream.prime(data[:split])
+            streamed = _stream(stream, data[split:])
+
+            if isinstance(batch, tuple):
+                combined = tuple(np.concatenate([head, tail]) for head, tail in zip(primed, streamed))
+            else:
+                combined = np.concatenate([primed, streamed])
+            _assert_identical(batch, combined)
+
+    def test_rows_match_single_series(self, name, period):
+        """A 2-D batch (one series per row) gives each row's 1-D result"""
+        batch_function, _ = INDICATORS[name]
+        rows = np.stack([_prices(200, seed) for seed in range(4)])
+
+        batch = batch_function(rows, period)
+
+        for row in range(len(rows)):
+            single = batch_function(rows[row], period)
+            if isinstance(batch, tuple):
+                _assert_identical(single, tuple(part[row] for part in batch))
+            else:
+                _assert_identical(single, batch[row])
+
+
+class TestWarmUp:
+    def setup_method(self):
+        self.data = _prices(100)
+
+    @pytest.mark.parametrize('period', PERIODS)
+    def test_moving_averages_start_at_first_full_window(self, period):
+        """SMA, EMA, Wilder and the bands are NaN until the first full window, then defined"""
+        for values in (sma(self.data, period), ema(self.data, period), wilder(self.data, period),
+                       *bollinger_bands(self.data, period, 2.0)):
+            assert np.isnan(values[:period - 1]).all()
+            assert not np.isnan(values[period - 1:]).any()
+
+    @pytest.mark.parametrize('period', PERIODS)
+    def test_rsi_starts_after_period_changes(self, period):
+        """RSI needs `period` price changes, so its first value is at index period"""
+        values = rsi(self.data, period)
+
+        assert np.isnan(values[:period]).all()
+        assert not np.isnan(values[period:]).any()
+
+        stream = RSI(period)
+        for i, value in enumerate(self.data):
+            assert math.isnan(stream.update(float(value))) == (i < period)
+
+    def test_short_series_is_all_nan(self):
+        """Fewer values than the window give only NaN in batch and streaming form"""
+        data = self.data[:13]
+
+        for batch, stream in ((sma(data, 14), SMA(14)), (ema(data, 14), EMA(14)),
+                              (wilder(data, 14), Wilder(14)), (rsi(data, 14), RSI(14))):
+            assert np.isnan(batch).all()
+            assert np.isnan(_stream(stream, data)).all()
+
+
+class TestIndicatorEngine:
+    def _bars(self, closes: np.ndarray) -> Bars:
+        data = np.zeros(len(closes), dtype=BAR_DTYPE)
+        data['time'] = 1704067200 + np.arange(len(closes)) * 900
+        data['close'] = closes
+        return Bars(data)
+
+    def test_reuses_nodes_for_same_bars(self):
+        """A node shared by two requests on the same window is computed once"""
+        engine = IndicatorEngine()
+        bars = self._bars(_prices(100))
+        spec = IndicatorSpec.of('sma', period=20)
+
+        engine.compute('EURUSD', 15, bars, [spec])
+        engine.compute('EURUSD', 15, bars, [spec, IndicatorSpec.of('bollinger', period=20, std_dev=2.0)])
+
+        assert (engine.hits, engine.misses) == (1, 3)
+
+    def test_rewritten_bar_inside_window_recomputes(self):
+        """A bar changed mid-window (e.g. by a backfill merge) does not return stale values"""
+        engine = IndicatorEngine()
+        closes = _prices(100)
+        spec = IndicatorSpec.of('sma', period=20)
+        engine.compute('EURUSD', 15, self._bars(closes), [spec])
+
+        closes = closes.copy()
+        closes[90] += 0.01
+        values = engine.compute('EURUSD', 15, self._bars(closes), [spec])
+
+        _assert_identical(sma(closes, 20), values[spec])
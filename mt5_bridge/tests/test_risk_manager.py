@@ -0,0 +1,135 @@
+"""
+Risk manager tests - validate_batch() matches validating signals one by one
+"""
+
+import numpy as np
+import pytest
+
+from risk_manager import RiskManager, RejectReason
+
+SYMBOLS = ['EURUSD', 'GBPUSD', 'USDJPY']
+
+ACCOUNT = {'balance': 10000.0, 'equity': 10000.0}
+
+
+def _signal(symbol: str, action: str = 'BUY', **fields) -> dict:
+    """Well-formed signal with a 2:1 reward/risk"""
+    signal = {
+        'strategy': 'test',
+        'symbol': symbol,
+        'action': action,
+        'confidence': 0.8,
+        'entry_price': 1.1000,
+        'take_profit': 1.1020 if action == 'BUY' else 1.0980,
+        'stop_loss': 1.0990 if action == 'BUY' else 1.1010
+    }
+    signal.update(fields)
+    return signal
+
+
+def _malformed(rng: np.random.Generator, symbol: str) -> dict:
+    """Signal failing one of the stateless checks"""
+    signal = _signal(symbol)
+    kind = rng.integers(5)
+    if kind == 0:
+        del signal['stop_loss']
+    elif kind == 1:
+        signal['action'] = 'HOLD'
+    elif kind == 2:
+        signal['confidence'] = 'high'
+    elif kind == 3:
+        signal['confidence'] = 1.5
+    else:
+        signal['take_profit'] = 1.1005  # reward/risk below the minimum
+    return signal
+
+
+def _manager(max_trades: int, max_concurrent: int, per_symbol: int, traded: int) -> RiskManager:
+    """Risk manager with the given limits and trades already taken today"""
+    manager = RiskManager()
+    manager.max_trades_per_day = max_trades
+    manager.max_concurrent_positions = max_concurrent
+    manager.max_positions_per_symbol = per_symbol
+    for _ in range(traded):
+        manager.record_trade({'symbol': 'EURUSD'})
+    return manager
+
+
+def _sequential(manager: RiskManager, signals: list, positions) -> np.ndarray:
+    """Reason per signal when validating one at a time and recording each accepted trade"""
+    positions = None if positions is None else list(positions)
+    reasons = []
+    for signal in signals:
+        accepted = manager.validate_trade(signal, ACCOUNT, positions)
+        _, reason = manager.validate_batch([signal], ACCOUNT, positions)
+        assert accepted == (reason[0] == RejectReason.ACCEPTED)
+        if accepted:
+            manager.record_trade(signal)
+            if positions is not None:
+                positions.append({'symbol': signal['symbol']})
+        reasons.append(reason[0])
+    return np.array(reasons)
+
+
+class TestValidateBatch:
+    def test_limits_in_batch_order(self):
+        """Signals accepted earlier in the burst use up the limits of later ones"""
+        manager = _manager(max_trades=1, max_concurrent=5, per_symbol=0, traded=0)
+        signals = [_signal('EURUSD'), _signal('GBPUSD'), _signal('USDJPY')]
+
+        accepted, reasons = manager.validate_batch(signals, ACCOUNT, [])
+
+        assert list(accepted) == [True, False, False]
+        assert list(reasons) == [RejectReason.ACCEPTED, RejectReason.DAILY_TRADE_LIMIT,
+                                 RejectReason.DAILY_TRADE_LIMIT]
+
+    def test_symbol_limit_skips_to_other_symbols(self):
+        """A signal over its symbol's limit does not use up room for other symbols"""
+        manager = _manager(max_trades=10, max_concurrent=2, per_symbol=1, traded=0)
+        signals = [_signal('EURUSD'), _signal('EURUSD'), _signal('GBPUSD'), _signal('USDJPY')]
+
+        accepted, reasons = manager.validate_batch(signals, ACCOUNT, [])
+
+        assert list(reasons) == [RejectReason.ACCEPTED, RejectReason.SYMBOL_POSITIONS,
+                                 RejectReason.ACCEPTED, RejectReason.CONCURRENT_POSITIONS]
+
+    def test_unfunded_account_rejects_all(self):
+        """Without a balance every signal is invalid"""
+        manager = _manager(max_trades=10, max_concurrent=5, per_symbol=0, traded=0)
+
+        _, reasons = manager.validate_batch([_signal('EURUSD')] * 2, {'balance': 0.0}, [])
+
+        assert list(reasons) == [RejectReason.INVALID_SIGNAL] * 2
+
+    @pytest.mark.parametrize('with_positions', [True, False])
+    def test_matches_sequential(self, with_positions):
+        """Random bursts give the reasons of validating and recording each signal in turn"""
+        rng = np.random.default_rng(11)
+        seen = set()
+        for _ in range(500):
+            limits = dict(
+                max_trades=int(rng.integers(1, 9)),
+                max_concurrent=int(rng.integers(1, 9)),
+                per_symbol=int(rng.integers(0, 4)),
+                traded=int(rng.integers(0, 4))
+            )
+            positions = None
+            if with_positions:
+                positions = [{'symbol': str(rng.choice(SYMBOLS))} for _ in range(rng.integers(0, 4))]
+            signals = [
+                _malformed(rng, str(rng.choice(SYMBOLS))) if rng.random() < 0.2
+                else _signal(str(rng.choice(SYMBOLS)), str(rng.choice(['BUY', 'SELL'])))
+                for _ in range(rng.integers(1, 12))
+            ]
+
+            accepted, reasons = _manager(**limits).validate_batch(signals, ACCOUNT, positions)
+            expected = _sequential(_manager(**limits), signals, positions)
+
+            assert list(reasons) == list(expected)
+            assert list(accepted) == list(expected == RejectReason.ACCEPTED)
+            seen.update(RejectReason(reason) for reason in reasons)
+
+        limits = {RejectReason.DAILY_TRADE_LIMIT, RejectReason.INVALID_SIGNAL, RejectReason.RISK_REWARD}
+        if with_positions:
+            limits |= {RejectReason.CONCURRENT_POSITIONS, RejectReason.SYMBOL_POSITIONS}
+        assert limits | {RejectReason.ACCEPTED} <= seen
@@ -0,0 +1,141 @@
+"""
+Strategy tests - analyze(), streaming and vectorized entry points emit the same signals
+"""
+
+import numpy as np
+import pytest
+
+from bars import Bars, BAR_DTYPE
+from evaluation_pool import evaluate_series
+from indicator_graph import IndicatorEngine
+from lookback_planner import LookbackPlanner
+from strategies.trend_following import TrendFollowingStrategy
+from strategies.mean_reversion import MeanReversionStrategy
+from strategies.scalping import ScalpingStrategy
+
+STRATEGIES = [TrendFollowingStrategy, MeanReversionStrategy, ScalpingStrategy]
+
+ACTIONS = {'BUY': 1, 'SELL': -1}
+
+
+def _generate_rates(count: int = 300, seed: int = 7) -> Bars:
+    """Random walk alternating trending and ranging stretches, so every strategy fires"""
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.choice([-0.0002, 0.0, 0.0002], size=count // 50 + 1), 50)[:count]
+    closes = 1.0850 + np.cumsum(drift + rng.normal(0, 0.0004, count))
+
+    data = np.zeros(count, dtype=BAR_DTYPE)
+    data['time'] = 1704067200 + np.arange(count) * 900
+    data['open'] = np.r_[closes[0], closes[:-1]]
+    data['high'] = np.maximum(data['open'], closes) + 0.0002
+    data['low'] = np.minimum(data['open'], closes) - 0.0002
+    data['close'] = closes
+    data['tick_volume'] = 100
+    return Bars(data)
+
+
+def _analyze_prefixes(strategy, rates: Bars, symbol: str = 'EURUSD') -> list:
+    """Signal of analyze() on the bars up to and including each bar"""
+    return [strategy.analyze(rates[:i + 1], symbol) for i in range(len(rates))]
+
+
+@pytest.mark.parametrize('strategy_class', STRATEGIES)
+class TestSignalParity:
+    def setup_method(self):
+        self.rates = _generate_rates()
+
+    def test_fixture_produces_signals(self, strategy_class):
+        """Parity checks below are only meaningful if signals are emitted"""
+        expected = _analyze_prefixes(strategy_class(), self.rates)
+
+        actions = {signal['action'] for signal in expected if signal}
+        assert actions == {'BUY', 'SELL'}
+
+    def test_on_bar_matches_analyze(self, strategy_class):
+        """Streaming closed bars gives the signal analyze() gives on the same history"""
+        expected = _analyze_prefixes(strategy_class(), self.rates)
+        strategy = strategy_class()
+
+        streamed = [strategy.on_bar('EURUSD', self.rates[i]) for i in range(len(self.rates))]
+
+        assert streamed == expected
+
+    def test_on_tick_matches_analyze(self, strategy_class):
+        """A tick on the forming bar is evaluated like analyze() with that bar closing at the bid"""
+        expected = _analyze_prefixes(strategy_class(), self.rates)
+        strategy = strategy_class()
+
+        for i in range(len(self.rates)):
+            bar = self.rates[i]
+            assert strategy.on_tick('EURUSD', {'bid': bar['close']}) == expected[i]
+            strategy.on_bar('EURUSD', bar)
+
+    def test_warm_up_then_stream(self, strategy_class):
+        """Priming from history in one batch continues exactly like streaming it"""
+        expected = _analyze_prefixes(strategy_class(), self.rates)
+        strategy = strategy_class()
+        start = len(self.rates) // 2
+
+        strategy.warm_up('EURUSD', self.rates[:start])
+        streamed = [strategy.on_bar('EURUSD', self.rates[i]) for i in range(start, len(self.rates))]
+
+        assert streamed == expected[start:]
+
+    def test_generate_signals_matches_analyze(self, strategy_class):
+        """Bar i of the vectorized pass holds analyze()'s decision on the bars up to i"""
+        expected = _analyze_prefixes(strategy_class(), self.rates)
+
+        actions, confidences, take_profits, stop_losses = strategy_class().generate_signals(self.rates.close)
+
+        for i, signal in enumerate(expected):
+            if signal is None:
+                assert actions[i] == 0
+                continue
+            assert actions[i] == ACTIONS[signal['action']]
+            assert confidences[i] == signal['confidence']
+            assert take_profits[i] == signal['take_profit']
+            assert stop_losses[i] == signal['stop_loss']
+
+    def test_analyze_batch_matches_analyze(self, strategy_class):
+        """One analyze_batch() call over many symbols matches analyze() per symbol"""
+        symbols = [f'SYM{seed}' for seed in range(8)]
+        series = [_generate_rates(seed=seed) for seed in range(8)]
+        closes = np.stack([rates.close for rates in series])
+
+        strategy = strategy_class()
+        emitted = 0
+        for end in range(1, closes.shape[1] + 1):
+            expected = [strategy.analyze(rates[:end], symbol) for rates, symbol in zip(series, symbols)]
+
+            assert strategy.analyze_batch(closes[:, :end], symbols) == expected
+            emitted += sum(signal is not None for signal in expected)
+        assert emitted > 0
+
+
+class TestLookbackIsolation:
+    def _signals(self, planner, rates: Bars) -> dict:
+        """Signals per (strategy, bar) of evaluate_series() over fetched windows ending at each bar"""
+        engine = IndicatorEngine()
+        count = planner.requirement('EURUSD', 15)
+        signals = {}
+        for end in range(count, len(rates) + 1):
+            histories = {('EURUSD', 15): rates[end - count:end]}
+            for _, _, name, signal in evaluate_series(engine, planner.series(histories)):
+                signals[(name, end)] = signal
+        return signals
+
+    @pytest.mark.parametrize('strategy_class', [TrendFollowingStrategy, MeanReversionStrategy])
+    def test_longer_lookback_does_not_change_signals(self, strategy_class):
+        """A strategy decides on its own lookback, whatever else shares the symbol/timeframe"""
+        rates = _generate_rates(count=600)
+        planner = LookbackPlanner()
+        planner.register('strategy', strategy_class(), ['EURUSD'], [15])
+        alone = self._signals(planner, rates)
+
+        longer = ScalpingStrategy()
+        assert longer.lookback > strategy_class().lookback
+        planner.register('longer', longer, ['EURUSD'], [15])
+        shared = {key: signal for key, signal in self._signals(planner, rates).items() if key[0] == 'strategy'}
+
+        assert alone
+        assert shared == {key: signal for key, signal in alone.items() if key[1] >= planner.requirement('EURUSD', 15)}